@@ -53,6 +53,9 @@ from brain.tools.financial_tools import (
     TransactionAnalyzer, FinancialCalculator
 )
 
+# Motor local de análisis PyG
+from services.pyg_analysis import VIEW_TYPES, get_pyg_analysis, latest_pyg_year, parse_period
+
 # Modelos de datos para la API (sin cambios)
 class PortfolioRequest(BaseModel):
     investments: List[Dict[str, Any]]
@@ -75,12 +78,14 @@ class FinancialCalculationRequest(BaseModel):
     compounding_frequency: Optional[int] = 12
 
 class PyGAnalysisRequest(BaseModel):
-    financial_data: Dict[str, Any]
-    analysis_month: Optional[str] = None
+    financial_data: Optional[Dict[str, Any]] = None
+    analysis_month: Optional[str] = None  # "2025-03", "Marzo" o "Anual"
     view_type: str = "contable"  # contable, operativo, caja, ebitda
     enable_vertical_analysis: bool = False
     enable_horizontal_analysis: bool = False
     comparison_month: Optional[str] = None
+    year: Optional[int] = None  # por defecto el año de analysis_month o el último cargado
+    include_ai_insights: bool = False  # comentario adicional del Brain System (llamada al LLM)
 
 class BrainQueryRequest(BaseModel):
     prompt: str
@@ -150,6 +155,12 @@ async def startup_event():
         print(f"⚠️ Brain System initialization failed: {e}")
         # Brain System es opcional, continuamos sin él
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Guardar el estado pendiente del Brain antes de terminar"""
+    if brain:
+        await brain.close()
+
 # Incluir rutas de autenticación y administración
 app.include_router(auth_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
@@ -242,59 +253,64 @@ async def financial_calculate(
 @app.post("/api/pyg/analyze")
 async def analyze_pyg(
     request: PyGAnalysisRequest,
-    current_user: User = Depends(require_permission("pyg_analysis", "execute"))
+    current_user: User = Depends(require_permission("pyg_analysis", "execute")),
+    db: Session = Depends(get_db)
 ):
     """
     Endpoint principal para análisis PyG (requiere pyg_analysis:execute)
+
+    El análisis (jerarquía, vertical, horizontal, KPIs) se calcula localmente
+    sobre raw_account_data y se memoiza por empresa/año/vista. El Brain System
+    solo se consulta si se pide include_ai_insights.
     """
+    if request.view_type not in VIEW_TYPES:
+        raise HTTPException(status_code=400, detail=f"Tipo de vista no soportado: {request.view_type}")
+    if not current_user.company_id:
+        raise HTTPException(status_code=400, detail="Usuario sin empresa asignada")
+
     try:
-        # Verificar si Brain System está disponible
-        if not brain:
-            # Fallback: análisis básico sin IA
-            return {
-                "success": True,
-                "data": {
-                    "analysis": "Análisis PyG básico (Brain System no disponible)",
-                    "reasoning": "Sistema de análisis con IA no configurado",
-                    "confidence": 0.3,
-                    "warning": "Para análisis avanzado, configure ANTHROPIC_API_KEY"
-                }
-            }
-        
-        # Crear prompt contextual para análisis PyG
-        prompt = f"""
-        Analiza estos datos financieros para generar un análisis PyG:
-        
-        Datos: {request.financial_data}
-        Mes: {request.analysis_month or 'Anual'}
-        Tipo de vista: {request.view_type}
-        Análisis vertical: {request.enable_vertical_analysis}
-        Análisis horizontal: {request.enable_horizontal_analysis}
-        
-        Por favor proporciona:
-        1. Estructura jerárquica de cuentas
-        2. Cálculos de KPIs principales
-        3. Análisis de tendencias
-        4. Insights y recomendaciones
-        """
-        
-        thought_process = await brain.think(prompt, {
-            "financial_data": request.financial_data,
-            "analysis_type": "pyg",
+        period_year, month = parse_period(request.analysis_month)
+        comparison_year, comparison_month = parse_period(request.comparison_month)
+        year = request.year or period_year or latest_pyg_year(db, current_user.company_id)
+        if not year:
+            raise HTTPException(status_code=404, detail="No hay datos PyG cargados para la empresa")
+        if comparison_year and comparison_year != year:
+            # Comparación contra otro año: se usa la variación interanual
+            comparison_month = None
+
+        analysis, cached = get_pyg_analysis(db, current_user.company_id, year, request.view_type)
+        result = analysis.to_result(month, comparison_month)
+        result["cached"] = cached
+        result["config"] = {
             "view_type": request.view_type,
-            "user_id": current_user.id,
-            "user_permissions": list(current_user.get_permissions())
-        })
-        
-        return {
-            "success": True,
-            "data": {
+            "analysis_month": request.analysis_month,
+            "enable_vertical_analysis": request.enable_vertical_analysis,
+            "enable_horizontal_analysis": request.enable_horizontal_analysis,
+            "comparison_month": request.comparison_month,
+        }
+
+        if request.include_ai_insights and brain:
+            thought_process = await brain.think(
+                "Analiza este estado de resultados y proporciona insights y recomendaciones.",
+                {
+                    "analysis_type": "pyg",
+                    "view_type": request.view_type,
+                    "kpis": result["kpis"],
+                    "monthly_kpis": result["monthly_kpis"],
+                    "insights": result["insights"],
+                    "user_id": current_user.id,
+                },
+            )
+            result["ai"] = {
                 "analysis": thought_process.response.content if thought_process.response else "",
                 "reasoning": thought_process.reasoning.summary if thought_process.reasoning else "",
-                "confidence": thought_process.reasoning.confidence if thought_process.reasoning else 0.5
+                "confidence": thought_process.reasoning.confidence if thought_process.reasoning else 0.5,
             }
-        }
-    
+
+        return {"success": True, "data": result}
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -383,7 +399,9 @@ async def brain_stats(
                 "status": "active",
                 "memory": memory_stats,
                 "tools_available": len(brain.tools.list_tools()),
-                "learning_enabled": brain.config.enable_learning
+                "learning_enabled": brain.config.enable_learning,
+                "response_cache": brain.response_cache.get_stats(),
+                "embeddings": brain.memory.embeddings.get_stats()
             }
         }
     
@@ -15,7 +15,9 @@ import uvicorn
 
 # Configuración
 from config import Config
-from database.connection import init_db
+from database.connection import engine, init_db
+from database.schema_registry import schema_registry
+from services.audit_sink import audit_sink
 from auth.tenant_context import TenantContextMiddleware
 
 # Routes RBAC
@@ -26,7 +28,7 @@ from routes.superadmin import router as superadmin_router
 from routes.financial_scenarios import router as scenarios_router
 from routes.financial_data import router as financial_router
 from routes.analysis_config import router as analysis_router
-from routes.production_status import router as production_router
+from routes.production_status import router as production_router, shutdown_quote_parse_pool
 from routes.production_data_api import router as production_data_router
 from routes.sales_bi_api import router as sales_bi_router
 from routes.balance_data_api import router as balance_router
@@ -67,13 +69,24 @@ async def startup_event():
     print("🔧 Initializing database...")
     try:
         init_db()  # NOT async - remove await
+        # Columnas dinámicas (financial_data) se vuelven a descubrir tras migraciones
+        schema_registry.refresh()
         print("✅ Database initialized successfully")
     except Exception as e:
         print(f"❌ Database initialization failed: {e}")
         raise
-    
+
+    # Auditoría escrita en lotes fuera de la transacción de cada request
+    audit_sink.start(engine)
+
     print("✅ RBAC API Server ready!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Vaciar la cola de auditoría y detener los procesos de parsing antes de terminar"""
+    audit_sink.stop()
+    shutdown_quote_parse_pool()
+
 # Incluir rutas RBAC
 app.include_router(auth_router, prefix="/api", tags=["Authentication"])
 app.include_router(users_router, prefix="/api", tags=["Users"])
@@ -0,0 +1,162 @@
+"""
+Short-TTL in-process cache for the authenticated request context.
+
+Every authenticated request used to re-read the user, its company and its
+session row, and every ``require_permission`` dependency re-evaluated the
+user's roles and overrides. This cache keeps, per token hash, the validated
+user row for a few seconds. Effective permission sets are cached separately
+as compiled policies by ``auth.policy_engine.PolicyEngine``.
+
+Invalidation:
+- Explicit helpers (``invalidate_token``, ``invalidate_user``,
+  ``invalidate_company``).
+- Automatically after any commit that touched users, sessions or companies
+  through the ORM (logout, user changes, company deactivation...).
+
+The TTL bounds staleness for changes made outside this process.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models import User
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv('AUTH_CACHE_TTL_SECONDS', '30'))
+AUTH_CACHE_MAX_ENTRIES = 10000
+
+
+@dataclass
+class CachedIdentity:
+    """Validated user row for one token (user active, company active, session valid)."""
+    user_id: int
+    company_id: int
+    user_state: Dict[str, Any]
+    expires_at: float
+
+
+class AuthCache:
+    """Thread-safe TTL cache of identities by token hash."""
+
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._identities: Dict[str, CachedIdentity] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    # ------------------------------------------------------------------
+    # Identities
+    # ------------------------------------------------------------------
+    def get_identity(self, token_hash: str) -> Optional[CachedIdentity]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            identity = self._identities.get(token_hash)
+            if identity is None:
+                return None
+            if identity.expires_at <= time.monotonic():
+                del self._identities[token_hash]
+                return None
+            return identity
+
+    def store_identity(self, token_hash: str, user: User) -> None:
+        if not self.enabled:
+            return
+        state = {
+            column.key: getattr(user, column.key)
+            for column in sa_inspect(User).column_attrs
+        }
+        identity = CachedIdentity(
+            user_id=user.id,
+            company_id=user.company_id,
+            user_state=state,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        with self._lock:
+            if len(self._identities) >= self.max_entries:
+                self._identities.clear()
+            self._identities[token_hash] = identity
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    def invalidate_token(self, token_hash: str) -> None:
+        with self._lock:
+            self._identities.pop(token_hash, None)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token_hash in [k for k, v in self._identities.items() if v.user_id == user_id]:
+                del self._identities[token_hash]
+
+    def invalidate_company(self, company_id: int) -> None:
+        with self._lock:
+            for token_hash in [k for k, v in self._identities.items() if v.company_id == company_id]:
+                del self._identities[token_hash]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._identities.clear()
+
+
+auth_cache = AuthCache()
+
+
+def attach_cached_user(db: Session, identity: CachedIdentity) -> User:
+    """
+    Rebuild the cached user row inside ``db`` without querying.
+
+    The instance is merged as persistent, so relationships (roles, company)
+    still lazy-load through the request session when a route needs them.
+    """
+    user = User(**identity.user_state)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+# ----------------------------------------------------------------------
+# Automatic invalidation from ORM writes
+# ----------------------------------------------------------------------
+_PENDING_KEY = 'auth_cache_pending'
+
+
+def _collect_invalidations(session: Session, flush_context) -> None:
+    from models import Company, UserSession
+
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            if obj.id is not None:
+                pending.append(('user', obj.id))
+        elif isinstance(obj, UserSession):
+            pending.append(('token', obj.token_hash))
+        elif isinstance(obj, Company):
+            if obj.id is not None:
+                pending.append(('company', obj.id))
+
+
+def _apply_invalidations(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for kind, key in pending:
+        if kind == 'user':
+            auth_cache.invalidate_user(key)
+        elif kind == 'token':
+            auth_cache.invalidate_token(key)
+        else:
+            auth_cache.invalidate_company(key)
+
+
+event.listen(Session, 'after_flush', _collect_invalidations)
+event.listen(Session, 'after_commit', _apply_invalidations)
+# Invalidating after a rollback is harmless and keeps savepoint rollbacks simple
+event.listen(Session, 'after_rollback', _apply_invalidations)
@@ -11,6 +11,7 @@ from models import User, UserSession
 from auth.jwt_handler import JWTHandler
 from auth.permissions import PermissionChecker
 from auth.tenant_context import get_current_tenant, set_current_tenant
+from auth.auth_cache import attach_cached_user, auth_cache
 
 # Security scheme
 security = HTTPBearer()
@@ -39,6 +40,15 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Hot path: token already validated within the cache TTL
+    token_hash = JWTHandler.get_token_hash(token)
+    identity = auth_cache.get_identity(token_hash)
+    if identity is not None and identity.user_id == user_id:
+        user = attach_cached_user(db, identity)
+        if get_current_tenant() is None:
+            set_current_tenant(user.company_id)
+        return user
+
     # Get user from database
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -78,7 +88,6 @@ async def get_current_user(
         )
     
     # Check if session exists and is active
-    token_hash = JWTHandler.get_token_hash(token)
     session = db.query(UserSession).filter(
         UserSession.token_hash == token_hash,
         UserSession.user_id == user_id
@@ -91,6 +100,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    auth_cache.store_identity(token_hash, user)
+
     if get_current_tenant() is None:
         set_current_tenant(user.company_id)
     
@@ -118,6 +129,7 @@ def require_permissions(required_permissions: List[Tuple[str, str]], require_all
         # Use Policy Engine for advanced permission evaluation
         from auth.policy_engine import PolicyEngine
 
+        # Compiled per (user, company): a cached bitmask test after the first request
         has_access = PolicyEngine.check_multiple_permissions(
             current_user,
             required_permissions,
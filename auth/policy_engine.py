@@ -14,10 +14,98 @@ Permission evaluation order:
 3. Apply role-level overrides for the tenant (RolePermissionOverride)
 4. Apply user-level overrides for the tenant (UserRoleOverride)
 5. Filter out expired temporal permissions
+
+Each (user, company) result is compiled once into a bitmask over an interned
+(resource, action) index (see CompiledPolicy). Compiled policies are reused
+until the policy generation changes (any role/permission/override write), the
+user row changes, the next temporal override boundary passes, or the TTL
+expires.
 """
-from typing import Set, Tuple, Optional
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple, Optional
+from sqlalchemy import event, inspect as sa_inspect
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
+
+POLICY_CACHE_TTL_SECONDS = float(os.getenv('POLICY_CACHE_TTL_SECONDS', '60'))
+
+
+class PermissionIndex:
+    """Interns (resource, action) pairs to bit positions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bits: Dict[Tuple[str, str], int] = {}
+        self._pairs: List[Tuple[str, str]] = []
+        self._match_masks: Dict[Tuple[str, str], int] = {}
+
+    def bit(self, pair: Tuple[str, str]) -> int:
+        bit = self._bits.get(pair)
+        if bit is None:
+            with self._lock:
+                bit = self._bits.get(pair)
+                if bit is None:
+                    bit = 1 << len(self._pairs)
+                    self._pairs.append(pair)
+                    self._bits[pair] = bit
+        return bit
+
+    def mask(self, pairs) -> int:
+        mask = 0
+        for pair in pairs:
+            mask |= self.bit(pair)
+        return mask
+
+    def match_mask(self, resource: str, action: str) -> int:
+        """Bits that satisfy (resource, action): exact match or any wildcard form."""
+        key = (resource, action)
+        mask = self._match_masks.get(key)
+        if mask is None:
+            mask = self.mask([key, (resource, '*'), ('*', action), ('*', '*')])
+            self._match_masks[key] = mask
+        return mask
+
+    def pairs(self, mask: int) -> Set[Tuple[str, str]]:
+        decoded = set()
+        position = 0
+        while mask:
+            if mask & 1:
+                decoded.add(self._pairs[position])
+            mask >>= 1
+            position += 1
+        return decoded
+
+
+_INDEX = PermissionIndex()
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """Effective permissions of one user in one company as a bitmask."""
+    mask: int
+    has_wildcards: bool
+    generation: int
+    expires_at: datetime
+
+    def allows(self, resource: str, action: str) -> bool:
+        return bool(self.mask & _INDEX.match_mask(resource, action))
+
+    def allows_all(self, required_permissions) -> bool:
+        if not self.has_wildcards:
+            required = _INDEX.mask(required_permissions)
+            return self.mask & required == required
+        return all(self.allows(resource, action) for resource, action in required_permissions)
+
+    def allows_any(self, required_permissions) -> bool:
+        any_mask = 0
+        for resource, action in required_permissions:
+            any_mask |= _INDEX.match_mask(resource, action)
+        return bool(self.mask & any_mask)
+
+    def permissions(self) -> Set[Tuple[str, str]]:
+        return _INDEX.pairs(self.mask)
 
 
 class PolicyEngine:
@@ -31,14 +119,32 @@ class PolicyEngine:
     - Temporal constraints
     """
 
+    _cache_lock = threading.Lock()
+    _compiled: Dict[Tuple[int, int], CompiledPolicy] = {}
+    _generation = 0
+
     @staticmethod
-    def evaluate_user_permissions(
+    def bump_generation() -> None:
+        """Invalidate every compiled policy (role, permission or override change)."""
+        with PolicyEngine._cache_lock:
+            PolicyEngine._generation += 1
+            PolicyEngine._compiled.clear()
+
+    @staticmethod
+    def invalidate_user(user_id: int) -> None:
+        """Drop the compiled policies of one user (roles, superuser flag or user overrides changed)."""
+        with PolicyEngine._cache_lock:
+            for key in [key for key in PolicyEngine._compiled if key[0] == user_id]:
+                del PolicyEngine._compiled[key]
+
+    @staticmethod
+    def compile_user_policy(
         user,
         db: Session,
         company_id: Optional[int] = None
-    ) -> Set[Tuple[str, str]]:
+    ) -> CompiledPolicy:
         """
-        Evaluate all effective permissions for a user within a tenant.
+        Return the compiled effective policy for a user within a tenant.
 
         Args:
             user: User model instance
@@ -46,30 +152,74 @@ class PolicyEngine:
             company_id: Company ID to scope permissions to (defaults to user's company)
 
         Returns:
-            Set of tuples (resource, action) representing granted permissions
+            CompiledPolicy reused until invalidated or expired
         """
-        # Superusers get all permissions
-        if user.is_superuser:
-            return {('*', '*')}
-
         # Use user's company if not specified
         if company_id is None:
             company_id = user.company_id
 
-        # Start with base permissions from roles
-        permissions = PolicyEngine._get_base_role_permissions(user)
+        now = datetime.utcnow()
+        key = (user.id, company_id)
+        generation = PolicyEngine._generation
+        cached = PolicyEngine._compiled.get(key)
+        if cached is not None and cached.generation == generation and now < cached.expires_at:
+            return cached
 
-        # Apply tenant-specific role overrides
-        permissions = PolicyEngine._apply_role_overrides(
-            user, permissions, company_id, db
-        )
+        expires_at = now + timedelta(seconds=POLICY_CACHE_TTL_SECONDS)
+        if user.is_superuser:
+            # Superusers get all permissions
+            permissions = {('*', '*')}
+        else:
+            boundaries: List[datetime] = []
+
+            # Start with base permissions from roles
+            permissions = PolicyEngine._get_base_role_permissions(user)
+
+            # Apply tenant-specific role overrides
+            permissions = PolicyEngine._apply_role_overrides(
+                user, permissions, company_id, db, boundaries
+            )
+
+            # Apply user-specific overrides
+            permissions = PolicyEngine._apply_user_overrides(
+                user, permissions, company_id, db, boundaries
+            )
+
+            # Recompile when a temporal override starts or ends
+            future = [boundary for boundary in boundaries if boundary > now]
+            if future:
+                expires_at = min(expires_at, min(future))
 
-        # Apply user-specific overrides
-        permissions = PolicyEngine._apply_user_overrides(
-            user, permissions, company_id, db
+        policy = CompiledPolicy(
+            mask=_INDEX.mask(permissions),
+            has_wildcards=any('*' in pair for pair in permissions),
+            generation=generation,
+            expires_at=expires_at,
         )
+        if user.id is not None and POLICY_CACHE_TTL_SECONDS > 0:
+            with PolicyEngine._cache_lock:
+                if PolicyEngine._generation == generation:
+                    PolicyEngine._compiled[key] = policy
+        return policy
 
-        return permissions
+    @staticmethod
+    def evaluate_user_permissions(
+        user,
+        db: Session,
+        company_id: Optional[int] = None
+    ) -> Set[Tuple[str, str]]:
+        """
+        Evaluate all effective permissions for a user within a tenant.
+
+        Args:
+            user: User model instance
+            db: Database session
+            company_id: Company ID to scope permissions to (defaults to user's company)
+
+        Returns:
+            Set of tuples (resource, action) representing granted permissions
+        """
+        return PolicyEngine.compile_user_policy(user, db, company_id).permissions()
 
     @staticmethod
     def _get_base_role_permissions(user) -> Set[Tuple[str, str]]:
@@ -93,7 +243,8 @@ class PolicyEngine:
         user,
         base_permissions: Set[Tuple[str, str]],
         company_id: int,
-        db: Session
+        db: Session,
+        boundaries: Optional[List[datetime]] = None
     ) -> Set[Tuple[str, str]]:
         """
         Apply tenant-specific role permission overrides.
@@ -108,6 +259,7 @@ class PolicyEngine:
             base_permissions: Current permission set
             company_id: Company ID for scoping
             db: Database session
+            boundaries: Optional list collecting override valid_from/valid_until
 
         Returns:
             Modified permission set
@@ -124,6 +276,9 @@ class PolicyEngine:
         ).all()
 
         for override in overrides:
+            if boundaries is not None:
+                boundaries.extend(b for b in (override.valid_from, override.valid_until) if b is not None)
+
             # Skip expired temporal permissions
             if not override.is_currently_valid():
                 continue
@@ -144,7 +299,8 @@ class PolicyEngine:
         user,
         base_permissions: Set[Tuple[str, str]],
         company_id: int,
-        db: Session
+        db: Session,
+        boundaries: Optional[List[datetime]] = None
     ) -> Set[Tuple[str, str]]:
         """
         Apply user-specific permission overrides.
@@ -156,6 +312,7 @@ class PolicyEngine:
             base_permissions: Current permission set
             company_id: Company ID for scoping
             db: Database session
+            boundaries: Optional list collecting override valid_from/valid_until
 
         Returns:
             Modified permission set
@@ -171,6 +328,9 @@ class PolicyEngine:
         ).all()
 
         for override in overrides:
+            if boundaries is not None:
+                boundaries.extend(b for b in (override.valid_from, override.valid_until) if b is not None)
+
             # Skip expired temporal permissions
             if not override.is_currently_valid():
                 continue
@@ -207,15 +367,8 @@ class PolicyEngine:
         Returns:
             True if user has the permission, False otherwise
         """
-        permissions = PolicyEngine.evaluate_user_permissions(user, db, company_id)
-
-        # Check for exact match or wildcard
-        return (
-            (resource, action) in permissions or
-            ('*', '*') in permissions or
-            (resource, '*') in permissions or
-            ('*', action) in permissions
-        )
+        # Exact match or wildcard, as one mask test
+        return PolicyEngine.compile_user_policy(user, db, company_id).allows(resource, action)
 
     @staticmethod
     def check_multiple_permissions(
@@ -238,20 +391,14 @@ class PolicyEngine:
         Returns:
             True if permission check passes, False otherwise
         """
-        user_permissions = PolicyEngine.evaluate_user_permissions(user, db, company_id)
+        policy = PolicyEngine.compile_user_policy(user, db, company_id)
 
         if require_all:
             # User must have all required permissions
-            return all(
-                PolicyEngine._matches_permission(perm, user_permissions)
-                for perm in required_permissions
-            )
+            return policy.allows_all(required_permissions)
         else:
             # User must have at least one required permission
-            return any(
-                PolicyEngine._matches_permission(perm, user_permissions)
-                for perm in required_permissions
-            )
+            return policy.allows_any(required_permissions)
 
     @staticmethod
     def _matches_permission(
@@ -283,3 +430,76 @@ def evaluate_permissions(user, db: Session, company_id: Optional[int] = None) ->
         Set of (resource, action) permission tuples
     """
     return PolicyEngine.evaluate_user_permissions(user, db, company_id)
+
+
+# ----------------------------------------------------------------------
+# Compiled policy invalidation from ORM writes
+# ----------------------------------------------------------------------
+_DIRTY_KEY = 'policy_engine_dirty'
+_USERS_KEY = 'policy_engine_users'
+
+# User columns/relationships that feed a compiled policy
+_POLICY_USER_ATTRS = ('roles', 'is_superuser', 'is_active', 'company_id')
+
+# Many-to-many tables written with Core statements by some routes
+_POLICY_ASSOCIATION_TABLES = ('user_roles', 'role_permissions')
+
+
+def _user_policy_changed(user) -> bool:
+    state = sa_inspect(user)
+    if state.deleted or state.was_deleted:
+        return True
+    return any(state.attrs[name].history.has_changes() for name in _POLICY_USER_ATTRS)
+
+
+def _role_policy_changed(role) -> bool:
+    # Role.users is the other side of User.roles, handled per user
+    state = sa_inspect(role)
+    return any(attr.history.has_changes() for attr in state.attrs if attr.key != 'users')
+
+
+def _invalidate_on_flush(session: Session, flush_context) -> None:
+    from models import Permission, Role, RolePermissionOverride, User, UserRoleOverride
+
+    users = session.info.setdefault(_USERS_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Role) and obj in session.dirty and not _role_policy_changed(obj):
+            continue
+        if isinstance(obj, (Role, Permission, RolePermissionOverride)):
+            session.info[_DIRTY_KEY] = True
+            PolicyEngine.bump_generation()
+        elif isinstance(obj, User):
+            # last_login, profile edits... do not change permissions
+            if obj.id is not None and (obj in session.deleted or _user_policy_changed(obj)):
+                users.add(obj.id)
+                PolicyEngine.invalidate_user(obj.id)
+        elif isinstance(obj, UserRoleOverride) and obj.user_id is not None:
+            users.add(obj.user_id)
+            PolicyEngine.invalidate_user(obj.user_id)
+
+
+def _invalidate_on_execute(orm_execute_state) -> None:
+    # Core DML on the association tables (e.g. user_roles.delete()) never
+    # reaches after_flush; treat it like a role/permission write
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in _POLICY_ASSOCIATION_TABLES:
+        orm_execute_state.session.info[_DIRTY_KEY] = True
+        PolicyEngine.bump_generation()
+
+
+def _invalidate_on_commit(session: Session) -> None:
+    # A policy compiled by another session between this flush and the commit
+    # still saw the old rows (and this session may have compiled one from rows
+    # it then rolled back); drop it again so it is not reused.
+    if session.info.pop(_DIRTY_KEY, False):
+        PolicyEngine.bump_generation()
+    for user_id in session.info.pop(_USERS_KEY, ()):
+        PolicyEngine.invalidate_user(user_id)
+
+
+event.listen(Session, 'after_flush', _invalidate_on_flush)
+event.listen(Session, 'do_orm_execute', _invalidate_on_execute)
+event.listen(Session, 'after_commit', _invalidate_on_commit)
+event.listen(Session, 'after_rollback', _invalidate_on_commit)
@@ -6,6 +6,7 @@ import json
 
 from .config import BrainConfig, ModelProvider
 from .interfaces import Message, Conversation, ThoughtProcess
+from .response_cache import ResponseCache
 from ..memory.manager import MemoryManager
 from ..tools.manager import ToolManager
 from ..reasoning.engine import ReasoningEngine
@@ -30,6 +31,10 @@ class Brain:
         self.tools = ToolManager(self.config.tools)
         self.reasoning = ReasoningEngine()
         self.learning = LearningAdapter() if self.config.enable_learning else None
+        self.response_cache = ResponseCache(
+            ttl_seconds=self.config.response_cache_ttl_seconds,
+            max_entries=self.config.response_cache_max_entries
+        )
         
         self._model_clients = {}
         self._initialize_models()
@@ -56,10 +61,45 @@ class Brain:
             except ImportError:
                 self.logger.error("OpenAI library not installed")
     
-    async def think(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> ThoughtProcess:
+    async def think(
+        self,
+        prompt: str,
+        context: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True
+    ) -> ThoughtProcess:
         """
         Main thinking method - processes input and generates response
+        
+        Identical prompts (same normalized text and context) are answered from
+        the response cache, and concurrent identical calls share one model call.
         """
+        if not use_cache or not self.response_cache.enabled:
+            return await self._think(prompt, context)
+        
+        key = ResponseCache.make_key(prompt, context, self.config.primary_model.model_name)
+        cached, source = await self.response_cache.get_or_compute(
+            key,
+            lambda: self._think(prompt, context),
+            cacheable=lambda tp: not (tp.response and tp.response.metadata.get("error"))
+        )
+        if source == 'miss':
+            return cached
+        
+        self.logger.info(f"Response cache {source}: {prompt[:100]}...")
+        thought_process = ThoughtProcess(
+            prompt=prompt,
+            context=context or {},
+            timestamp=datetime.now(),
+            memories=cached.memories,
+            available_tools=cached.available_tools,
+            reasoning=cached.reasoning,
+            response=cached.response
+        )
+        self.last_thought_process = thought_process
+        return thought_process
+    
+    async def _think(self, prompt: str, context: Optional[Dict[str, Any]] = None) -> ThoughtProcess:
+        """Run retrieval, reasoning and the model call for one prompt"""
         self.logger.info(f"Thinking about: {prompt[:100]}...")
         
         thought_process = ThoughtProcess(
@@ -113,7 +153,8 @@ class Brain:
             return Message(
                 role="assistant",
                 content=f"I encountered an error while processing: {str(e)}",
-                timestamp=datetime.now()
+                timestamp=datetime.now(),
+                metadata={"error": True}
             )
     
     async def _generate_anthropic_response(self, thought_process: ThoughtProcess) -> Message:
@@ -220,5 +261,10 @@ class Brain:
         await self.memory.import_state(state.get("memory_state", {}))
         self.logger.info(f"Brain state loaded from {path}")
     
+    async def close(self):
+        """Flush pending write-behind state to disk"""
+        if self.learning:
+            await self.learning.store.flush()
+    
     def __repr__(self):
         return f"<Brain: {self.config.name} v{self.config.version}>"
\ No newline at end of file
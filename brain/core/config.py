@@ -28,6 +28,9 @@ class MemoryConfig:
     embedding_model: Optional[str] = None
     vector_db_path: str = "./brain_memory"
     enable_semantic_search: bool = True
+    embedding_batch_window_ms: float = 5.0
+    embedding_max_batch_size: int = 64
+    embedding_cache_size: int = 2048
 
 
 @dataclass
@@ -61,6 +64,9 @@ class BrainConfig:
     enable_learning: bool = True
     save_conversations: bool = True
     
+    response_cache_ttl_seconds: int = 300
+    response_cache_max_entries: int = 256
+    
     @classmethod
     def from_env(cls) -> 'BrainConfig':
         """Create configuration from environment variables"""
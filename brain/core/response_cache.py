@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of Brain.think results with single-flight coalescing
+
+    Entries are keyed on the normalized prompt (case and whitespace folded),
+    a hash of the context and the model name. Concurrent calls with the same
+    key while the first one is still running await that call instead of
+    issuing their own.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'saved_ms': 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(prompt: str, context: Optional[Dict[str, Any]], model_name: str = "") -> str:
+        normalized = re.sub(r"\s+", " ", prompt).strip().casefold()
+        context_json = json.dumps(context or {}, sort_keys=True, default=str, ensure_ascii=False)
+        raw = "\x1f".join((model_name, normalized, context_json))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, cost_ms, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return cost_ms, value
+
+    def _put(self, key: str, cost_ms: float, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, cost_ms, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool] = lambda value: True,
+    ) -> Tuple[Any, str]:
+        """Return ``(value, source)`` with source ``hit``, ``coalesced`` or ``miss``"""
+        cached = self._get(key)
+        if cached is not None:
+            cost_ms, value = cached
+            self._stats['hits'] += 1
+            self._stats['saved_ms'] += cost_ms
+            return value, 'hit'
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            cost_ms, value = await asyncio.shield(inflight)
+            self._stats['coalesced'] += 1
+            self._stats['saved_ms'] += cost_ms
+            return value, 'coalesced'
+
+        self._stats['misses'] += 1
+        # The computation runs in its own task, so cancelling the caller that
+        # started it does not cancel (or fail) the callers coalesced onto it
+        task = asyncio.get_running_loop().create_task(self._compute(key, compute, cacheable))
+        task.add_done_callback(self._consume_exception)
+        self._inflight[key] = task
+        cost_ms, value = await asyncio.shield(task)
+        return value, 'miss'
+
+    async def _compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        cacheable: Callable[[Any], bool],
+    ) -> Tuple[float, Any]:
+        started = time.perf_counter()
+        try:
+            value = await compute()
+        finally:
+            self._inflight.pop(key, None)
+        cost_ms = (time.perf_counter() - started) * 1000
+        if cacheable(value):
+            self._put(key, cost_ms, value)
+        return cost_ms, value
+
+    @staticmethod
+    def _consume_exception(task: asyncio.Task):
+        # Every caller may have been cancelled; mark the exception as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._stats['hits'] + self._stats['coalesced'] + self._stats['misses']
+        return {
+            **self._stats,
+            'saved_ms': round(self._stats['saved_ms'], 1),
+            'entries': len(self._entries),
+            'inflight': len(self._inflight),
+            'hit_rate': round((self._stats['hits'] + self._stats['coalesced']) / lookups, 3) if lookups else 0.0,
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries,
+        }
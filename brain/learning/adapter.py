@@ -1,9 +1,9 @@
 from typing import Dict, Any, List, Optional
+from collections import Counter
 from datetime import datetime, timedelta
-import json
-import os
 
 from ..core.interfaces import ThoughtProcess, Memory
+from .store import LearningStore
 
 
 class LearningAdapter:
@@ -11,36 +11,37 @@ class LearningAdapter:
     Handles learning and adaptation from user interactions
     """
     
-    def __init__(self, learning_path: str = "./brain_learning"):
+    def __init__(self, learning_path: str = "./brain_learning", save_debounce_seconds: float = 1.0):
         self.learning_path = learning_path
         self.feedback_history = []
         self.patterns = {}
         self.preferences = {}
+        # Per pattern: successful approach counts and tools, by reasoning type
+        self.approach_counts: Dict[str, Counter] = {}
+        self.approach_tools: Dict[str, Dict[str, set]] = {}
         
-        os.makedirs(learning_path, exist_ok=True)
+        self.store = LearningStore(learning_path, debounce_seconds=save_debounce_seconds)
         self._load_learning_data()
     
     def _load_learning_data(self):
         """Load existing learning data"""
-        feedback_file = os.path.join(self.learning_path, "feedback_history.json")
-        patterns_file = os.path.join(self.learning_path, "patterns.json")
-        preferences_file = os.path.join(self.learning_path, "preferences.json")
-        
         try:
-            if os.path.exists(feedback_file):
-                with open(feedback_file, 'r') as f:
-                    self.feedback_history = json.load(f)
-            
-            if os.path.exists(patterns_file):
-                with open(patterns_file, 'r') as f:
-                    self.patterns = json.load(f)
-            
-            if os.path.exists(preferences_file):
-                with open(preferences_file, 'r') as f:
-                    self.preferences = json.load(f)
+            state = self.store.load()
+            self.feedback_history = state["feedback_history"]
+            self.patterns = state["patterns"]
+            self.preferences = state["preferences"]
         
         except Exception as e:
             print(f"Error loading learning data: {e}")
+        
+        for pattern, pattern_data in self.patterns.items():
+            for approach in pattern_data.get("successful_approaches", []):
+                self._count_successful_approach(pattern, approach)
+    
+    def _count_successful_approach(self, pattern: str, approach: Dict[str, Any]):
+        reasoning_type = approach["reasoning_type"]
+        self.approach_counts.setdefault(pattern, Counter())[reasoning_type] += 1
+        self.approach_tools.setdefault(pattern, {}).setdefault(reasoning_type, set()).update(approach["tools_used"])
     
     async def process_feedback(
         self, 
@@ -59,6 +60,8 @@ class LearningAdapter:
         }
         
         self.feedback_history.append(feedback_entry)
+        if len(self.feedback_history) > 2 * self.store.history_limit:
+            del self.feedback_history[:-self.store.history_limit]
         
         # Analyze feedback sentiment
         sentiment = self._analyze_sentiment(feedback)
@@ -70,8 +73,8 @@ class LearningAdapter:
         # Update preferences
         await self._update_preferences(feedback_entry, thought_process)
         
-        # Save learning data
-        await self._save_learning_data()
+        # Save learning data (debounced, written off the event loop)
+        self.store.record(feedback_entry, self.patterns, self.preferences)
     
     def _analyze_sentiment(self, feedback: str) -> str:
         """Simple sentiment analysis of feedback"""
@@ -116,6 +119,7 @@ class LearningAdapter:
                     "confidence": thought_process.reasoning.confidence
                 }
                 pattern_data["successful_approaches"].append(approach)
+                self._count_successful_approach(prompt_pattern, approach)
         
         elif feedback_entry["sentiment"] == "negative":
             # Record failed approach
@@ -180,22 +184,15 @@ class LearningAdapter:
             recommendations["confidence"] = success_rate
             
             # Find most successful approach
-            if pattern_data["successful_approaches"]:
-                most_common_approach = max(
-                    set(a["reasoning_type"] for a in pattern_data["successful_approaches"]),
-                    key=lambda x: sum(1 for a in pattern_data["successful_approaches"] 
-                                    if a["reasoning_type"] == x)
-                )
+            approach_counts = self.approach_counts.get(pattern)
+            if approach_counts:
+                most_common_approach = max(approach_counts, key=approach_counts.get)
                 recommendations["suggested_approach"] = most_common_approach
                 
                 # Get preferred tools for this approach
-                successful_tools = []
-                for approach in pattern_data["successful_approaches"]:
-                    if approach["reasoning_type"] == most_common_approach:
-                        successful_tools.extend(approach["tools_used"])
-                
+                successful_tools = self.approach_tools[pattern][most_common_approach]
                 if successful_tools:
-                    recommendations["preferred_tools"] = list(set(successful_tools))
+                    recommendations["preferred_tools"] = list(successful_tools)
         
         # Apply general preferences
         if "response_length" in self.preferences:
@@ -208,22 +205,8 @@ class LearningAdapter:
         return recommendations
     
     async def _save_learning_data(self):
-        """Save learning data to disk"""
-        try:
-            # Save feedback history
-            with open(os.path.join(self.learning_path, "feedback_history.json"), 'w') as f:
-                json.dump(self.feedback_history[-1000:], f, indent=2)  # Keep last 1000 entries
-            
-            # Save patterns
-            with open(os.path.join(self.learning_path, "patterns.json"), 'w') as f:
-                json.dump(self.patterns, f, indent=2)
-            
-            # Save preferences
-            with open(os.path.join(self.learning_path, "preferences.json"), 'w') as f:
-                json.dump(self.preferences, f, indent=2)
-        
-        except Exception as e:
-            print(f"Error saving learning data: {e}")
+        """Write pending learning data to disk now"""
+        await self.store.flush()
     
     def get_learning_stats(self) -> Dict[str, Any]:
         """Get statistics about the learning progress"""
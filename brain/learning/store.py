@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class LearningStore:
+    """
+    Write-behind persistence for LearningAdapter state
+
+    - ``feedback_history.jsonl``: one line per feedback entry, appended.
+      Rewritten with the newest ``history_limit`` entries once it holds
+      twice that many.
+    - ``patterns.json`` / ``preferences.json``: snapshots replaced atomically
+      (temp file + rename).
+
+    Changes are only marked dirty on the event loop. A flush runs
+    ``debounce_seconds`` after the first unsaved change, serializes the
+    patterns/preferences once on the loop and does its disk I/O in a worker
+    thread, so a burst of feedback costs one serialization and one write.
+    """
+
+    HISTORY_FILE = "feedback_history.jsonl"
+    LEGACY_HISTORY_FILE = "feedback_history.json"
+    PATTERNS_FILE = "patterns.json"
+    PREFERENCES_FILE = "preferences.json"
+
+    def __init__(self, path: str, debounce_seconds: float = 1.0, history_limit: int = 1000):
+        self.path = path
+        self.debounce_seconds = debounce_seconds
+        self.history_limit = history_limit
+        self._pending_feedback: List[Dict[str, Any]] = []
+        self._patterns: Dict[str, Any] = {}
+        self._preferences: Dict[str, Any] = {}
+        self._dirty = False
+        self._history_lines = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._io_lock = threading.Lock()
+        self.flush_count = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def load(self) -> Dict[str, Any]:
+        """Return ``feedback_history`` (newest ``history_limit``), ``patterns`` and ``preferences``"""
+        history: List[Dict[str, Any]] = []
+        if os.path.exists(self._file(self.HISTORY_FILE)):
+            with open(self._file(self.HISTORY_FILE), "r") as f:
+                for line in f:
+                    try:
+                        history.append(json.loads(line))
+                    except ValueError:
+                        continue
+            self._history_lines = len(history)
+        elif os.path.exists(self._file(self.LEGACY_HISTORY_FILE)):
+            with open(self._file(self.LEGACY_HISTORY_FILE), "r") as f:
+                history = json.load(f)
+            self._rewrite_history(history[-self.history_limit:])
+            os.replace(self._file(self.LEGACY_HISTORY_FILE), self._file(self.LEGACY_HISTORY_FILE) + ".migrated")
+
+        state = {"feedback_history": history[-self.history_limit:], "patterns": {}, "preferences": {}}
+        for key, name in (("patterns", self.PATTERNS_FILE), ("preferences", self.PREFERENCES_FILE)):
+            if os.path.exists(self._file(name)):
+                with open(self._file(name), "r") as f:
+                    state[key] = json.load(f)
+        return state
+
+    # ------------------------------------------------------------------
+    # Write-behind
+    # ------------------------------------------------------------------
+    def record(self, feedback_entry: Dict[str, Any], patterns: Dict[str, Any], preferences: Dict[str, Any]):
+        """Queue one feedback entry and mark patterns/preferences as changed"""
+        self._pending_feedback.append(feedback_entry)
+        self._patterns = patterns
+        self._preferences = preferences
+        self._dirty = True
+        self._schedule()
+
+    def _schedule(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        if self._timer is None:
+            self._timer = loop.call_later(self.debounce_seconds, self._start_flush)
+
+    def _start_flush(self):
+        self._timer = None
+        if self._flush_task is not None and not self._flush_task.done():
+            # Flush again once the running one has finished
+            self._flush_task.add_done_callback(lambda _: self._schedule())
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def _take(self):
+        feedback, self._pending_feedback = self._pending_feedback, []
+        state = None
+        if self._dirty:
+            # Serialized here, on the loop, so the worker thread never sees the dicts change
+            state = {
+                self.PATTERNS_FILE: json.dumps(self._patterns),
+                self.PREFERENCES_FILE: json.dumps(self._preferences),
+            }
+            self._dirty = False
+        return feedback, state
+
+    async def flush(self):
+        """Write pending changes now, off the event loop"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        feedback, state = self._take()
+        if feedback or state:
+            await asyncio.to_thread(self._write, feedback, state)
+
+    def flush_sync(self):
+        """Write pending changes from a thread without a running loop (shutdown)"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        feedback, state = self._take()
+        if feedback or state:
+            self._write(feedback, state)
+
+    def _write(self, feedback: List[Dict[str, Any]], state: Optional[Dict[str, str]]):
+        with self._io_lock:
+            try:
+                if feedback:
+                    with open(self._file(self.HISTORY_FILE), "a") as f:
+                        f.writelines(json.dumps(entry) + "\n" for entry in feedback)
+                    self._history_lines += len(feedback)
+                    if self._history_lines >= 2 * self.history_limit:
+                        self._compact_history()
+                for name, content in (state or {}).items():
+                    self._replace(name, content)
+                self.flush_count += 1
+            except Exception as e:
+                print(f"Error saving learning data: {e}")
+
+    def _replace(self, name: str, content: str):
+        tmp_path = self._file(name) + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file(name))
+
+    def _compact_history(self):
+        with open(self._file(self.HISTORY_FILE), "r") as f:
+            lines = f.readlines()[-self.history_limit:]
+        self._replace(self.HISTORY_FILE, "".join(lines))
+        self._history_lines = len(lines)
+
+    def _rewrite_history(self, history: List[Dict[str, Any]]):
+        self._replace(self.HISTORY_FILE, "".join(json.dumps(entry) + "\n" for entry in history))
+        self._history_lines = len(history)
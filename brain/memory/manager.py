@@ -3,13 +3,13 @@ import json
 import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-import numpy as np
 from collections import deque
-import pickle
 
 from ..core.interfaces import Memory, ThoughtProcess
 from ..core.config import MemoryConfig
 from ..utils.embeddings import EmbeddingGenerator
+from .store import LongTermMemoryStore
+from .vector_index import VectorIndex
 
 
 class MemoryManager:
@@ -21,21 +21,28 @@ class MemoryManager:
         self.config = config
         self.short_term_memory = deque(maxlen=config.max_short_term_items)
         self.long_term_memory = []
-        self.embeddings = EmbeddingGenerator(config.embedding_model)
+        # Normalized embeddings of each tier, searched with one matrix product
+        self.short_term_index = VectorIndex()
+        self.long_term_index = VectorIndex()
+        self.embeddings = EmbeddingGenerator(
+            config.embedding_model,
+            batch_window_ms=config.embedding_batch_window_ms,
+            max_batch_size=config.embedding_max_batch_size,
+            cache_size=config.embedding_cache_size,
+        )
         self.is_initialized = False
         
         os.makedirs(config.vector_db_path, exist_ok=True)
+        self.long_term_store = LongTermMemoryStore(config.vector_db_path)
         self._load_memories()
     
     def _load_memories(self):
         """Load memories from disk"""
-        memory_file = os.path.join(self.config.vector_db_path, "memories.pkl")
-        if os.path.exists(memory_file):
+        if self.long_term_store.exists():
             try:
-                with open(memory_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.long_term_memory = data.get('long_term', [])
-                    self.is_initialized = True
+                self.long_term_memory = self.long_term_store.load()
+                self.long_term_index.extend(self.long_term_memory)
+                self.is_initialized = True
             except Exception as e:
                 print(f"Error loading memories: {e}")
     
@@ -59,8 +66,11 @@ class MemoryManager:
         if self.config.enable_semantic_search:
             memory.embedding = await self.embeddings.generate(content)
         
-        # Add to short-term memory
+        # Add to short-term memory (the deque drops its oldest item when full)
+        if len(self.short_term_memory) == self.short_term_memory.maxlen:
+            self.short_term_index.remove(self.short_term_memory[0])
         self.short_term_memory.append(memory)
+        self.short_term_index.add(memory)
         
         # Consider promoting to long-term memory
         if memory.importance > 0.7:
@@ -89,10 +99,13 @@ class MemoryManager:
         if len(self.long_term_memory) >= self.config.max_long_term_items:
             # Remove least important memory
             self.long_term_memory.sort(key=lambda m: m.importance)
-            self.long_term_memory.pop(0)
+            evicted = self.long_term_memory.pop(0)
+            self.long_term_index.remove(evicted)
+            self.long_term_store.remove(evicted)
         
         self.long_term_memory.append(memory)
-        await self._save_memories()
+        self.long_term_index.add(memory)
+        self.long_term_store.append(memory, self.long_term_memory)
     
     async def retrieve_relevant(self, query: str, limit: int = 5) -> List[Memory]:
         """Retrieve memories relevant to the query"""
@@ -104,14 +117,12 @@ class MemoryManager:
         if self.config.enable_semantic_search and self.embeddings.is_available():
             # Semantic search
             query_embedding = await self.embeddings.generate(query)
-            scored_memories = []
-            
-            for memory in all_memories:
-                if memory.embedding:
-                    similarity = self._cosine_similarity(query_embedding, memory.embedding)
-                    scored_memories.append((similarity, memory))
+            scored_memories = (
+                self.short_term_index.search(query_embedding, limit)
+                + self.long_term_index.search(query_embedding, limit)
+            )
             
-            # Sort by similarity and return top matches
+            # Merge the top matches of both tiers
             scored_memories.sort(key=lambda x: x[0], reverse=True)
             return [m[1] for m in scored_memories[:limit]]
         else:
@@ -127,34 +138,20 @@ class MemoryManager:
             relevant.sort(key=lambda m: (m.importance, m.timestamp), reverse=True)
             return relevant[:limit]
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors"""
-        a = np.array(vec1)
-        b = np.array(vec2)
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-    
     async def forget_old_memories(self, days: int = 30):
         """Forget memories older than specified days"""
         cutoff_date = datetime.now() - timedelta(days=days)
         
         # Filter long-term memories
-        self.long_term_memory = [
-            m for m in self.long_term_memory 
-            if m.timestamp > cutoff_date or m.importance > 0.8
-        ]
-        
-        await self._save_memories()
-    
-    async def _save_memories(self):
-        """Save memories to disk"""
-        memory_file = os.path.join(self.config.vector_db_path, "memories.pkl")
-        data = {
-            'long_term': self.long_term_memory,
-            'saved_at': datetime.now().isoformat()
-        }
-        
-        with open(memory_file, 'wb') as f:
-            pickle.dump(data, f)
+        kept = []
+        for m in self.long_term_memory:
+            if m.timestamp > cutoff_date or m.importance > 0.8:
+                kept.append(m)
+            else:
+                self.long_term_store.remove(m)
+        self.long_term_memory = kept
+        self.long_term_index.retain(self.long_term_memory)
+        self.long_term_store.maybe_compact(self.long_term_memory)
     
     async def export_state(self) -> Dict[str, Any]:
         """Export memory state"""
@@ -172,6 +169,7 @@ class MemoryManager:
     def clear_short_term(self):
         """Clear short-term memory"""
         self.short_term_memory.clear()
+        self.short_term_index.clear()
     
     def get_summary(self) -> Dict[str, Any]:
         """Get memory statistics"""
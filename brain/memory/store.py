@@ -0,0 +1,271 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..core.interfaces import Memory
+
+
+class LongTermMemoryStore:
+    """
+    Append-only persistence for long-term memories.
+
+    - ``long_term.jsonl``: a header line naming the current vectors file, then
+      one ``add`` or ``remove`` record per change.
+    - ``long_term_vectors.<generation>.npy``: float32 embedding matrix with
+      spare capacity, memory-mapped; ``add`` records point at their row.
+
+    Promoting a memory writes one vector row and one log line. Loading parses
+    the log and maps the vectors without reading them; embeddings are views
+    into the map. The files are rewritten (compacted) when the vectors file is
+    full or removed records outnumber live ones. A rewrite writes a new
+    vectors generation first and then atomically replaces the log, so a crash
+    leaves either the old or the new pair.
+    """
+
+    LOG_FILE = "long_term.jsonl"
+    LEGACY_FILE = "memories.pkl"
+    INITIAL_CAPACITY = 256
+    COMPACT_MIN_DEAD = 1000
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.log_path = os.path.join(directory, self.LOG_FILE)
+        self._log = None
+        self._vectors: Optional[np.ndarray] = None
+        self._vectors_file: Optional[str] = None
+        self._generation = 0
+        self._rows_used = 0
+        self._next_key = 0
+        self._keys: Dict[int, int] = {}
+        self._live = 0
+        self._dead = 0
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def exists(self) -> bool:
+        return os.path.exists(self.log_path) or os.path.exists(os.path.join(self.directory, self.LEGACY_FILE))
+
+    def load(self) -> List[Memory]:
+        """Read the log and map the vectors; imports ``memories.pkl`` once if present."""
+        if not os.path.exists(self.log_path):
+            return self._import_legacy()
+
+        header: Dict[str, Any] = {}
+        records: Dict[int, Dict[str, Any]] = {}
+        removed = 0
+        last_key = -1
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn last line after a crash
+                    continue
+                op = record.get("op")
+                if op == "header":
+                    header = record
+                elif op == "add":
+                    records[record["key"]] = record
+                    last_key = max(last_key, record["key"])
+                elif op == "remove" and records.pop(record["key"], None) is not None:
+                    removed += 1
+
+        self._generation = header.get("generation", 0)
+        self._vectors_file = header.get("vectors")
+        if self._vectors_file and os.path.exists(os.path.join(self.directory, self._vectors_file)):
+            self._vectors = np.load(os.path.join(self.directory, self._vectors_file), mmap_mode="r+")
+        rows = [record["row"] for record in records.values() if record.get("row") is not None]
+        self._rows_used = header.get("rows_used", 0)
+        if rows:
+            self._rows_used = max(self._rows_used, max(rows) + 1)
+        self._next_key = max(last_key + 1, header.get("next_key", 0))
+
+        memories = []
+        for key, record in records.items():
+            memory = Memory(
+                content=record["content"],
+                timestamp=datetime.fromisoformat(record["timestamp"]),
+                importance=record["importance"],
+                metadata=record.get("metadata") or {},
+            )
+            row = record.get("row")
+            if row is not None and self._vectors is not None and row < self._vectors.shape[0]:
+                memory.embedding = self._vectors[row]
+            self._keys[id(memory)] = key
+            memories.append(memory)
+
+        self._live = len(memories)
+        self._dead = removed
+        if self._needs_compaction():
+            self.compact(memories)
+        return memories
+
+    def _import_legacy(self) -> List[Memory]:
+        legacy_path = os.path.join(self.directory, self.LEGACY_FILE)
+        if not os.path.exists(legacy_path):
+            return []
+        import pickle
+
+        with open(legacy_path, "rb") as f:
+            memories = pickle.load(f).get("long_term", [])
+        self.compact(memories)
+        os.replace(legacy_path, legacy_path + ".migrated")
+        return memories
+
+    # ------------------------------------------------------------------
+    # Changes
+    # ------------------------------------------------------------------
+    def append(self, memory: Memory, memories: List[Memory]):
+        """
+        Persist one promoted memory: one vector row and one log line.
+
+        ``memories`` is the whole long-term list, already including
+        ``memory``; it is rewritten instead when the vectors file is full.
+        """
+        vector = self._vector_of(memory)
+        fits = vector is not None and (self._vectors is None or vector.shape[0] == self._vectors.shape[1])
+        if fits and (self._vectors is None or self._rows_used >= self._vectors.shape[0]):
+            self._rewrite(memories)
+            return
+
+        row = None
+        if fits:
+            row = self._rows_used
+            self._vectors[row] = vector
+            self._rows_used += 1
+
+        key = self._next_key
+        self._next_key += 1
+        self._keys[id(memory)] = key
+        self._write({"op": "add", "key": key, "row": row, **self._describe(memory)})
+        self._live += 1
+
+    def remove(self, memory: Memory):
+        key = self._keys.pop(id(memory), None)
+        if key is None:
+            return
+        self._write({"op": "remove", "key": key})
+        self._live -= 1
+        self._dead += 1
+
+    def compact(self, memories: List[Memory]):
+        """Rewrite the files with ``memories`` only."""
+        self._rewrite(memories)
+
+    def maybe_compact(self, memories: List[Memory]):
+        if self._needs_compaction():
+            self.compact(memories)
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._vectors is not None:
+            self._vectors.flush()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _needs_compaction(self) -> bool:
+        return self._dead >= self.COMPACT_MIN_DEAD and self._dead > self._live
+
+    @staticmethod
+    def _vector_of(memory: Memory) -> Optional[np.ndarray]:
+        if memory.embedding is None or len(memory.embedding) == 0:
+            return None
+        return np.asarray(memory.embedding, dtype=np.float32)
+
+    @staticmethod
+    def _describe(memory: Memory) -> Dict[str, Any]:
+        return {
+            "content": memory.content,
+            "timestamp": memory.timestamp.isoformat(),
+            "importance": memory.importance,
+            "metadata": memory.metadata,
+        }
+
+    def _write(self, record: Dict[str, Any]):
+        if self._log is None:
+            if not os.path.exists(self.log_path):
+                # First record without a prior rewrite: start the log with a
+                # header describing the current state, leaving that state as is
+                header = {
+                    "op": "header",
+                    "generation": self._generation,
+                    "vectors": self._vectors_file,
+                    "rows_used": self._rows_used,
+                    "next_key": self._next_key,
+                }
+                with open(self.log_path, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(header) + "\n")
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        self._log.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._log.flush()
+
+    def _rewrite(self, memories: List[Memory]):
+        vectors = [self._vector_of(m) for m in memories]
+        dimension = next((v.shape[0] for v in vectors if v is not None), None)
+        if dimension is None and self._vectors is not None:
+            dimension = self._vectors.shape[1]
+
+        generation = self._generation + 1
+        vectors_file = None
+        new_vectors = None
+        rows = [None] * len(memories)
+        if dimension is not None:
+            usable = [i for i, v in enumerate(vectors) if v is not None and v.shape[0] == dimension]
+            capacity = max(self.INITIAL_CAPACITY, 2 * len(usable))
+            vectors_file = f"long_term_vectors.{generation}.npy"
+            new_vectors = np.lib.format.open_memmap(
+                os.path.join(self.directory, vectors_file), mode="w+", dtype=np.float32, shape=(capacity, dimension)
+            )
+            for row, index in enumerate(usable):
+                new_vectors[row] = vectors[index]
+                rows[index] = row
+            new_vectors.flush()
+            rows_used = len(usable)
+        else:
+            rows_used = 0
+
+        tmp_path = self.log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            header = {
+                "op": "header",
+                "generation": generation,
+                "vectors": vectors_file,
+                "rows_used": rows_used,
+                "next_key": len(memories),
+            }
+            f.write(json.dumps(header) + "\n")
+            for key, memory in enumerate(memories):
+                record = {"op": "add", "key": key, "row": rows[key], **self._describe(memory)}
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        os.replace(tmp_path, self.log_path)
+
+        old_vectors_file = self._vectors_file
+        self._vectors = new_vectors
+        self._vectors_file = vectors_file
+        self._generation = generation
+        self._rows_used = rows_used
+        self._next_key = len(memories)
+        self._keys = {id(memory): key for key, memory in enumerate(memories)}
+        self._live = len(memories)
+        self._dead = 0
+        for memory, row in zip(memories, rows):
+            if row is not None:
+                memory.embedding = new_vectors[row]
+        if old_vectors_file and old_vectors_file != vectors_file:
+            try:
+                os.remove(os.path.join(self.directory, old_vectors_file))
+            except OSError:
+                pass
@@ -0,0 +1,117 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.interfaces import Memory
+
+
+class VectorIndex:
+    """
+    Embedding index over memories, kept as one contiguous float32 matrix.
+
+    Rows are L2-normalized when added, so a query is a single matrix-vector
+    product followed by a top-k selection. Removal moves the last row into the
+    freed slot; row order carries no meaning.
+    """
+
+    def __init__(self, initial_capacity: int = 64):
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._memories: List[Memory] = []
+        self._rows: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._memories)
+
+    def __contains__(self, memory: Memory) -> bool:
+        return id(memory) in self._rows
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _reserve(self, dimension: int, rows: int):
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, rows)
+            self._matrix = np.empty((capacity, dimension), dtype=np.float32)
+            return
+        needed = len(self._memories) + rows
+        if needed > self._matrix.shape[0]:
+            grown = np.empty((max(needed, self._matrix.shape[0] * 2), dimension), dtype=np.float32)
+            grown[:len(self._memories)] = self._matrix[:len(self._memories)]
+            self._matrix = grown
+
+    def add(self, memory: Memory) -> bool:
+        """Index ``memory``; returns False when it has no usable embedding."""
+        return self.extend([memory]) == 1
+
+    def extend(self, memories: Iterable[Memory]) -> int:
+        """Index several memories with one copy; returns how many were added."""
+        # Embeddings are lists, or array views when loaded from the store
+        batch = [
+            m for m in memories
+            if m.embedding is not None and len(m.embedding) and id(m) not in self._rows
+        ]
+        if not batch:
+            return 0
+        dimension = self.dimension or len(batch[0].embedding)
+        # Embeddings from another model (older pickles) cannot be compared
+        batch = [m for m in batch if len(m.embedding) == dimension]
+        if not batch:
+            return 0
+
+        vectors = self._normalize(np.asarray([m.embedding for m in batch], dtype=np.float32))
+        self._reserve(dimension, len(batch))
+        start = len(self._memories)
+        self._matrix[start:start + len(batch)] = vectors
+        for offset, memory in enumerate(batch):
+            self._rows[id(memory)] = start + offset
+            self._memories.append(memory)
+        return len(batch)
+
+    def remove(self, memory: Memory) -> bool:
+        row = self._rows.pop(id(memory), None)
+        if row is None:
+            return False
+        last = len(self._memories) - 1
+        if row != last:
+            moved = self._memories[last]
+            self._matrix[row] = self._matrix[last]
+            self._memories[row] = moved
+            self._rows[id(moved)] = row
+        self._memories.pop()
+        return True
+
+    def retain(self, memories: Iterable[Memory]):
+        """Keep only ``memories``, compacting the matrix in one gather."""
+        keep = [self._rows[id(m)] for m in memories if id(m) in self._rows]
+        if len(keep) == len(self._memories):
+            return
+        self._matrix = self._matrix[keep] if keep else None
+        self._memories = [self._memories[row] for row in keep]
+        self._rows = {id(m): row for row, m in enumerate(self._memories)}
+
+    def clear(self):
+        self._matrix = None
+        self._memories = []
+        self._rows = {}
+
+    def search(self, query: Sequence[float], limit: int) -> List[Tuple[float, Memory]]:
+        """Top ``limit`` memories by cosine similarity to ``query``, best first."""
+        size = len(self._memories)
+        if not size or limit <= 0 or query is None or len(query) != self.dimension:
+            return []
+
+        query_vector = self._normalize(np.asarray(query, dtype=np.float32))
+        scores = self._matrix[:size] @ query_vector
+        if limit < size:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(size)
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(float(scores[row]), self._memories[row]) for row in top]
@@ -1,18 +1,43 @@
 import asyncio
-from typing import List, Optional
+import hashlib
+import importlib.util
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 
 
 class EmbeddingGenerator:
     """
     Handles text embedding generation for semantic search
+
+    The model is loaded on first use, not at construction. Concurrent
+    ``generate()`` calls arriving within ``batch_window_ms`` are coalesced
+    into one ``encode`` call, and embeddings are kept in an LRU cache keyed
+    by the text hash.
     """
-    
-    def __init__(self, model_name: Optional[str] = None):
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 64,
+        cache_size: int = 2048,
+    ):
         self.model_name = model_name or "sentence-transformers/all-MiniLM-L6-v2"
         self.model = None
-        self._initialize_model()
-    
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache_size = cache_size
+        self._available = importlib.util.find_spec("sentence_transformers") is not None
+        if not self._available:
+            print("sentence-transformers not installed. Semantic search disabled.")
+        self._model_lock: Optional[asyncio.Lock] = None
+        self._cache: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._loop = None
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._flush_handle = None
+        self._stats = {'requests': 0, 'cache_hits': 0, 'batches': 0, 'encoded_texts': 0, 'largest_batch': 0}
+
     def _initialize_model(self):
         """Initialize the embedding model"""
         try:
@@ -21,53 +46,150 @@ class EmbeddingGenerator:
         except ImportError:
             print("sentence-transformers not installed. Semantic search disabled.")
             self.model = None
-    
-    def is_available(self) -> bool:
-        """Check if embedding model is available"""
+            self._available = False
+        except Exception as e:
+            # e.g. OSError when the model cannot be downloaded; do not retry on every call
+            print(f"Error loading embedding model {self.model_name}: {e}. Semantic search disabled.")
+            self.model = None
+            self._available = False
+
+    async def _ensure_model(self) -> bool:
+        """Load the model once, off the event loop"""
+        if self.model is None and self._available:
+            if self._model_lock is None:
+                self._model_lock = asyncio.Lock()
+            async with self._model_lock:
+                if self.model is None and self._available:
+                    await asyncio.to_thread(self._initialize_model)
         return self.model is not None
-    
+
+    def is_available(self) -> bool:
+        """Check if embedding model is available (without loading it)"""
+        return self._available
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[List[float]]:
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        self._cache.move_to_end(key)
+        self._stats['cache_hits'] += 1
+        return list(cached)
+
+    def _cache_put(self, key: str, embedding: List[float]):
+        self._cache[key] = tuple(embedding)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _encode(self, texts: List[str]) -> List[List[float]]:
+        embeddings = await asyncio.to_thread(
+            self.model.encode, texts, convert_to_numpy=True
+        )
+        self._stats['batches'] += 1
+        self._stats['encoded_texts'] += len(texts)
+        self._stats['largest_batch'] = max(self._stats['largest_batch'], len(texts))
+        return [emb.tolist() for emb in embeddings]
+
     async def generate(self, text: str) -> Optional[List[float]]:
         """
         Generate embedding for the given text
         """
-        if not self.model:
+        if not await self._ensure_model():
             return None
-        
+
+        self._stats['requests'] += 1
+        key = self._key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pending work of a previous event loop can never complete
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+
+        future = loop.create_future()
+        self._pending.append((key, text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(self.batch_window)
+        return await future
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = self._loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            self._loop.create_task(self._flush(pending))
+
+    async def _flush(self, pending: List[Tuple[str, str, asyncio.Future]]):
+        # Identical texts in the same window are encoded once
+        texts: Dict[str, str] = {}
+        for key, text, _ in pending:
+            texts.setdefault(key, text)
         try:
-            # Run in thread pool to avoid blocking
-            embedding = await asyncio.to_thread(
-                self.model.encode, [text], convert_to_numpy=True
-            )
-            return embedding[0].tolist()
+            embeddings = dict(zip(texts, await self._encode(list(texts.values()))))
         except Exception as e:
             print(f"Error generating embedding: {e}")
-            return None
-    
+            embeddings = {}
+        for key, embedding in embeddings.items():
+            self._cache_put(key, embedding)
+        for key, _, future in pending:
+            if not future.done():
+                embedding = embeddings.get(key)
+                future.set_result(list(embedding) if embedding is not None else None)
+
     async def generate_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
         """
         Generate embeddings for multiple texts
         """
-        if not self.model:
+        if not await self._ensure_model():
             return [None] * len(texts)
-        
+
+        keys = [self._key(text) for text in texts]
+        results: List[Optional[List[float]]] = [self._cache_get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
         try:
-            embeddings = await asyncio.to_thread(
-                self.model.encode, texts, convert_to_numpy=True
-            )
-            return [emb.tolist() for emb in embeddings]
+            embeddings = await self._encode([texts[i] for i in missing])
         except Exception as e:
             print(f"Error generating batch embeddings: {e}")
-            return [None] * len(texts)
-    
+            return results
+        for i, embedding in zip(missing, embeddings):
+            self._cache_put(keys[i], embedding)
+            results[i] = embedding
+        return results
+
+    def get_stats(self) -> Dict[str, float]:
+        """Batching and cache counters"""
+        return {
+            **self._stats,
+            'cached_embeddings': len(self._cache),
+            'model_loaded': self.model is not None,
+        }
+
     def calculate_similarity(self, emb1: List[float], emb2: List[float]) -> float:
         """
         Calculate cosine similarity between two embeddings
         """
         if not emb1 or not emb2:
             return 0.0
-        
+
         a = np.array(emb1)
         b = np.array(emb2)
-        
+
         cos_sim = np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-        return float(cos_sim)
\ No newline at end of file
+        return float(cos_sim)
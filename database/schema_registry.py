@@ -0,0 +1,81 @@
+"""
+Process-wide cache of runtime-discovered table columns.
+
+Some legacy tables (``financial_data``) exist with different column names
+across environments, so routes pick their columns at runtime. The registry
+introspects each table once per engine and also caches objects derived from
+the column set (resolved mappings, precompiled SQL statements).
+
+Call ``schema_registry.refresh()`` after applying a migration to a running
+process; the API also refreshes on startup.
+"""
+import threading
+import weakref
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import inspect
+
+
+class SchemaRegistry:
+    """Thread-safe cache of table columns and derived objects, per engine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns: "weakref.WeakKeyDictionary[Any, Dict[str, FrozenSet[str]]]" = weakref.WeakKeyDictionary()
+        self._compiled: "weakref.WeakKeyDictionary[Any, Dict[Tuple[str, str], Any]]" = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _engine(bind):
+        # Sessions return an Engine or a Connection depending on how they were bound
+        bind = bind.get_bind() if hasattr(bind, 'get_bind') else bind
+        return getattr(bind, 'engine', bind)
+
+    def get_columns(self, bind, table: str) -> FrozenSet[str]:
+        """
+        Column names of ``table``; an empty set if it does not exist.
+
+        Missing tables are not cached, so a table created later is picked up.
+        """
+        engine = self._engine(bind)
+        with self._lock:
+            cached = self._columns.get(engine, {}).get(table)
+        if cached is not None:
+            return cached
+
+        inspector = inspect(engine)
+        if not inspector.has_table(table):
+            return frozenset()
+        columns = frozenset(column['name'] for column in inspector.get_columns(table))
+        with self._lock:
+            self._columns.setdefault(engine, {})[table] = columns
+        return columns
+
+    def get_compiled(self, bind, table: str, name: str, builder: Callable[[FrozenSet[str]], Any]) -> Any:
+        """Return ``builder(columns)`` for ``table``, built once per engine and column set."""
+        engine = self._engine(bind)
+        columns = self.get_columns(engine, table)
+        if not columns:
+            return builder(columns)
+        key = (table, name)
+        with self._lock:
+            cached = self._compiled.get(engine, {}).get(key)
+        if cached is not None:
+            return cached
+        compiled = builder(columns)
+        with self._lock:
+            self._compiled.setdefault(engine, {})[key] = compiled
+        return compiled
+
+    def refresh(self, table: Optional[str] = None) -> None:
+        """Forget cached columns (of one table, or all) so they are introspected again."""
+        with self._lock:
+            for store in (self._columns, self._compiled):
+                for entries in store.values():
+                    if table is None:
+                        entries.clear()
+                        continue
+                    for key in [key for key in entries if key == table or (isinstance(key, tuple) and key[0] == table)]:
+                        del entries[key]
+
+
+schema_registry = SchemaRegistry()
@@ -1,13 +1,20 @@
 """
 Audit log model for tracking user actions
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.connection import Base
 
 class AuditLog(Base):
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        # Keyset pagination of /admin/audit-logs (schema/migrations/007_audit_logs_keyset_indexes.sql)
+        Index('idx_audit_company_created', 'company_id', 'created_at', 'id'),
+        Index('idx_audit_company_user_created', 'company_id', 'user_id', 'created_at', 'id'),
+        Index('idx_audit_company_action_created', 'company_id', 'action', 'created_at', 'id'),
+        Index('idx_audit_company_resource_created', 'company_id', 'resource', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
@@ -34,6 +41,9 @@ class AuditLog(Base):
                    company_id: int = None):
         """Create an audit log entry
 
+        While the audit sink (services/audit_sink.py) is running the entry is
+        written in a batch after ``db`` commits; otherwise it is added to ``db``.
+
         Args:
             db: Database session
             user_id: ID of the user performing the action (can be None for system actions)
@@ -48,7 +58,8 @@ class AuditLog(Base):
         # Derive company_id from user if not provided
         if company_id is None and user_id is not None:
             from models import User
-            user = db.query(User).filter(User.id == user_id).first()
+            # Usually already in the session identity map: no query
+            user = db.get(User, user_id)
             if user:
                 company_id = user.company_id
             else:
@@ -68,5 +79,15 @@ class AuditLog(Base):
             ip_address=ip_address,
             user_agent=user_agent
         )
-        db.add(log_entry)
-        return log_entry
\ No newline at end of file
+
+        from services.audit_sink import audit_sink, defer_audit_row
+        if audit_sink.running:
+            # created_at stays with the server default, as for rows added here
+            defer_audit_row(db, {
+                column.key: getattr(log_entry, column.key)
+                for column in cls.__table__.columns
+                if column.key not in ('id', 'created_at')
+            })
+        else:
+            db.add(log_entry)
+        return log_entry
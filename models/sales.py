@@ -1,7 +1,7 @@
 """
 Modelos SQLAlchemy para módulo BI de ventas
 """
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, DateTime, Enum, Boolean, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, DateTime, Enum, Boolean, Text, ForeignKey, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, relationship
 from sqlalchemy.sql import func
 from database.connection import Base
@@ -15,6 +15,21 @@ if TYPE_CHECKING:
 class SalesTransaction(Base):
     """Transacción de venta individual"""
     __tablename__ = 'sales_transactions'
+    __table_args__ = (
+        UniqueConstraint('company_id', 'row_hash', name='uq_sales_company_row_hash'),
+        # Índices por tenant para las consultas BI (schema/migrations/006_sales_bi_composite_indexes.sql)
+        Index('idx_sales_company_year_month', 'company_id', 'year', 'month'),
+        Index(
+            'idx_sales_company_period_cover',
+            'company_id', 'year', 'month', 'numero_factura',
+            'venta_neta', 'venta_bruta', 'descuento', 'costo_venta', 'rentabilidad', 'm2',
+        ),
+        Index('idx_sales_company_categoria_period', 'company_id', 'categoria_producto', 'year', 'month'),
+        Index('idx_sales_company_canal_period', 'company_id', 'canal_comercial', 'year', 'month'),
+        Index('idx_sales_company_vendedor_period', 'company_id', 'vendedor', 'year', 'month'),
+        Index('idx_sales_company_cliente_period', 'company_id', 'razon_social', 'year', 'month'),
+        Index('idx_sales_company_producto_period', 'company_id', 'producto', 'year', 'month'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -46,6 +61,7 @@ class SalesTransaction(Base):
     rentabilidad = Column(DECIMAL(12, 2), default=0)
 
     # Metadata
+    row_hash = Column(String(64), nullable=True)  # SHA-256 de factura+producto+fecha+cantidad+venta_neta (deduplicación)
     company_id = Column(Integer, ForeignKey('companies.id', ondelete='RESTRICT'), nullable=False, default=1, index=True)
     created_at = Column(DateTime, server_default=func.current_timestamp())
     updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
@@ -85,6 +101,12 @@ class SalesTransaction(Base):
 class SalesKPICache(Base):
     """Cache de KPIs calculados para performance"""
     __tablename__ = 'sales_kpis_cache'
+    __table_args__ = (
+        Index(
+            'idx_sales_kpis_company_dimension_period',
+            'company_id', 'dimension_type', 'dimension_value', 'year', 'month',
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
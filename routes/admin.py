@@ -1,15 +1,21 @@
 """
 Administration routes for roles, permissions and system management
 """
+import base64
+import json
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 
 from database.connection import get_db
 from models import User, Role, Permission, AuditLog
 from auth.dependencies import require_permission, require_superuser, get_current_user
+from services.audit_sink import audit_sink
 
 router = APIRouter(prefix="/admin", tags=["Administration"])
 
@@ -336,49 +342,180 @@ async def list_resources(
 # AUDIT LOGS
 # ============================================
 
+AUDIT_EXPORT_BATCH_SIZE = 1000
+AUDIT_APPROXIMATE_COUNT_CAP = 10000
+
+
+def _encode_audit_cursor(created_at: datetime, log_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_audit_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, log_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _audit_log_query(
+    db: Session,
+    current_user: User,
+    user_id: Optional[int],
+    action: Optional[str],
+    action_match: str,
+    resource: Optional[str],
+):
+    """Filtered audit log query, tenant-scoped like /admin/stats, with the username joined in."""
+    query = db.query(AuditLog, User.username).outerjoin(User, AuditLog.user_id == User.id)
+
+    # Superusers see every tenant; the (company_id, ...) indexes serve the rest
+    if not current_user.is_superuser:
+        query = query.filter(AuditLog.company_id == current_user.company_id)
+
+    if user_id:
+        query = query.filter(AuditLog.user_id == user_id)
+
+    if action:
+        if action_match == "exact":
+            query = query.filter(AuditLog.action == action)
+        elif action_match == "prefix":
+            query = query.filter(AuditLog.action.startswith(action, autoescape=True))
+        else:
+            # LIKE '%x%' cannot use an index; kept for ad-hoc searches
+            query = query.filter(AuditLog.action.contains(action, autoescape=True))
+
+    if resource:
+        query = query.filter(AuditLog.resource == resource)
+
+    return query
+
+
+def _after_audit_cursor(query, created_at: datetime, log_id: int):
+    """Rows strictly after (created_at, id) in (created_at DESC, id DESC) order."""
+    return query.filter(or_(
+        AuditLog.created_at < created_at,
+        and_(AuditLog.created_at == created_at, AuditLog.id < log_id),
+    ))
+
+
+def _serialize_audit_log(log: AuditLog, username: Optional[str]) -> dict:
+    return {
+        "id": log.id,
+        "user_id": log.user_id,
+        "username": username,
+        "action": log.action,
+        "resource": log.resource,
+        "resource_id": log.resource_id,
+        "details": log.details,
+        "ip_address": log.ip_address,
+        "created_at": log.created_at
+    }
+
+
 @router.get("/audit-logs")
 async def get_audit_logs(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    skip: int = Query(0, ge=0, description="Deprecated offset pagination, ignored when cursor is set"),
     limit: int = Query(100, ge=1, le=1000),
     user_id: Optional[int] = Query(None),
     action: Optional[str] = Query(None),
+    action_match: Literal["prefix", "exact", "contains"] = Query("contains"),
     resource: Optional[str] = Query(None),
+    count: Literal["none", "approximate", "exact"] = Query("exact"),
     current_user: User = Depends(require_permission("system", "audit")),
     db: Session = Depends(get_db)
 ):
-    """Get audit logs (requires system:audit permission)"""
-    
-    query = db.query(AuditLog)
-    
-    if user_id:
-        query = query.filter(AuditLog.user_id == user_id)
-    
-    if action:
-        query = query.filter(AuditLog.action.contains(action))
-    
-    if resource:
-        query = query.filter(AuditLog.resource == resource)
-    
-    logs = query.order_by(AuditLog.created_at.desc()).offset(skip).limit(limit).all()
-    
+    """Get audit logs, newest first (requires system:audit permission)
+
+    Pages are keyed on (created_at, id): pass the returned ``next_cursor`` to
+    get the next page. ``action`` is a substring match and ``total`` an exact
+    count by default; ``action_match=prefix`` can use the action index and
+    ``count=approximate`` counts at most AUDIT_APPROXIMATE_COUNT_CAP rows and
+    reports ``total_is_exact``.
+    """
+
+    query = _audit_log_query(db, current_user, user_id, action, action_match, resource)
+
+    page_query = query
+    if cursor:
+        page_query = _after_audit_cursor(page_query, *_decode_audit_cursor(cursor))
+    page_query = page_query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+    if skip and not cursor:
+        page_query = page_query.offset(skip)
+
+    # One extra row tells whether there is a next page
+    rows = page_query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last_log = rows[-1][0]
+        next_cursor = _encode_audit_cursor(last_log.created_at, last_log.id)
+
+    total = None
+    total_is_exact = None
+    if count == "exact":
+        total = query.count()
+        total_is_exact = True
+    elif count == "approximate":
+        capped = query.with_entities(AuditLog.id).limit(AUDIT_APPROXIMATE_COUNT_CAP + 1).subquery()
+        total = db.query(func.count()).select_from(capped).scalar()
+        total_is_exact = total <= AUDIT_APPROXIMATE_COUNT_CAP
+        total = min(total, AUDIT_APPROXIMATE_COUNT_CAP)
+
     return {
-        "logs": [
-            {
-                "id": log.id,
-                "user_id": log.user_id,
-                "username": log.user.username if log.user else None,
-                "action": log.action,
-                "resource": log.resource,
-                "resource_id": log.resource_id,
-                "details": log.details,
-                "ip_address": log.ip_address,
-                "created_at": log.created_at
-            }
-            for log in logs
-        ],
-        "total": query.count()
+        "logs": [_serialize_audit_log(log, username) for log, username in rows],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+        "total": total,
+        "total_is_exact": total_is_exact
     }
 
+
+@router.get("/audit-logs/export")
+async def export_audit_logs(
+    user_id: Optional[int] = Query(None),
+    action: Optional[str] = Query(None),
+    action_match: Literal["prefix", "exact", "contains"] = Query("contains"),
+    resource: Optional[str] = Query(None),
+    current_user: User = Depends(require_permission("system", "audit")),
+    db: Session = Depends(get_db)
+):
+    """Stream every matching audit log as NDJSON (requires system:audit permission)
+
+    Rows are read in keyset batches, so the export never holds the whole
+    table in memory nor keeps a long-running query open.
+    """
+
+    query = _audit_log_query(db, current_user, user_id, action, action_match, resource)
+    query = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+
+    def generate():
+        page_query = query
+        while True:
+            rows = page_query.limit(AUDIT_EXPORT_BATCH_SIZE).all()
+            for log, username in rows:
+                yield json.dumps(jsonable_encoder(_serialize_audit_log(log, username)), ensure_ascii=False) + "\n"
+            if len(rows) < AUDIT_EXPORT_BATCH_SIZE:
+                break
+            last_log = rows[-1][0]
+            page_query = _after_audit_cursor(query, last_log.created_at, last_log.id)
+            # Release the identity map between batches
+            db.expunge_all()
+
+    filename = f"audit_logs_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.ndjson"
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # ============================================
 # SYSTEM STATS
 # ============================================
@@ -450,5 +587,6 @@ async def get_system_stats(
         },
         "activity": {
             "recent_logins": recent_logins
-        }
+        },
+        "audit_sink": audit_sink.stats()
     }
\ No newline at end of file
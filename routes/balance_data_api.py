@@ -5,13 +5,15 @@ consultar reportes y obtener métricas financieras clave.
 """
 from __future__ import annotations
 
+import time
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, List, Optional, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field, validator
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
 from auth.dependencies import get_current_user, require_permission
@@ -20,15 +22,22 @@ from database.connection import get_db
 from models.balance import BalanceData, RawBalanceData, BalanceConfig
 from models.user import User
 from services.balance_processor import (
+    balance_hierarchy,
     build_balance_tree,
     compute_balance_core,
     calculate_ratios,
     fetch_financial_summary,
     aggregate_balance_trends,
+    get_balance_snapshot,
+    invalidate_balance_period,
+    BalanceSnapshot,
 )
 
 router = APIRouter(prefix="/api/balance", tags=["Balance General"])
 
+# Filas por INSERT multi-fila en la carga de balances
+BALANCE_INSERT_BATCH_SIZE = 1000
+
 
 def _get_company_id(current_user: User) -> int:
     tenant_id = get_current_tenant()
@@ -168,6 +177,35 @@ def _dict_to_tree(nodes: List[Dict[str, object]]) -> List[BalanceTreeNode]:
     return [convert(node) for node in nodes]
 
 
+def _snapshot_response(request: Request, snapshot: BalanceSnapshot) -> Response:
+    """Responder desde el snapshot serializado; 304 si el cliente ya tiene esta versión."""
+    headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if snapshot.etag in {tag.strip() for tag in if_none_match.split(",")} or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def _period_rows(db: Session, company_id: int, year: int, month: Optional[int]) -> List[BalanceData]:
+    rows: List[BalanceData] = (
+        db.query(BalanceData)
+        .filter(
+            BalanceData.company_id == company_id,
+            BalanceData.period_year == year,
+            BalanceData.period_month == month,
+        )
+        .order_by(BalanceData.level.asc(), BalanceData.account_code.asc())
+        .all()
+    )
+
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No se encontraron datos de balance para el periodo seleccionado.",
+        )
+    return rows
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -179,62 +217,86 @@ def upload_balance_data(
     db: Session = Depends(get_db),
 ):
     company_id = _get_company_id(current_user)
-
-    if payload.replace_existing:
-        db.query(BalanceData).filter(
-            BalanceData.company_id == company_id,
-            BalanceData.period_year == payload.year,
-            BalanceData.period_month == payload.month,
-        ).delete(synchronize_session=False)
-
-        db.query(RawBalanceData).filter(
-            RawBalanceData.company_id == company_id,
-            RawBalanceData.period_year == payload.year,
-            RawBalanceData.period_month == payload.month,
-        ).delete(synchronize_session=False)
-
-    # Insertar nuevos registros
+    started = time.perf_counter()
+
+    # Nivel y padre calculados para toda la columna de códigos
+    codes = [row.code for row in payload.rows]
+    levels, parents = balance_hierarchy(codes)
+    now = datetime.utcnow()
+    balance_rows = []
+    raw_rows = []
     for idx, row in enumerate(payload.rows):
-        level = row.code.count(".") + 1
-        parent = _parent_code(row.code)
-
-        db.add(
-            BalanceData(
-                company_id=company_id,
-                period_year=payload.year,
-                period_month=payload.month,
-                account_code=row.code,
-                account_name=row.name,
-                level=level,
-                parent_code=parent,
-                balance=_decimal(row.value),
-            )
-        )
-
-        db.add(
-            RawBalanceData(
-                company_id=company_id,
-                period_year=payload.year,
-                period_month=payload.month,
-                row_index=idx,
-                account_code=row.code,
-                account_name=row.name,
-                balance=_decimal(row.value),
-                extra=None,
-            )
-        )
-
-    db.commit()
+        balance = _decimal(row.value)
+        balance_rows.append({
+            "company_id": company_id,
+            "period_year": payload.year,
+            "period_month": payload.month,
+            "account_code": row.code,
+            "account_name": row.name,
+            "level": levels[idx],
+            "parent_code": parents[idx],
+            "balance": balance,
+            "created_at": now,
+            "updated_at": now,
+        })
+        raw_rows.append({
+            "company_id": company_id,
+            "period_year": payload.year,
+            "period_month": payload.month,
+            "row_index": idx,
+            "account_code": row.code,
+            "account_name": row.name,
+            "balance": balance,
+            "created_at": now,
+        })
+    prepared_at = time.perf_counter()
+
+    # Borrado e inserción en una sola transacción
+    try:
+        deleted = 0
+        if payload.replace_existing:
+            deleted = db.query(BalanceData).filter(
+                BalanceData.company_id == company_id,
+                BalanceData.period_year == payload.year,
+                BalanceData.period_month == payload.month,
+            ).delete(synchronize_session=False)
+
+            db.query(RawBalanceData).filter(
+                RawBalanceData.company_id == company_id,
+                RawBalanceData.period_year == payload.year,
+                RawBalanceData.period_month == payload.month,
+            ).delete(synchronize_session=False)
+        deleted_at = time.perf_counter()
+
+        for start in range(0, len(balance_rows), BALANCE_INSERT_BATCH_SIZE):
+            db.execute(insert(BalanceData), balance_rows[start:start + BALANCE_INSERT_BATCH_SIZE])
+            db.execute(insert(RawBalanceData), raw_rows[start:start + BALANCE_INSERT_BATCH_SIZE])
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finished = time.perf_counter()
+    invalidate_balance_period(company_id, payload.year, payload.month)
 
     return {
         "success": True,
         "message": "Balance cargado correctamente",
         "rows": len(payload.rows),
+        "deleted": int(deleted),
+        "timings": {
+            "prepare_ms": round((prepared_at - started) * 1000, 1),
+            "delete_ms": round((deleted_at - prepared_at) * 1000, 1),
+            "insert_ms": round((finished - deleted_at) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1),
+            "rows_per_second": round(len(payload.rows) / (finished - started), 1) if finished > started else None,
+        },
     }
 
 
 @router.get("/data", response_model=BalanceDataAPIResponse)
 def get_balance_data(
+    request: Request,
     year: int = Query(..., ge=1900, le=2100),
     month: Optional[int] = Query(None, ge=1, le=12),
     current_user: User = Depends(get_current_user),
@@ -242,53 +304,42 @@ def get_balance_data(
 ):
     company_id = _get_company_id(current_user)
 
-    rows: List[BalanceData] = (
-        db.query(BalanceData)
-        .filter(
-            BalanceData.company_id == company_id,
-            BalanceData.period_year == year,
-            BalanceData.period_month == month,
+    def build():
+        rows = _period_rows(db, company_id, year, month)
+        totals, metrics_map = compute_balance_core(rows)
+        tree_dict = build_balance_tree(rows)
+        tree_nodes = _dict_to_tree(tree_dict)
+        last_updated = max((r.updated_at for r in rows if r.updated_at), default=None)
+
+        metrics = BalanceMetrics(
+            activos=totals.get("activos", 0.0),
+            pasivos=totals.get("pasivos", 0.0),
+            patrimonio=totals.get("patrimonio", 0.0),
+            capital_trabajo=metrics_map.get("capital_trabajo", 0.0),
+            liquidez_corriente=metrics_map.get("liquidez_corriente"),
+            razon_rapida=metrics_map.get("razon_rapida"),
+            endeudamiento=metrics_map.get("endeudamiento"),
+            deuda_capital=metrics_map.get("deuda_capital"),
+            balance_check=metrics_map.get("balance_check", 0.0),
         )
-        .order_by(BalanceData.level.asc(), BalanceData.account_code.asc())
-        .all()
-    )
 
-    if not rows:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No se encontraron datos de balance para el periodo seleccionado.",
-        )
+        return jsonable_encoder(BalanceDataAPIResponse(
+            success=True,
+            data=BalanceDataResponse(
+                totals=totals,
+                metrics=metrics,
+                tree=tree_nodes,
+                lastUpdated=last_updated.isoformat() if last_updated else None,
+            ),
+        ))
 
-    totals, metrics_map = compute_balance_core(rows)
-    tree_dict = build_balance_tree(rows)
-    tree_nodes = _dict_to_tree(tree_dict)
-    last_updated = max((r.updated_at for r in rows if r.updated_at), default=None)
-
-    metrics = BalanceMetrics(
-        activos=totals.get("activos", 0.0),
-        pasivos=totals.get("pasivos", 0.0),
-        patrimonio=totals.get("patrimonio", 0.0),
-        capital_trabajo=metrics_map.get("capital_trabajo", 0.0),
-        liquidez_corriente=metrics_map.get("liquidez_corriente"),
-        razon_rapida=metrics_map.get("razon_rapida"),
-        endeudamiento=metrics_map.get("endeudamiento"),
-        deuda_capital=metrics_map.get("deuda_capital"),
-        balance_check=metrics_map.get("balance_check", 0.0),
-    )
-
-    return BalanceDataAPIResponse(
-        success=True,
-        data=BalanceDataResponse(
-            totals=totals,
-            metrics=metrics,
-            tree=tree_nodes,
-            lastUpdated=last_updated.isoformat() if last_updated else None,
-        ),
-    )
+    # Árbol, totales y métricas se reconstruyen solo cuando cambia el periodo
+    return _snapshot_response(request, get_balance_snapshot("data", company_id, year, month, build))
 
 
 @router.get("/ratios", response_model=BalanceRatiosResponse)
 def get_balance_ratios(
+    request: Request,
     year: int = Query(..., ge=1900, le=2100),
     month: Optional[int] = Query(None, ge=1, le=12),
     current_user: User = Depends(get_current_user),
@@ -296,45 +347,33 @@ def get_balance_ratios(
 ):
     company_id = _get_company_id(current_user)
 
-    rows: List[BalanceData] = (
-        db.query(BalanceData)
-        .filter(
-            BalanceData.company_id == company_id,
-            BalanceData.period_year == year,
-            BalanceData.period_month == month,
-        )
-        .all()
-    )
-
-    if not rows:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No se encontraron datos de balance para el periodo seleccionado.",
+    def build():
+        rows = _period_rows(db, company_id, year, month)
+        _, metrics_map = compute_balance_core(rows)
+        financial_summary = fetch_financial_summary(db, company_id, year)
+        ratios_map = calculate_ratios(metrics_map, financial_summary)
+
+        ratios = BalanceRatios(
+            activos=ratios_map.get("activos", 0.0),
+            pasivos=ratios_map.get("pasivos", 0.0),
+            patrimonio=ratios_map.get("patrimonio", 0.0),
+            capital_trabajo=ratios_map.get("capital_trabajo", 0.0),
+            liquidez_corriente=ratios_map.get("liquidez_corriente"),
+            razon_rapida=ratios_map.get("razon_rapida"),
+            endeudamiento=ratios_map.get("endeudamiento"),
+            deuda_capital=ratios_map.get("deuda_capital"),
+            roe=ratios_map.get("roe"),
+            roa=ratios_map.get("roa"),
+            operating_margin=ratios_map.get("operating_margin"),
+            profit_margin=ratios_map.get("profit_margin"),
+            assets_to_equity=ratios_map.get("assets_to_equity"),
+            debt_to_equity=ratios_map.get("debt_to_equity"),
+            financials=BalanceFinancialSummary(**financial_summary),
         )
 
-    _, metrics_map = compute_balance_core(rows)
-    financial_summary = fetch_financial_summary(db, company_id, year)
-    ratios_map = calculate_ratios(metrics_map, financial_summary)
-
-    ratios = BalanceRatios(
-        activos=ratios_map.get("activos", 0.0),
-        pasivos=ratios_map.get("pasivos", 0.0),
-        patrimonio=ratios_map.get("patrimonio", 0.0),
-        capital_trabajo=ratios_map.get("capital_trabajo", 0.0),
-        liquidez_corriente=ratios_map.get("liquidez_corriente"),
-        razon_rapida=ratios_map.get("razon_rapida"),
-        endeudamiento=ratios_map.get("endeudamiento"),
-        deuda_capital=ratios_map.get("deuda_capital"),
-        roe=ratios_map.get("roe"),
-        roa=ratios_map.get("roa"),
-        operating_margin=ratios_map.get("operating_margin"),
-        profit_margin=ratios_map.get("profit_margin"),
-        assets_to_equity=ratios_map.get("assets_to_equity"),
-        debt_to_equity=ratios_map.get("debt_to_equity"),
-        financials=BalanceFinancialSummary(**financial_summary),
-    )
+        return jsonable_encoder(BalanceRatiosResponse(success=True, data=ratios))
 
-    return BalanceRatiosResponse(success=True, data=ratios)
+    return _snapshot_response(request, get_balance_snapshot("ratios", company_id, year, month, build))
 
 
 @router.get("/trends", response_model=BalanceTrendsResponse)
@@ -361,48 +400,52 @@ def get_balance_trends(
 
 @router.get("/summary")
 def get_balance_summary(
+    request: Request,
     year: int = Query(..., ge=1900, le=2100),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     company_id = _get_company_id(current_user)
 
-    record_count = (
-        db.query(func.count(BalanceData.id))
-        .filter(
-            BalanceData.company_id == company_id,
-            BalanceData.period_year == year,
+    def build():
+        record_count = (
+            db.query(func.count(BalanceData.id))
+            .filter(
+                BalanceData.company_id == company_id,
+                BalanceData.period_year == year,
+            )
+            .scalar()
+        ) or 0
+
+        last_raw = (
+            db.query(func.max(RawBalanceData.created_at))
+            .filter(
+                RawBalanceData.company_id == company_id,
+                RawBalanceData.period_year == year,
+            )
+            .scalar()
         )
-        .scalar()
-    ) or 0
 
-    last_raw = (
-        db.query(func.max(RawBalanceData.created_at))
-        .filter(
-            RawBalanceData.company_id == company_id,
-            RawBalanceData.period_year == year,
+        config = (
+            db.query(BalanceConfig)
+            .filter(
+                BalanceConfig.company_id == company_id,
+                BalanceConfig.year == year,
+            )
+            .first()
         )
-        .scalar()
-    )
 
-    config = (
-        db.query(BalanceConfig)
-        .filter(
-            BalanceConfig.company_id == company_id,
-            BalanceConfig.year == year,
-        )
-        .first()
-    )
+        return {
+            "success": True,
+            "data": {
+                "hasBalanceData": record_count > 0,
+                "records": int(record_count),
+                "hasConfig": config is not None,
+                "lastUpdated": last_raw.isoformat() if last_raw else None,
+            },
+        }
 
-    return {
-        "success": True,
-        "data": {
-            "hasBalanceData": record_count > 0,
-            "records": int(record_count),
-            "hasConfig": config is not None,
-            "lastUpdated": last_raw.isoformat() if last_raw else None,
-        },
-    }
+    return _snapshot_response(request, get_balance_snapshot("summary", company_id, year, None, build))
 
 
 @router.get("/years")
@@ -455,6 +498,8 @@ def save_balance_config(
     config.notes = notes
 
     db.commit()
+    # hasConfig forma parte del resumen del año
+    invalidate_balance_period(company_id, year, None)
 
     return {"success": True, "message": "Configuración de balance guardada correctamente"}
 
@@ -485,13 +530,10 @@ def delete_balance_data(
     ).delete(synchronize_session=False)
 
     db.commit()
+    invalidate_balance_period(company_id, year, month)
 
     return {"success": True, "deleted": int(deleted)}
 
 
-def _parent_code(code: str) -> Optional[str]:
-    return code.rsplit(".", 1)[0] if "." in code else None
-
-
 def _decimal(value: float) -> Decimal:
     return Decimal(str(value)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
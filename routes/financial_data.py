@@ -5,14 +5,22 @@ Financial Data Routes - Basado en csv_upload.php de la app original
 
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from sqlalchemy import text, inspect
+from sqlalchemy import Numeric, bindparam, text, inspect
+from sqlalchemy.sql.elements import TextClause
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, Callable, FrozenSet, List, Optional, Tuple
 import re
+import time
 
 from database.connection import get_db
+from database.schema_registry import schema_registry
 from models.user import User
 from auth.dependencies import get_current_user
 from auth.tenant_context import get_current_tenant
+from services.balance_processor import invalidate_balance_ratios
+from services.pyg_analysis import invalidate_pyg_analysis
+from services.pyg_rollup import accounts_with_children, rollup_monthly_pyg, to_cents
 
 
 def _resolve_company_id(current_user: User) -> int:
@@ -25,6 +33,107 @@ def _resolve_company_id(current_user: User) -> int:
 
 router = APIRouter(prefix="/api/financial", tags=["Financial Data"])
 
+
+@dataclass(frozen=True)
+class FinancialDataStatements:
+    """SQL de financial_data resuelto una vez según las columnas del esquema."""
+    columns: FrozenSet[str]
+    year_column: Optional[str]
+    select_all: TextClause
+    select_year: Optional[TextClause]
+    delete_year: Optional[TextClause]
+    delete_company: TextClause
+    insert_getters: Tuple[Tuple[str, Callable[[Any, int, int], Any]], ...]
+    insert: TextClause
+
+
+def _build_financial_data_statements(columns: FrozenSet[str]) -> FinancialDataStatements:
+    # Mapear year/month según existan como year/period_year, month/period_month
+    ysrc = 'year' if 'year' in columns else ('period_year' if 'period_year' in columns else None)
+    msrc = 'month' if 'month' in columns else ('period_month' if 'period_month' in columns else None)
+
+    col_costo = 'costo_ventas_total' if 'costo_ventas_total' in columns else ('costo_ventas' if 'costo_ventas' in columns else None)
+    col_gadm = 'gastos_admin_total' if 'gastos_admin_total' in columns else ('gastos_administrativos' if 'gastos_administrativos' in columns else None)
+    col_gvta = 'gastos_ventas_total' if 'gastos_ventas_total' in columns else ('gastos_ventas' if 'gastos_ventas' in columns else None)
+
+    # Lectura: alias fijos, 0/NULL para columnas ausentes
+    def sel(col: str, alias: str, default: str = "0") -> str:
+        return f"{col if col in columns else default} AS {alias}"
+
+    select_cols = [
+        sel('id', 'id', 'NULL'),
+        (f"{ysrc} AS year" if ysrc else "NULL AS year"),
+        (f"{msrc} AS month" if msrc else "NULL AS month"),
+        sel('ingresos', 'ingresos'),
+        f"{col_costo or 0} AS costo_ventas_total",
+        f"{col_gadm or 0} AS gastos_admin_total",
+        f"{col_gvta or 0} AS gastos_ventas_total",
+        # Estas deberían existir, pero si no existen, poner 0
+        sel('utilidad_bruta', 'utilidad_bruta'),
+        sel('ebitda', 'ebitda'),
+        sel('utilidad_neta', 'utilidad_neta'),
+    ]
+    select_sql = f"SELECT {', '.join(select_cols)} FROM financial_data WHERE company_id = :company_id"
+    order_sql = f" ORDER BY {ysrc or 'year'} DESC, {msrc or 'month'} ASC"
+
+    # Escritura del PyG mensual: (columna, valor a partir de totales/empresa/año)
+    insert_getters: List[Tuple[str, Callable[[Any, int, int], Any]]] = [
+        ("company_id", lambda totals, company_id, year: company_id),
+    ]
+    if "period_year" in columns:
+        insert_getters.append(("period_year", lambda totals, company_id, year: year))
+    if "year" in columns:
+        insert_getters.append(("year", lambda totals, company_id, year: year))
+    if "period_month" in columns:
+        insert_getters.append(("period_month", lambda totals, company_id, year: totals.period_month))
+    if "month" in columns:
+        insert_getters.append(("month", lambda totals, company_id, year: totals.period_month))
+    if "period_quarter" in columns:
+        insert_getters.append(("period_quarter", lambda totals, company_id, year: (totals.period_month + 2) // 3))
+    if "data_type" in columns:
+        insert_getters.append(("data_type", lambda totals, company_id, year: 'monthly'))
+    insert_getters.append(("ingresos", lambda totals, company_id, year: totals.ingresos))
+    if col_costo:
+        insert_getters.append((col_costo, lambda totals, company_id, year: totals.costo_ventas))
+    if col_gadm:
+        insert_getters.append((col_gadm, lambda totals, company_id, year: totals.gastos_admin))
+    if col_gvta:
+        insert_getters.append((col_gvta, lambda totals, company_id, year: totals.gastos_ventas))
+    insert_getters.append(("utilidad_bruta", lambda totals, company_id, year: totals.utilidad_bruta))
+    insert_getters.append(("ebitda", lambda totals, company_id, year: totals.ebitda))
+    insert_getters.append(("utilidad_neta", lambda totals, company_id, year: totals.utilidad_neta))
+    insert_columns = [column for column, _ in insert_getters]
+
+    return FinancialDataStatements(
+        columns=columns,
+        year_column=ysrc,
+        select_all=text(select_sql + order_sql),
+        select_year=text(f"{select_sql} AND {ysrc} = :year{order_sql}") if ysrc else None,
+        delete_year=(
+            text(f"DELETE FROM financial_data WHERE company_id = :company_id AND {ysrc} = :year") if ysrc else None
+        ),
+        delete_company=text("DELETE FROM financial_data WHERE company_id = :company_id"),
+        insert_getters=tuple(insert_getters),
+        insert=text(
+            f"INSERT INTO financial_data ({', '.join(insert_columns)}) "
+            f"VALUES ({', '.join(f':{column}' for column in insert_columns)})"
+        ).bindparams(*(bindparam(column, type_=Numeric(15, 2)) for column in insert_columns[insert_columns.index("ingresos"):])),
+    )
+
+
+def _financial_data_statements(db: Session) -> FinancialDataStatements:
+    """Sentencias de financial_data; el esquema se introspecciona una vez por proceso."""
+    return schema_registry.get_compiled(db, "financial_data", "statements", _build_financial_data_statements)
+
+# Filas de raw_account_data por executemany (PyMySQL lo envía como un INSERT multi-fila)
+RAW_ACCOUNT_INSERT_BATCH_SIZE = 1000
+
+RAW_ACCOUNT_INSERT_SQL = text("""
+    INSERT INTO raw_account_data 
+    (company_id, import_date, account_code, account_name, period_year, period_month, amount) 
+    VALUES (:company_id, :import_date, :account_code, :account_name, :period_year, :period_month, :amount)
+""")
+
 @router.post("/csv-upload")
 async def upload_csv(
     csv: UploadFile = File(...),
@@ -41,6 +150,7 @@ async def upload_csv(
                 raise HTTPException(status_code=400, detail="Error al cargar el archivo")
         
         company_id = _resolve_company_id(current_user)
+        started = time.perf_counter()
         
         # Leer contenido del archivo
         content = await csv.read()
@@ -142,32 +252,21 @@ async def upload_csv(
             # Limpiar datos existentes (como PHP original)
             db.execute(text("DELETE FROM raw_account_data WHERE company_id = :company_id AND period_year = :year"), 
                       {"company_id": company_id, "year": year})
-            # Detectar nombres de columnas en financial_data para limpiar por año
-            fin_cols = set()
-            try:
-                cols_res = db.execute(text("SHOW COLUMNS FROM financial_data"))
-                for r in cols_res:
-                    cname = r[0] if len(r) > 0 else None
-                    if not cname:
-                        # fallback
-                        try:
-                            cname = r._mapping.get('Field')
-                        except Exception:
-                            pass
-                    if cname:
-                        fin_cols.add(cname)
-            except Exception:
-                fin_cols = set()
-
-            ycol = 'year' if 'year' in fin_cols else ('period_year' if 'period_year' in fin_cols else None)
-            if ycol:
-                db.execute(text(f"DELETE FROM financial_data WHERE company_id = :company_id AND {ycol} = :year"), 
-                          {"company_id": company_id, "year": year})
+            statements = _financial_data_statements(db)
+            if statements.delete_year is not None:
+                db.execute(statements.delete_year, {"company_id": company_id, "year": year})
             
             # Insertar nuevos datos
             total_revenue = 0
             total_accounts = 0
-            account_codes = set()
+            # Cuentas con subcuentas en el archivo (índice de prefijos ordenado)
+            parent_codes = accounts_with_children(account_code_set)
+            # (cuenta, mes, centavos) de cada fila insertada, para el PyG mensual
+            pyg_entries = []
+            import_date = datetime.now().date()
+            raw_batch = []
+            raw_rows_inserted = 0
+            raw_insert_started = time.perf_counter()
             
             # Procesar líneas de datos (como PHP original adaptado)
             for account_code, account_name, row in account_rows:
@@ -191,124 +290,46 @@ async def upload_csv(
                     if amount == 0:
                         continue
                     
-                    # Insertar en raw_account_data (como PHP original)
-                    db.execute(text("""
-                        INSERT INTO raw_account_data 
-                        (company_id, import_date, account_code, account_name, period_year, period_month, amount) 
-                        VALUES (:company_id, :import_date, :account_code, :account_name, :period_year, :period_month, :amount)
-                    """), {
+                    # Insertar en raw_account_data (como PHP original), por lotes
+                    raw_batch.append({
                         "company_id": company_id,
-                        "import_date": datetime.now().date(),
+                        "import_date": import_date,
                         "account_code": account_code,
                         "account_name": account_name,
                         "period_year": year,
                         "period_month": month_index + 1,
                         "amount": amount
                     })
+                    if len(raw_batch) >= RAW_ACCOUNT_INSERT_BATCH_SIZE:
+                        db.execute(RAW_ACCOUNT_INSERT_SQL, raw_batch)
+                        raw_rows_inserted += len(raw_batch)
+                        raw_batch = []
                     
+                    pyg_entries.append((account_code, month_index + 1, to_cents(amount)))
+
                     # Sumar ingresos (cuenta 4) como PHP original
-                    has_child = any(
-                        other_code != account_code and other_code.startswith(f"{account_code}.")
-                        for other_code in account_code_set
-                    )
-                    if account_code.startswith('4') and not has_child:
+                    if account_code.startswith('4') and account_code not in parent_codes:
                         total_revenue += amount
             
+            if raw_batch:
+                db.execute(RAW_ACCOUNT_INSERT_SQL, raw_batch)
+                raw_rows_inserted += len(raw_batch)
+            raw_insert_seconds = time.perf_counter() - raw_insert_started
+
             total_accounts = len(account_code_set)
             
-            # Procesar datos financieros agregados: columnas dinámicas según esquema
-            def add_column(target_col: str, expr: str):
-                insert_columns.append(target_col)
-                select_expressions.append(f"{expr} AS {target_col}")
-
-            def leaf_sum(prefix: str) -> str:
-                return (
-                    "SUM(CASE WHEN r.account_code LIKE '{prefix}%' AND NOT EXISTS ("
-                    "SELECT 1 FROM raw_account_data r2 "
-                    "WHERE r2.company_id = r.company_id "
-                    "AND r2.period_year = r.period_year "
-                    "AND r2.period_month = r.period_month "
-                    "AND r2.account_code <> r.account_code "
-                    "AND r2.account_code LIKE CONCAT(r.account_code, '.%')"
-                    ") THEN r.amount ELSE 0 END)".format(prefix=prefix)
-                )
-
-            ingresos_expr = leaf_sum('4')
-            costo_ventas_expr = leaf_sum('5.1')
-            gastos_ventas_expr = leaf_sum('5.2')
-            gastos_admin_expr = leaf_sum('5.3')
-            costos_total_expr = leaf_sum('5')
-
-            insert_columns = []
-            select_expressions = []
-
-            # Columnas de identificación
-            insert_columns.append("company_id")
-            select_expressions.append(":company_id AS company_id")
-
-            if "period_year" in fin_cols:
-                add_column("period_year", ":year")
-            if "year" in fin_cols:
-                add_column("year", ":year")
-
-            if "period_month" in fin_cols:
-                add_column("period_month", "period_month")
-            if "month" in fin_cols:
-                add_column("month", "period_month")
-
-            if "period_quarter" in fin_cols:
-                add_column("period_quarter", "CEIL(period_month / 3)")
-
-            if "data_type" in fin_cols:
-                add_column("data_type", "'monthly'")
-
-            # Columnas numéricas clave (utilizamos alias existentes)
-            add_column("ingresos", ingresos_expr)
-
-            if "costo_ventas_total" in fin_cols:
-                add_column("costo_ventas_total", costo_ventas_expr)
-            elif "costo_ventas" in fin_cols:
-                add_column("costo_ventas", costo_ventas_expr)
-
-            if "gastos_admin_total" in fin_cols:
-                add_column("gastos_admin_total", gastos_admin_expr)
-            elif "gastos_administrativos" in fin_cols:
-                add_column("gastos_administrativos", gastos_admin_expr)
-
-            if "gastos_ventas_total" in fin_cols:
-                add_column("gastos_ventas_total", gastos_ventas_expr)
-            elif "gastos_ventas" in fin_cols:
-                add_column("gastos_ventas", gastos_ventas_expr)
-
-            add_column(
-                "utilidad_bruta",
-                f"{ingresos_expr} - {costo_ventas_expr}",
-            )
-            add_column(
-                "ebitda",
-                f"{ingresos_expr} - {costos_total_expr}",
-            )
-            add_column(
-                "utilidad_neta",
-                f"{ingresos_expr} - {costos_total_expr}",
-            )
-
-            insert_sql = f"""
-                INSERT INTO financial_data ({', '.join(insert_columns)})
-                SELECT 
-                    {', '.join(select_expressions)}
-                FROM raw_account_data r
-                WHERE r.company_id = :company_id2 AND r.period_year = :year2
-                GROUP BY r.period_month
-            """
-            db.execute(text(insert_sql), {
-                "company_id": company_id,
-                "year": year,
-                "company_id2": company_id,
-                "year2": year
-            })
+            # Procesar datos financieros agregados: columnas según esquema (registro de esquema).
+            # Solo se suman cuentas hoja de cada mes; la jerarquía se resuelve en memoria.
+            monthly_totals = rollup_monthly_pyg(pyg_entries)
+            if monthly_totals:
+                db.execute(statements.insert, [
+                    {column: getter(totals, company_id, year) for column, getter in statements.insert_getters}
+                    for totals in monthly_totals
+                ])
             
             db.commit()
+            invalidate_pyg_analysis(company_id)
+            invalidate_balance_ratios(company_id)
             
             # Respuesta exacta como PHP original
             return {
@@ -317,6 +338,9 @@ async def upload_csv(
                 'months': month_labels,
                 'totalAccounts': total_accounts,
                 'totalRevenue': total_revenue,
+                'rowsInserted': raw_rows_inserted,
+                'rowsPerSecond': round(raw_rows_inserted / raw_insert_seconds, 1) if raw_insert_seconds > 0 else None,
+                'importTimeMs': round((time.perf_counter() - started) * 1000, 1),
                 'message': 'CSV procesado exitosamente'
             }
             
@@ -369,73 +393,17 @@ async def get_financial_data(
             except Exception:
                 return default
 
-        # Descubrir columnas existentes para tolerar esquemas antiguos/nuevos
-        present_cols = set()
-        try:
-            cols_result = db.execute(text("SHOW COLUMNS FROM financial_data"))
-            for r in cols_result:
-                # SHOW COLUMNS devuelve 'Field' como primera columna
-                try:
-                    colname = r[0]
-                except Exception:
-                    colname = getval(r, 'Field')
-                if colname:
-                    present_cols.add(colname)
-        except Exception as _:
-            # Si la tabla no existe, devolver respuesta vacía más abajo
-            present_cols = set()
-
-        col_costo = 'costo_ventas_total' if 'costo_ventas_total' in present_cols else ('costo_ventas' if 'costo_ventas' in present_cols else None)
-        col_gadm = 'gastos_admin_total' if 'gastos_admin_total' in present_cols else ('gastos_administrativos' if 'gastos_administrativos' in present_cols else None)
-        col_gvta = 'gastos_ventas_total' if 'gastos_ventas_total' in present_cols else ('gastos_ventas' if 'gastos_ventas' in present_cols else None)
-
-        # 1. Obtener datos agregados con columnas detectadas
-        def sel(col: str, alias: str | None = None, default: str = "0") -> str:
-            if col in present_cols:
-                return f"{col}{(' AS ' + alias) if alias else ''}"
-            return f"{default}{(' AS ' + alias) if alias else ''}"
-
-        # Mapear year/month según existan como year/period_year, month/period_month
-        ysrc = 'year' if 'year' in present_cols else ('period_year' if 'period_year' in present_cols else None)
-        msrc = 'month' if 'month' in present_cols else ('period_month' if 'period_month' in present_cols else None)
-
-        select_cols = [
-            sel('id', 'id', 'NULL'),
-            (f"{ysrc} AS year" if ysrc else "NULL AS year"),
-            (f"{msrc} AS month" if msrc else "NULL AS month"),
-            sel('ingresos', 'ingresos', '0'),
-        ]
-        if col_costo:
-            select_cols.append(f"{col_costo} AS costo_ventas_total")
-        else:
-            select_cols.append("0 AS costo_ventas_total")
-        if col_gadm:
-            select_cols.append(f"{col_gadm} AS gastos_admin_total")
-        else:
-            select_cols.append("0 AS gastos_admin_total")
-        if col_gvta:
-            select_cols.append(f"{col_gvta} AS gastos_ventas_total")
-        else:
-            select_cols.append("0 AS gastos_ventas_total")
-        # Estas deberían existir, pero si no existen, poner 0
-        select_cols.append(sel('utilidad_bruta', 'utilidad_bruta', '0'))
-        select_cols.append(sel('ebitda', 'ebitda', '0'))
-        select_cols.append(sel('utilidad_neta', 'utilidad_neta', '0'))
-
-        query = f"SELECT {', '.join(select_cols)} FROM financial_data WHERE company_id = :company_id"
+        # Columnas resueltas una vez por proceso para tolerar esquemas antiguos/nuevos
+        statements = _financial_data_statements(db)
         params = {"company_id": company_id}
-
-        if year and ysrc:
-            query += f" AND {ysrc} = :year"
+        query = statements.select_all
+        if year and statements.select_year is not None:
+            query = statements.select_year
             params["year"] = year
 
-        order_year = ysrc or 'year'
-        order_month = msrc or 'month'
-        query += f" ORDER BY {order_year} DESC, {order_month} ASC"
-
         data = []
         try:
-            result = db.execute(text(query), params)
+            result = db.execute(query, params)
             for row in result:
                 ingresos = getval(row, 'ingresos', 0) or 0
                 data.append({
@@ -736,26 +704,11 @@ async def clear_financial_data(
             # Limpiar datos de un año específico
             db.execute(text("DELETE FROM raw_account_data WHERE company_id = :company_id AND period_year = :year"), 
                       {"company_id": company_id, "year": year})
-            fin_cols = set()
-            try:
-                cols_result = db.execute(text("SHOW COLUMNS FROM financial_data"))
-                for r in cols_result:
-                    try:
-                        colname = r[0]
-                    except Exception:
-                        colname = getattr(r, 'Field', None)
-                    if colname:
-                        fin_cols.add(colname)
-            except Exception:
-                fin_cols = set()
-
-            year_col = 'year' if 'year' in fin_cols else ('period_year' if 'period_year' in fin_cols else None)
-            if year_col:
-                db.execute(text(f"DELETE FROM financial_data WHERE company_id = :company_id AND {year_col} = :year"), 
-                          {"company_id": company_id, "year": year})
+            statements = _financial_data_statements(db)
+            if statements.delete_year is not None:
+                db.execute(statements.delete_year, {"company_id": company_id, "year": year})
             else:
-                db.execute(text("DELETE FROM financial_data WHERE company_id = :company_id"), 
-                          {"company_id": company_id})
+                db.execute(statements.delete_company, {"company_id": company_id})
             db.execute(text("DELETE FROM production_data WHERE company_id = :company_id AND year = :year"), 
                       {"company_id": company_id, "year": year})
             
@@ -772,6 +725,8 @@ async def clear_financial_data(
             message = "All financial data cleared from MySQL"
         
         db.commit()
+        invalidate_pyg_analysis(company_id)
+        invalidate_balance_ratios(company_id)
         
         return {"success": True, "message": message}
         
@@ -6,16 +6,24 @@ el estado operativo (fechas, estatus, notas, pagos) de cada ítem.
 """
 from __future__ import annotations
 
+import asyncio
 import io
+import os
 import re
+import threading
+import time
 import unicodedata
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
 from datetime import datetime, date, timedelta
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Tuple, cast
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, validator
 from sqlalchemy import func, or_
 from sqlalchemy.orm import Session, joinedload
@@ -286,6 +294,119 @@ class DashboardKpisResponse(BaseModel):
 
 router = APIRouter(prefix="/production", tags=["Status Producción"])
 
+
+# ---------------------------------------------------------------------------
+# Snapshot compartido del dashboard
+# ---------------------------------------------------------------------------
+
+# Las pantallas de planta consultan /dashboard/kpis y /dashboard/schedule de
+# forma continua. Ambos se calculan juntos a partir de una sola carga de ítems
+# activos y se reutilizan hasta que una escritura invalida la empresa, cambia
+# el día o vence el TTL (red de seguridad si hay varias instancias).
+_DASHBOARD_SNAPSHOT_TTL_SECONDS = 60.0
+
+
+@dataclass
+class _DashboardItem:
+    """Ítem activo ya clasificado (sin metadatos ni servicios)."""
+    item: ProductionProduct
+    quote: Optional[ProductionQuote]
+    quantity_value: Optional[Decimal]
+    quantity_unit: str
+    plan_entries: List[ProductionDailyPlan]
+
+
+@dataclass
+class _DashboardSnapshot:
+    built_on: date
+    built_at: float
+    kpis: DashboardKpisResponse
+    schedule: DailyScheduleResponse
+
+
+_DASHBOARD_SNAPSHOT_CACHE: Dict[int, _DashboardSnapshot] = {}
+# Se incrementa al invalidar: un snapshot calculado durante una escritura no se guarda
+_DASHBOARD_SNAPSHOT_GENERATIONS: Dict[int, int] = {}
+_DASHBOARD_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _load_dashboard_items(db: Session, company_id: int) -> List[_DashboardItem]:
+    active_items: List[ProductionProduct] = (
+        db.query(ProductionProduct)
+        .options(joinedload(ProductionProduct.cotizacion))
+        .filter(
+            ProductionProduct.company_id == company_id,
+            ProductionProduct.estatus != ProductionStatusEnum.ENTREGADO,
+            ProductionProduct.estatus != ProductionStatusEnum.EN_BODEGA
+        )
+        .all()
+    )
+
+    manual_plan_by_item: Dict[int, List[ProductionDailyPlan]] = defaultdict(list)
+    if active_items:
+        plan_entries = (
+            db.query(ProductionDailyPlan)
+            .filter(
+                ProductionDailyPlan.company_id == company_id,
+                ProductionDailyPlan.producto_id.in_([item.id for item in active_items])
+            )
+            .all()
+        )
+        for plan_entry in plan_entries:
+            manual_plan_by_item[plan_entry.producto_id].append(plan_entry)
+        for entries in manual_plan_by_item.values():
+            entries.sort(key=lambda entry: entry.fecha)
+
+    dashboard_items: List[_DashboardItem] = []
+    for item in active_items:
+        quote = item.cotizacion
+        if _is_metadata_description(item.descripcion, quote.odc if quote else None):
+            continue
+        if _is_service_product(item.descripcion):
+            continue
+        quantity_value, quantity_unit = _extract_quantity_info(item.cantidad)
+        dashboard_items.append(
+            _DashboardItem(
+                item=item,
+                quote=quote,
+                quantity_value=quantity_value,
+                quantity_unit=quantity_unit,
+                plan_entries=manual_plan_by_item.get(item.id, []),
+            )
+        )
+    return dashboard_items
+
+
+def _get_dashboard_snapshot(db: Session, company_id: int) -> _DashboardSnapshot:
+    today = date.today()
+    snapshot = _DASHBOARD_SNAPSHOT_CACHE.get(company_id)
+    if (
+        snapshot is not None
+        and snapshot.built_on == today
+        and time.monotonic() - snapshot.built_at < _DASHBOARD_SNAPSHOT_TTL_SECONDS
+    ):
+        return snapshot
+
+    generation = _DASHBOARD_SNAPSHOT_GENERATIONS.get(company_id, 0)
+    dashboard_items = _load_dashboard_items(db, company_id)
+    snapshot = _DashboardSnapshot(
+        built_on=today,
+        built_at=time.monotonic(),
+        kpis=_build_dashboard_kpis(db, company_id, today, dashboard_items),
+        schedule=_build_dashboard_schedule(today, dashboard_items),
+    )
+    with _DASHBOARD_SNAPSHOT_LOCK:
+        if _DASHBOARD_SNAPSHOT_GENERATIONS.get(company_id, 0) == generation:
+            _DASHBOARD_SNAPSHOT_CACHE[company_id] = snapshot
+    return snapshot
+
+
+def _invalidate_dashboard_snapshot(company_id: int) -> None:
+    with _DASHBOARD_SNAPSHOT_LOCK:
+        _DASHBOARD_SNAPSHOT_GENERATIONS[company_id] = _DASHBOARD_SNAPSHOT_GENERATIONS.get(company_id, 0) + 1
+        _DASHBOARD_SNAPSHOT_CACHE.pop(company_id, None)
+
+
 @router.get("/dashboard/kpis", response_model=DashboardKpisResponse)
 async def get_dashboard_kpis(
     current_user: User = Depends(get_current_user),
@@ -295,7 +416,15 @@ async def get_dashboard_kpis(
     Endpoint para obtener los KPIs del dashboard de producción.
     """
     company_id = _get_company_id(current_user)
-    today = date.today()
+    return _get_dashboard_snapshot(db, company_id).kpis
+
+
+def _build_dashboard_kpis(
+    db: Session,
+    company_id: int,
+    today: date,
+    dashboard_items: List[_DashboardItem],
+) -> DashboardKpisResponse:
     start_of_week = today - timedelta(days=today.weekday())
     history_window_days = 31
     month_start = date(today.year, today.month, 1)
@@ -324,17 +453,6 @@ async def get_dashboard_kpis(
         "metros": decimal_zero,
     }
 
-    active_items: List[ProductionProduct] = (
-        db.query(ProductionProduct)
-        .options(joinedload(ProductionProduct.cotizacion))
-        .filter(
-            ProductionProduct.company_id == company_id,
-            ProductionProduct.estatus != ProductionStatusEnum.ENTREGADO,
-            ProductionProduct.estatus != ProductionStatusEnum.EN_BODEGA
-        )
-        .all()
-    )
-
     overdue_items: List[ProductionProduct] = []
     due_next_7_items: List[ProductionProduct] = []
     due_next_7_ids: Set[int] = set()
@@ -376,27 +494,9 @@ async def get_dashboard_kpis(
         issues_set: Set[str] = entry["issues"]  # type: ignore[assignment]
         issues_set.add(issue)
 
-    manual_plan_by_item: Dict[int, List[ProductionDailyPlan]] = defaultdict(list)
-    if active_items:
-        plan_entries = (
-            db.query(ProductionDailyPlan)
-            .filter(
-                ProductionDailyPlan.company_id == company_id,
-                ProductionDailyPlan.producto_id.in_([item.id for item in active_items])
-            )
-            .all()
-        )
-        for plan_entry in plan_entries:
-            manual_plan_by_item[plan_entry.producto_id].append(plan_entry)
-        for entries in manual_plan_by_item.values():
-            entries.sort(key=lambda entry: entry.fecha)
-
-    for item in active_items:
-        quote = item.cotizacion
-        if _is_metadata_description(item.descripcion, quote.odc if quote else None):
-            continue
-        if _is_service_product(item.descripcion):
-            continue
+    for dashboard_item in dashboard_items:
+        item = dashboard_item.item
+        quote = dashboard_item.quote
 
         if not item.estatus:
             register_gap(item, "sin_estatus")
@@ -416,7 +516,8 @@ async def get_dashboard_kpis(
         item_value = item.valor_subtotal if item.valor_subtotal is not None else decimal_zero
         entry["value"] = entry["value"] + item_value
 
-        quantity_value, quantity_unit = _extract_quantity_info(item.cantidad)
+        quantity_value = dashboard_item.quantity_value
+        quantity_unit = dashboard_item.quantity_unit
         if quantity_value is None:
             missing_quantity += 1
             register_gap(item, "sin_cantidad")
@@ -464,7 +565,7 @@ async def get_dashboard_kpis(
         if not item.factura or not item.factura.strip():
             register_gap(item, "sin_factura")
 
-        manual_plan_entries = manual_plan_by_item.get(item.id, [])
+        manual_plan_entries = dashboard_item.plan_entries
         # Solo considerar como plan manual si fue editado manualmente
         manually_edited_entries = [
             entry for entry in manual_plan_entries 
@@ -505,40 +606,8 @@ async def get_dashboard_kpis(
                 else:
                     target_bucket["unidades"] = target_bucket["unidades"] + quantity_value
             else:
-                if quote and quote.fecha_ingreso:
-                    start_date = quote.fecha_ingreso.date()
-                else:
-                    start_date = end_date
-                if start_date < today:
-                    start_date = today
-                start_date = _next_working_day(start_date)
-
-                # Para pedidos de stock, la fecha de entrega es el día que estará disponible
-                # Para cotizaciones de cliente, la producción termina un día antes
-                is_stock = quote and quote.tipo_produccion == ProductionTypeEnum.STOCK
-                if is_stock:
-                    # Stock: producción disponible el mismo día (si es hábil)
-                    if _is_working_day(end_date):
-                        production_end = end_date
-                    else:
-                        production_end = _previous_working_day(end_date, include_today=False)
-                else:
-                    # Cliente: producción termina el día hábil anterior a la entrega
-                    production_end = _previous_working_day(end_date)
-
-                if production_end < start_date:
-                    if start_date == end_date and _is_working_day(start_date):
-                        working_days = [start_date]
-                    else:
-                        working_days = [production_end]
-                else:
-                    working_days = _iter_working_days(start_date, production_end)
-                if not working_days:
-                    fallback_date = _previous_working_day(end_date, include_today=True)
-                    working_days = [fallback_date]
-
-                share = quantity_value / Decimal(len(working_days))
-                for target_date in working_days:
+                working_days = _production_days(quote, end_date, today)
+                for target_date, share in _WORKING_DAY_CALENDAR.distribute(working_days, quantity_value):
                     if target_date < min_allowed_date:
                         continue
                     bucket_date = target_date
@@ -1098,32 +1167,152 @@ def _is_ecuador_holiday(value: date) -> bool:
     return value in holidays_set
 
 
+class _WorkingDayCalendar:
+    """
+    Calendario de días hábiles indexado por ordinal.
+
+    Precalcula, para un rango de años completos, un bitmap de días hábiles,
+    el conteo acumulado de días hábiles y la lista de ordinales hábiles. Con
+    eso "siguiente/anterior día hábil" y "días hábiles entre dos fechas" se
+    resuelven con índices en O(1) en lugar de avanzar día por día. El rango
+    se amplía por años (con un año de margen a cada lado) cuando se consulta
+    una fecha fuera de él.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (primer año, último año, ordinal base, bitmap, acumulado, ordinales hábiles)
+        self._state: Tuple[int, int, int, bytearray, List[int], List[int]] = (1, 0, 0, bytearray(), [0], [])
+
+    def _build(self, first_year: int, last_year: int) -> None:
+        base = date(first_year, 1, 1).toordinal()
+        end = date(last_year, 12, 31).toordinal()
+        holiday_ordinals = {
+            holiday.toordinal()
+            for year in range(first_year, last_year + 1)
+            for holiday in _get_ecuador_holidays(year)
+        }
+        working = bytearray(end - base + 1)
+        cumulative = [0] * (end - base + 2)
+        ordinals: List[int] = []
+        weekday = date.fromordinal(base).weekday()
+        for index in range(end - base + 1):
+            ordinal = base + index
+            if weekday < 5 and ordinal not in holiday_ordinals:
+                working[index] = 1
+                ordinals.append(ordinal)
+            cumulative[index + 1] = len(ordinals)
+            weekday = (weekday + 1) % 7
+        self._state = (first_year, last_year, base, working, cumulative, ordinals)
+
+    def _covering(self, *values: date):
+        # Un año de margen, sin salir del rango de date
+        first_needed = max(min(value.year for value in values) - 1, date.min.year)
+        last_needed = min(max(value.year for value in values) + 1, date.max.year)
+        state = self._state
+        if state[0] <= first_needed and last_needed <= state[1]:
+            return state
+        with self._lock:
+            state = self._state
+            if not (state[0] <= first_needed and last_needed <= state[1]):
+                if state[0] <= state[1]:
+                    first_needed = min(first_needed, state[0])
+                    last_needed = max(last_needed, state[1])
+                self._build(first_needed, last_needed)
+            return self._state
+
+    def is_working_day(self, value: date) -> bool:
+        _, _, base, working, _, _ = self._covering(value)
+        return bool(working[value.toordinal() - base])
+
+    def next_working_day(self, value: date) -> date:
+        """Primer día hábil >= value."""
+        _, _, base, _, cumulative, ordinals = self._covering(value)
+        return date.fromordinal(ordinals[cumulative[value.toordinal() - base]])
+
+    def previous_working_day(self, value: date, *, include_today: bool = False) -> date:
+        """Último día hábil < value (<= value si include_today)."""
+        _, _, base, _, cumulative, ordinals = self._covering(value)
+        index = value.toordinal() - base + (1 if include_today else 0)
+        return date.fromordinal(ordinals[cumulative[index] - 1])
+
+    def count_working_days(self, start: date, end: date) -> int:
+        """Días hábiles en [start, end]."""
+        if end < start:
+            return 0
+        _, _, base, _, cumulative, _ = self._covering(start, end)
+        return cumulative[end.toordinal() - base + 1] - cumulative[start.toordinal() - base]
+
+    def working_days(self, start: date, end: date) -> List[date]:
+        """Días hábiles en [start, end], en orden."""
+        if end < start:
+            return []
+        _, _, base, _, cumulative, ordinals = self._covering(start, end)
+        first = cumulative[start.toordinal() - base]
+        last = cumulative[end.toordinal() - base + 1]
+        return [date.fromordinal(ordinal) for ordinal in ordinals[first:last]]
+
+    def distribute(self, days: List[date], quantity: Decimal) -> List[Tuple[date, Decimal]]:
+        """Reparte quantity en partes iguales entre los días indicados."""
+        if not days:
+            return []
+        share = quantity / Decimal(len(days))
+        return [(day, share) for day in days]
+
+
+_WORKING_DAY_CALENDAR = _WorkingDayCalendar()
+
+
 def _is_working_day(value: date) -> bool:
-    return value.weekday() < 5 and not _is_ecuador_holiday(value)
+    return _WORKING_DAY_CALENDAR.is_working_day(value)
 
 
 def _next_working_day(value: date) -> date:
-    candidate = value
-    while not _is_working_day(candidate):
-        candidate += timedelta(days=1)
-    return candidate
+    return _WORKING_DAY_CALENDAR.next_working_day(value)
 
 
 def _previous_working_day(value: date, *, include_today: bool = False) -> date:
-    candidate = value if include_today else value - timedelta(days=1)
-    while not _is_working_day(candidate):
-        candidate -= timedelta(days=1)
-    return candidate
+    return _WORKING_DAY_CALENDAR.previous_working_day(value, include_today=include_today)
 
 
 def _iter_working_days(start: date, end: date) -> List[date]:
-    days: List[date] = []
-    current = start
-    while current <= end:
-        if _is_working_day(current):
-            days.append(current)
-        current += timedelta(days=1)
-    return days
+    return _WORKING_DAY_CALENDAR.working_days(start, end)
+
+
+def _production_days(quote: Optional[ProductionQuote], end_date: date, today: date) -> List[date]:
+    """Días hábiles en los que se reparte la producción de un ítem con entrega futura."""
+    if quote and quote.fecha_ingreso:
+        start_date = quote.fecha_ingreso.date()
+    else:
+        start_date = end_date
+    if start_date < today:
+        start_date = today
+    start_date = _next_working_day(start_date)
+
+    # Para pedidos de stock, la fecha de entrega es el día que estará disponible
+    # Para cotizaciones de cliente, la producción termina un día antes
+    is_stock = quote and quote.tipo_produccion == ProductionTypeEnum.STOCK
+    if is_stock:
+        # Stock: producción disponible el mismo día (si es hábil)
+        if _is_working_day(end_date):
+            production_end = end_date
+        else:
+            production_end = _previous_working_day(end_date, include_today=False)
+    else:
+        # Cliente: producción termina el día hábil anterior a la entrega
+        production_end = _previous_working_day(end_date)
+
+    if production_end < start_date:
+        if start_date == end_date and _is_working_day(start_date):
+            working_days = [start_date]
+        else:
+            working_days = [production_end]
+    else:
+        working_days = _iter_working_days(start_date, production_end)
+    if not working_days:
+        fallback_date = _previous_working_day(end_date, include_today=True)
+        working_days = [fallback_date]
+    return working_days
 
 
 # ---------------------------------------------------------------------------
@@ -1754,6 +1943,72 @@ class ProductionUpdatePayload(BaseModel):
 # Endpoints
 # ---------------------------------------------------------------------------
 
+# ---------------------------------------------------------------------------
+# Parsing paralelo de cotizaciones
+# ---------------------------------------------------------------------------
+
+# Procesos para parsear Excel de cotizaciones (0 = parsear en un hilo del servidor)
+QUOTE_PARSE_WORKERS = int(os.getenv("QUOTE_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_quote_parse_pool: Optional[ProcessPoolExecutor] = None
+_quote_parse_pool_lock = threading.Lock()
+
+
+def _get_quote_parse_pool() -> Optional[ProcessPoolExecutor]:
+    global _quote_parse_pool
+    if QUOTE_PARSE_WORKERS <= 0:
+        return None
+    with _quote_parse_pool_lock:
+        if _quote_parse_pool is None:
+            _quote_parse_pool = ProcessPoolExecutor(max_workers=QUOTE_PARSE_WORKERS)
+        return _quote_parse_pool
+
+
+def shutdown_quote_parse_pool() -> None:
+    """Detiene el pool (al apagar la API o si quedó roto); se recrea en el próximo uso."""
+    global _quote_parse_pool
+    with _quote_parse_pool_lock:
+        if _quote_parse_pool is not None:
+            _quote_parse_pool.shutdown(wait=False, cancel_futures=True)
+        _quote_parse_pool = None
+
+
+def _parse_quote_worker(content: bytes, filename: str) -> Tuple[Optional[dict], Optional[str], float]:
+    """
+    Ejecuta parse_quote_excel en un proceso del pool.
+
+    Devuelve (cotización, error, milisegundos); los errores se devuelven como texto
+    para que un archivo inválido no cancele el resto del lote.
+    """
+    started = time.perf_counter()
+    try:
+        parsed = parse_quote_excel(content, filename)
+        error = None
+    except HTTPException as exc:
+        parsed, error = None, str(exc.detail)
+    except Exception as exc:  # pragma: no cover - defensive
+        parsed, error = None, f"No se pudo leer el archivo: {exc}"
+    return parsed, error, round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _parse_quote_files(files: List[Tuple[str, bytes]]) -> List[Tuple[Optional[dict], Optional[str], float]]:
+    """Parsea los archivos en paralelo; el orden del resultado es el de entrada."""
+    loop = asyncio.get_running_loop()
+
+    async def parse_one(filename: str, content: bytes):
+        if Path(filename).suffix.lower() not in {".xls", ".xlsx"}:
+            return None, f"El archivo {filename} debe ser un archivo Excel (.xls o .xlsx).", 0.0
+        pool = _get_quote_parse_pool()
+        if pool is not None:
+            try:
+                return await loop.run_in_executor(pool, _parse_quote_worker, content, filename)
+            except BrokenProcessPool:
+                shutdown_quote_parse_pool()
+        return await run_in_threadpool(_parse_quote_worker, content, filename)
+
+    return await asyncio.gather(*(parse_one(filename, content) for filename, content in files))
+
+
 @router.post("/quotes")
 async def upload_quotes(
     files: List[UploadFile] = File(...),
@@ -1762,6 +2017,10 @@ async def upload_quotes(
 ):
     """
     Carga múltiples cotizaciones en Excel. Extrae los productos y registra la información en MySQL.
+
+    Los archivos se parsean en paralelo en un pool de procesos; los que fallan se
+    reportan en ``fallidos`` sin abortar el resto del lote, que se guarda en una
+    sola transacción.
     """
     company_id = _get_company_id(current_user)
     if not files:
@@ -1769,23 +2028,27 @@ async def upload_quotes(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Debe adjuntar al menos un archivo Excel (.xls o .xlsx)."
         )
 
-    resultados = []
-    now = datetime.utcnow()
-
+    batch_started = time.perf_counter()
+    uploads: List[Tuple[Optional[str], bytes]] = []
     for upload in files:
-        filename = upload.filename or "cotizacion.xlsx"
-        extension = Path(filename).suffix.lower()
-        content = await upload.read()
+        uploads.append((upload.filename, await upload.read()))
 
-        if extension not in {".xls", ".xlsx"}:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"El archivo {upload.filename} debe ser un archivo Excel (.xls o .xlsx).",
-            )
+    parsed_files = await _parse_quote_files(
+        [(filename or "cotizacion.xlsx", content) for filename, content in uploads]
+    )
+    parse_ms = round((time.perf_counter() - batch_started) * 1000, 1)
 
-        parsed = parse_quote_excel(content, filename)
+    resultados = []
+    fallidos = []
+    now = datetime.utcnow()
+    db_started = time.perf_counter()
 
-        safe_name = _safe_filename(upload.filename or f"cotizacion_{parsed['numero_cotizacion']}.xlsx")
+    for (filename, content), (parsed, error, file_parse_ms) in zip(uploads, parsed_files):
+        if parsed is None:
+            fallidos.append({"archivo": filename, "error": error, "parse_ms": file_parse_ms})
+            continue
+
+        safe_name = _safe_filename(filename or f"cotizacion_{parsed['numero_cotizacion']}.xlsx")
         timestamped_name = f"{int(now.timestamp())}_{safe_name}"
         file_path = file_storage.save_bytes(company_id, timestamped_name, content)
 
@@ -1832,17 +2095,35 @@ async def upload_quotes(
 
         resultados.append(
             {
-                "archivo": upload.filename,
+                "archivo": filename,
                 "cotizacion": quote.numero_cotizacion,
                 "productos": len(parsed["productos"]),
+                "parse_ms": file_parse_ms,
             }
         )
 
+    if not resultados:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="; ".join(f"{item['archivo']}: {item['error']}" for item in fallidos),
+        )
+
     db.commit()
+    _invalidate_dashboard_snapshot(company_id)
 
     return {
-        "message": "Cotizaciones procesadas correctamente.",
+        "message": (
+            "Cotizaciones procesadas correctamente."
+            if not fallidos
+            else f"Se procesaron {len(resultados)} cotizaciones; {len(fallidos)} archivos no se pudieron leer."
+        ),
         "resultados": resultados,
+        "fallidos": fallidos,
+        "tiempos": {
+            "parse_ms": parse_ms,
+            "db_ms": round((time.perf_counter() - db_started) * 1000, 1),
+            "total_ms": round((time.perf_counter() - batch_started) * 1000, 1),
+        },
     }
 
 
@@ -2036,6 +2317,7 @@ async def confirm_stock_planning(
             total_planes_creados += 1
 
     db.commit()
+    _invalidate_dashboard_snapshot(company_id)
 
     return {
         "message": f"Programación de stock guardada correctamente.",
@@ -2239,6 +2521,7 @@ async def update_item(
 
     quote.updated_at = datetime.utcnow()
     db.commit()
+    _invalidate_dashboard_snapshot(company_id)
     db.refresh(product)
 
     return {"item": product_to_dict(product)}
@@ -2390,6 +2673,7 @@ async def upsert_daily_production_plan(
             )
 
     db.commit()
+    _invalidate_dashboard_snapshot(company_id)
 
     refreshed_entries = (
         db.query(ProductionDailyPlan)
@@ -2419,52 +2703,30 @@ async def get_dashboard_schedule(
     db: Session = Depends(get_db),
 ) -> DailyScheduleResponse:
     company_id = _get_company_id(current_user)
-    today = date.today()
+    return _get_dashboard_snapshot(db, company_id).schedule
+
+
+def _build_dashboard_schedule(
+    today: date,
+    dashboard_items: List[_DashboardItem],
+) -> DailyScheduleResponse:
     max_future = today + timedelta(days=21)
     history_window_days = 31
     month_start = date(today.year, today.month, 1)
     min_allowed_date = min(month_start, today - timedelta(days=history_window_days))
     decimal_zero = Decimal(0)
 
-    active_items: List[ProductionProduct] = (
-        db.query(ProductionProduct)
-        .options(joinedload(ProductionProduct.cotizacion))
-        .filter(
-            ProductionProduct.company_id == company_id,
-            ProductionProduct.estatus != ProductionStatusEnum.ENTREGADO,
-            ProductionProduct.estatus != ProductionStatusEnum.EN_BODEGA
-        )
-        .all()
-    )
-
     schedule_totals: Dict[date, Dict[str, Decimal | bool]] = defaultdict(
         lambda: {"metros": decimal_zero, "unidades": decimal_zero, "manual": False}
     )
     schedule_items_map: Dict[date, List[DailyScheduleItem]] = defaultdict(list)
 
-    manual_plan_by_item: Dict[int, List[ProductionDailyPlan]] = defaultdict(list)
-    if active_items:
-        plan_entries = (
-            db.query(ProductionDailyPlan)
-            .filter(
-                ProductionDailyPlan.company_id == company_id,
-                ProductionDailyPlan.producto_id.in_([item.id for item in active_items])
-            )
-            .all()
-        )
-        for plan_entry in plan_entries:
-            manual_plan_by_item[plan_entry.producto_id].append(plan_entry)
-        for entries in manual_plan_by_item.values():
-            entries.sort(key=lambda entry: entry.fecha)
-
-    for item in active_items:
-        quote = item.cotizacion
-        if _is_metadata_description(item.descripcion, quote.odc if quote else None):
-            continue
-        if _is_service_product(item.descripcion):
-            continue
+    for dashboard_item in dashboard_items:
+        item = dashboard_item.item
+        quote = dashboard_item.quote
 
-        quantity_value, quantity_unit = _extract_quantity_info(item.cantidad)
+        quantity_value = dashboard_item.quantity_value
+        quantity_unit = dashboard_item.quantity_unit
         if quantity_value is None or quantity_value <= decimal_zero:
             continue
 
@@ -2472,7 +2734,7 @@ async def get_dashboard_schedule(
         base_cotizacion = quote.numero_cotizacion if quote else None
         estatus_label = item.estatus.value if item.estatus else None
 
-        manual_entries = manual_plan_by_item.get(item.id, [])
+        manual_entries = dashboard_item.plan_entries
         if manual_entries:
             for plan_entry in manual_entries:
                 metros_plan = Decimal(plan_entry.metros or decimal_zero)
@@ -2538,40 +2800,8 @@ async def get_dashboard_schedule(
             )
             continue
 
-        if quote and quote.fecha_ingreso:
-            start_date = quote.fecha_ingreso.date()
-        else:
-            start_date = end_date
-        if start_date < today:
-            start_date = today
-        start_date = _next_working_day(start_date)
-
-        # Para pedidos de stock, la fecha de entrega es el día que estará disponible
-        # Para cotizaciones de cliente, la producción termina un día antes
-        is_stock = quote and quote.tipo_produccion == ProductionTypeEnum.STOCK
-        if is_stock:
-            # Stock: producción disponible el mismo día (si es hábil)
-            if _is_working_day(end_date):
-                production_end = end_date
-            else:
-                production_end = _previous_working_day(end_date, include_today=False)
-        else:
-            # Cliente: producción termina el día hábil anterior a la entrega
-            production_end = _previous_working_day(end_date)
-
-        if production_end < start_date:
-            if start_date == end_date and _is_working_day(start_date):
-                working_days = [start_date]
-            else:
-                working_days = [production_end]
-        else:
-            working_days = _iter_working_days(start_date, production_end)
-        if not working_days:
-            fallback_date = _previous_working_day(end_date, include_today=True)
-            working_days = [fallback_date]
-
-        share = quantity_value / Decimal(len(working_days))
-        for target_date in working_days:
+        working_days = _production_days(quote, end_date, today)
+        for target_date, share in _WORKING_DAY_CALENDAR.distribute(working_days, quantity_value):
             if target_date < min_allowed_date:
                 continue
             bucket_date = target_date
@@ -2645,6 +2875,7 @@ async def delete_quote(
     numero_cotizacion = quote.numero_cotizacion
     db.delete(quote)
     db.commit()
+    _invalidate_dashboard_snapshot(company_id)
 
     return {
         "message": f"Cotización {numero_cotizacion} eliminada.",
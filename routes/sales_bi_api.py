@@ -2,20 +2,43 @@
 API REST para módulo BI de Ventas con filtros dinámicos
 Enfoque Comercial y Financiero
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, extract, desc, asc, case
 from typing import List, Optional, Dict, Any
-from datetime import datetime, date
-import csv
-import io
-from decimal import Decimal
+from datetime import datetime
+import shutil
+import tempfile
 
 from database.connection import get_db
 from models.user import User
 from models.sales import SalesTransaction, SalesKPICache, SalesAlert, SalesSavedFilter
 from auth.dependencies import get_current_user, require_permission
 from auth.tenant_context import get_current_tenant
+from auth.policy_engine import PolicyEngine
+from services.sales_cube import (
+    CUBE_METRICS,
+    GROUPED_METRICS,
+    compute_sales_cube,
+    fetch_sales_frame,
+)
+from services.sales_ingest import (
+    DEFAULT_BATCH_SIZE,
+    create_upload_job,
+    get_upload_job,
+    load_sales_csv,
+    open_csv_text,
+    run_upload_job,
+)
+from services.sales_rollup import (
+    DIMENSION_COLUMNS,
+    clear_sales_rollup,
+    plan_rollup_query,
+    rollup_monthly,
+    rollup_ranking,
+    rollup_totals,
+)
 
 router = APIRouter(prefix='/api/sales-bi', tags=['Sales BI'])
 
@@ -71,6 +94,116 @@ def _apply_temporal_filters(
 
     return query
 
+
+def _summary_payload(result) -> Dict[str, Any]:
+    # Calcular métricas derivadas
+    venta_neta = float(result.venta_neta_total or 0)
+    rentabilidad = float(result.rentabilidad_total or 0)
+    costo_venta = float(result.costo_venta_total or 0)
+    descuento = float(result.descuento_total or 0)
+
+    margen_bruto = (rentabilidad / venta_neta * 100) if venta_neta > 0 else 0
+    ticket_promedio = (venta_neta / result.num_facturas) if result.num_facturas > 0 else 0
+
+    return {
+        'venta_neta_total': round(venta_neta, 2),
+        'rentabilidad_total': round(rentabilidad, 2),
+        'costo_venta_total': round(costo_venta, 2),
+        'descuento_total': round(descuento, 2),
+        'margen_bruto_porcentaje': round(margen_bruto, 2),
+        'num_facturas': result.num_facturas,
+        'num_clientes': result.num_clientes,
+        'metros_cuadrados': float(result.metros_cuadrados or 0),
+        'unidades_vendidas': float(result.metros_cuadrados or 0),
+        'ticket_promedio': round(ticket_promedio, 2)
+    }
+
+
+def _gerencial_payload(result) -> Dict[str, Any]:
+    total_m2 = float(result.total_m2 or 0)
+    venta_neta = float(result.venta_neta_total or 0)
+    rentabilidad = float(result.rentabilidad_total or 0)
+    costo_venta = float(result.costo_venta_total or 0)
+    descuento = float(result.descuento_total or 0)
+    venta_bruta = float(result.venta_bruta_total or 0)
+
+    # Cálculos por m²
+    precio_neto_m2 = (venta_neta / total_m2) if total_m2 > 0 else 0
+    margen_m2 = (rentabilidad / total_m2) if total_m2 > 0 else 0
+    costo_m2 = (costo_venta / total_m2) if total_m2 > 0 else 0
+    porcentaje_descuento = (descuento / venta_bruta * 100) if venta_bruta > 0 else 0
+    margen_porcentaje = (rentabilidad / costo_venta * 100) if costo_venta > 0 else 0
+
+    return {
+        'total_m2': round(total_m2, 2),
+        'venta_neta_total': round(venta_neta, 2),
+        'precio_neto_m2': round(precio_neto_m2, 2),
+        'margen_m2': round(margen_m2, 2),
+        'costo_m2': round(costo_m2, 2),
+        'porcentaje_descuento': round(porcentaje_descuento, 2),
+        'margen_sobre_costo': round(margen_porcentaje, 2),
+        'rentabilidad_total': round(rentabilidad, 2)
+    }
+
+
+def _commercial_rows(results) -> List[Dict[str, Any]]:
+    data = []
+    for row in results:
+        venta_neta = float(row.venta_neta or 0)
+        descuento = float(row.descuento or 0)
+        num_facturas = int(row.num_facturas or 0)
+
+        data.append({
+            'dimension': row.dimension,
+            'venta_neta': round(venta_neta, 2),
+            'descuento': round(descuento, 2),
+            'num_facturas': num_facturas,
+            'metros_cuadrados': float(row.metros_cuadrados or 0),
+            'unidades': float(row.metros_cuadrados or 0),
+            'ticket_promedio': round(venta_neta / num_facturas, 2) if num_facturas > 0 else 0,
+            'porcentaje_descuento': round(descuento / (venta_neta + descuento) * 100, 2) if (venta_neta + descuento) > 0 else 0
+        })
+    return data
+
+
+def _financial_rows(results) -> List[Dict[str, Any]]:
+    data = []
+    for row in results:
+        venta_neta = float(row.venta_neta or 0)
+        costo_venta = float(row.costo_venta or 0)
+        rentabilidad = float(row.rentabilidad or 0)
+
+        data.append({
+            'dimension': row.dimension,
+            'venta_neta': round(venta_neta, 2),
+            'costo_venta': round(costo_venta, 2),
+            'rentabilidad': round(rentabilidad, 2),
+            'margen_porcentaje': round(rentabilidad / venta_neta * 100, 2) if venta_neta > 0 else 0,
+            'ratio_costo_venta': round(costo_venta / venta_neta * 100, 2) if venta_neta > 0 else 0,
+            'num_transacciones': int(row.num_transacciones or 0)
+        })
+    return data
+
+
+def _trend_rows(results) -> List[Dict[str, Any]]:
+    data = []
+    for row in results:
+        venta_neta = float(row.venta_neta or 0)
+        rentabilidad = float(row.rentabilidad or 0)
+        costo_venta = float(row.costo_venta or 0)
+
+        data.append({
+            'year': row.year,
+            'month': row.month,
+            'period': f"{row.year}-{str(row.month).zfill(2)}",
+            'venta_neta': round(venta_neta, 2),
+            'rentabilidad': round(rentabilidad, 2),
+            'costo_venta': round(costo_venta, 2),
+            'margen_porcentaje': round(rentabilidad / venta_neta * 100, 2) if venta_neta > 0 else 0,
+            'num_facturas': int(row.num_facturas or 0)
+        })
+    return data
+
 # ===================================================================
 # ENDPOINTS DE CONSULTA CON FILTROS DINÁMICOS
 # ===================================================================
@@ -93,53 +226,44 @@ async def get_dashboard_summary(
     Resumen ejecutivo del dashboard con KPIs principales
     """
     company_id = _get_company_id(current_user)
-    # Construir query con filtros dinámicos
-    query = db.query(
-        func.sum(SalesTransaction.venta_neta).label('venta_neta_total'),
-        func.sum(SalesTransaction.rentabilidad).label('rentabilidad_total'),
-        func.sum(SalesTransaction.costo_venta).label('costo_venta_total'),
-        func.sum(SalesTransaction.descuento).label('descuento_total'),
-        func.count(func.distinct(SalesTransaction.numero_factura)).label('num_facturas'),
-        func.count(func.distinct(SalesTransaction.razon_social)).label('num_clientes'),
-        func.sum(SalesTransaction.m2).label('metros_cuadrados')
-    ).filter(SalesTransaction.company_id == company_id)
-
-    # Aplicar filtros dinámicos
-    query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
-    if categoria:
-        query = query.filter(SalesTransaction.categoria_producto == categoria)
-    if canal:
-        query = query.filter(SalesTransaction.canal_comercial == canal)
-    if vendedor:
-        query = query.filter(SalesTransaction.vendedor == vendedor)
-    if cliente:
-        query = query.filter(SalesTransaction.razon_social == cliente)
-
-    result = query.first()
-
-    # Calcular métricas derivadas
-    venta_neta = float(result.venta_neta_total or 0)
-    rentabilidad = float(result.rentabilidad_total or 0)
-    costo_venta = float(result.costo_venta_total or 0)
-    descuento = float(result.descuento_total or 0)
+    plan = plan_rollup_query(
+        db,
+        company_id,
+        _resolve_years(year, years),
+        _resolve_months(month, months),
+        {'categoria': categoria, 'canal': canal, 'vendedor': vendedor, 'cliente': cliente},
+        distinct_dimension='cliente',
+    )
+    if plan is not None:
+        result = rollup_totals(db, company_id, plan)
+    else:
+        # Construir query con filtros dinámicos
+        query = db.query(
+            func.sum(SalesTransaction.venta_neta).label('venta_neta_total'),
+            func.sum(SalesTransaction.rentabilidad).label('rentabilidad_total'),
+            func.sum(SalesTransaction.costo_venta).label('costo_venta_total'),
+            func.sum(SalesTransaction.descuento).label('descuento_total'),
+            func.count(func.distinct(SalesTransaction.numero_factura)).label('num_facturas'),
+            func.count(func.distinct(SalesTransaction.razon_social)).label('num_clientes'),
+            func.sum(SalesTransaction.m2).label('metros_cuadrados')
+        ).filter(SalesTransaction.company_id == company_id)
+
+        # Aplicar filtros dinámicos
+        query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
+        if categoria:
+            query = query.filter(SalesTransaction.categoria_producto == categoria)
+        if canal:
+            query = query.filter(SalesTransaction.canal_comercial == canal)
+        if vendedor:
+            query = query.filter(SalesTransaction.vendedor == vendedor)
+        if cliente:
+            query = query.filter(SalesTransaction.razon_social == cliente)
 
-    margen_bruto = (rentabilidad / venta_neta * 100) if venta_neta > 0 else 0
-    ticket_promedio = (venta_neta / result.num_facturas) if result.num_facturas > 0 else 0
+        result = query.first()
 
     return {
         'success': True,
-        'data': {
-            'venta_neta_total': round(venta_neta, 2),
-            'rentabilidad_total': round(rentabilidad, 2),
-            'costo_venta_total': round(costo_venta, 2),
-            'descuento_total': round(descuento, 2),
-            'margen_bruto_porcentaje': round(margen_bruto, 2),
-            'num_facturas': result.num_facturas,
-            'num_clientes': result.num_clientes,
-            'metros_cuadrados': float(result.metros_cuadrados or 0),
-            'unidades_vendidas': float(result.metros_cuadrados or 0),
-            'ticket_promedio': round(ticket_promedio, 2)
-        }
+        'data': _summary_payload(result)
     }
 
 
@@ -196,22 +320,7 @@ async def get_commercial_analysis(
     query = query.group_by(group_field).order_by(desc('venta_neta')).limit(limit)
 
     results = query.all()
-
-    data = []
-    for row in results:
-        venta_neta = float(row.venta_neta or 0)
-        descuento = float(row.descuento or 0)
-
-        data.append({
-            'dimension': row.dimension,
-            'venta_neta': round(venta_neta, 2),
-            'descuento': round(descuento, 2),
-            'num_facturas': row.num_facturas,
-            'metros_cuadrados': float(row.metros_cuadrados or 0),
-            'unidades': float(row.metros_cuadrados or 0),
-            'ticket_promedio': round(venta_neta / row.num_facturas, 2) if row.num_facturas > 0 else 0,
-            'porcentaje_descuento': round(descuento / (venta_neta + descuento) * 100, 2) if (venta_neta + descuento) > 0 else 0
-        })
+    data = _commercial_rows(results)
 
     return {
         'success': True,
@@ -273,22 +382,7 @@ async def get_financial_analysis(
     query = query.group_by(group_field).order_by(desc('rentabilidad')).limit(limit)
 
     results = query.all()
-
-    data = []
-    for row in results:
-        venta_neta = float(row.venta_neta or 0)
-        costo_venta = float(row.costo_venta or 0)
-        rentabilidad = float(row.rentabilidad or 0)
-
-        data.append({
-            'dimension': row.dimension,
-            'venta_neta': round(venta_neta, 2),
-            'costo_venta': round(costo_venta, 2),
-            'rentabilidad': round(rentabilidad, 2),
-            'margen_porcentaje': round(rentabilidad / venta_neta * 100, 2) if venta_neta > 0 else 0,
-            'ratio_costo_venta': round(costo_venta / venta_neta * 100, 2) if venta_neta > 0 else 0,
-            'num_transacciones': row.num_transacciones
-        })
+    data = _financial_rows(results)
 
     return {
         'success': True,
@@ -316,47 +410,42 @@ async def get_monthly_trends(
     Tendencias mensuales de ventas y rentabilidad
     """
     company_id = _get_company_id(current_user)
-    query = db.query(
-        SalesTransaction.year,
-        SalesTransaction.month,
-        func.sum(SalesTransaction.venta_neta).label('venta_neta'),
-        func.sum(SalesTransaction.rentabilidad).label('rentabilidad'),
-        func.sum(SalesTransaction.costo_venta).label('costo_venta'),
-        func.count(func.distinct(SalesTransaction.numero_factura)).label('num_facturas')
-    ).filter(SalesTransaction.company_id == company_id)
-
-    query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
-    if categoria:
-        query = query.filter(SalesTransaction.categoria_producto == categoria)
-    if canal:
-        query = query.filter(SalesTransaction.canal_comercial == canal)
-    if vendedor:
-        query = query.filter(SalesTransaction.vendedor == vendedor)
-    if cliente:
-        query = query.filter(SalesTransaction.razon_social == cliente)
-
-    query = query.group_by(SalesTransaction.year, SalesTransaction.month).order_by(
-        SalesTransaction.year, SalesTransaction.month
+    plan = plan_rollup_query(
+        db,
+        company_id,
+        _resolve_years(year, years),
+        _resolve_months(month, months),
+        {'categoria': categoria, 'canal': canal, 'vendedor': vendedor, 'cliente': cliente},
     )
+    if plan is not None:
+        results = rollup_monthly(db, company_id, plan)
+    else:
+        query = db.query(
+            SalesTransaction.year,
+            SalesTransaction.month,
+            func.sum(SalesTransaction.venta_neta).label('venta_neta'),
+            func.sum(SalesTransaction.rentabilidad).label('rentabilidad'),
+            func.sum(SalesTransaction.costo_venta).label('costo_venta'),
+            func.count(func.distinct(SalesTransaction.numero_factura)).label('num_facturas')
+        ).filter(SalesTransaction.company_id == company_id)
+
+        query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
+        if categoria:
+            query = query.filter(SalesTransaction.categoria_producto == categoria)
+        if canal:
+            query = query.filter(SalesTransaction.canal_comercial == canal)
+        if vendedor:
+            query = query.filter(SalesTransaction.vendedor == vendedor)
+        if cliente:
+            query = query.filter(SalesTransaction.razon_social == cliente)
 
-    results = query.all()
+        query = query.group_by(SalesTransaction.year, SalesTransaction.month).order_by(
+            SalesTransaction.year, SalesTransaction.month
+        )
 
-    data = []
-    for row in results:
-        venta_neta = float(row.venta_neta or 0)
-        rentabilidad = float(row.rentabilidad or 0)
-        costo_venta = float(row.costo_venta or 0)
+        results = query.all()
 
-        data.append({
-            'year': row.year,
-            'month': row.month,
-            'period': f"{row.year}-{str(row.month).zfill(2)}",
-            'venta_neta': round(venta_neta, 2),
-            'rentabilidad': round(rentabilidad, 2),
-            'costo_venta': round(costo_venta, 2),
-            'margen_porcentaje': round(rentabilidad / venta_neta * 100, 2) if venta_neta > 0 else 0,
-            'num_facturas': row.num_facturas
-        })
+    data = _trend_rows(results)
 
     return {
         'success': True,
@@ -365,6 +454,83 @@ async def get_monthly_trends(
     }
 
 
+@router.get('/dashboard/cube')
+async def get_dashboard_cube(
+    year: Optional[int] = None,
+    years: Optional[List[int]] = Query(None),
+    month: Optional[int] = None,
+    months: Optional[List[int]] = Query(None),
+    categoria: Optional[str] = None,
+    canal: Optional[str] = None,
+    vendedor: Optional[str] = None,
+    cliente: Optional[str] = None,
+    metrics: Optional[List[str]] = Query(None),
+    dimensions: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    _: None = Depends(require_permission('bi', 'view'))
+):
+    """
+    Todos los paneles del dashboard en una sola lectura de las transacciones filtradas
+    """
+    company_id = _get_company_id(current_user)
+    requested_metrics = list(dict.fromkeys(metrics or CUBE_METRICS))
+    invalid = [m for m in requested_metrics if m not in CUBE_METRICS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Métricas no soportadas: {', '.join(invalid)}")
+
+    grouped = any(m in GROUPED_METRICS for m in requested_metrics)
+    requested_dimensions = list(dict.fromkeys(dimensions or ['categoria'])) if grouped else []
+    invalid = [d for d in requested_dimensions if d not in DIMENSION_COLUMNS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Dimensiones no soportadas: {', '.join(invalid)}")
+
+    for metric, resource in (('commercial', 'bi_comercial'), ('financial', 'bi_financiero')):
+        if metric in requested_metrics and not PolicyEngine.has_permission(
+            current_user, resource, 'view', db, company_id
+        ):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    filters = {'categoria': categoria, 'canal': canal, 'vendedor': vendedor, 'cliente': cliente}
+    try:
+        frame = fetch_sales_frame(
+            db,
+            company_id,
+            _resolve_years(year, years),
+            _resolve_months(month, months),
+            filters,
+            requested_dimensions,
+        )
+    except RuntimeError as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+    panels = compute_sales_cube(frame, requested_metrics, requested_dimensions, filters, limit)
+
+    data: Dict[str, Any] = {}
+    if 'summary' in panels:
+        data['summary'] = _summary_payload(panels['summary'])
+    if 'kpis_gerencial' in panels:
+        data['kpis_gerencial'] = _gerencial_payload(panels['kpis_gerencial'])
+    if 'trends' in panels:
+        data['trends'] = _trend_rows(panels['trends'])
+    if 'commercial' in panels:
+        data['commercial'] = {
+            dimension: _commercial_rows(rows) for dimension, rows in panels['commercial'].items()
+        }
+    if 'financial' in panels:
+        data['financial'] = {
+            dimension: _financial_rows(rows) for dimension, rows in panels['financial'].items()
+        }
+
+    return {
+        'success': True,
+        'metrics': requested_metrics,
+        'dimensions': requested_dimensions,
+        'rows_scanned': len(frame),
+        'data': data
+    }
+
+
 @router.get('/filters/options')
 async def get_filter_options(
     db: Session = Depends(get_db),
@@ -581,14 +747,17 @@ async def get_dynamic_filter_options(
 
 @router.post('/upload/csv')
 async def upload_sales_csv(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     overwrite: bool = Form(False),
+    batch_size: int = Form(DEFAULT_BATCH_SIZE, ge=100, le=50000),
+    background: bool = Form(False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     _: None = Depends(require_permission('sales', 'upload'))
 ):
     """
-    Cargar datos de ventas desde archivo CSV
+    Cargar datos de ventas desde archivo CSV (lectura por lotes, opcionalmente en segundo plano)
     """
     company_id = _get_company_id(current_user)
     print("--- Iniciando carga de CSV de ventas ---")
@@ -599,172 +768,55 @@ async def upload_sales_csv(
         print("Error: El archivo no es CSV.")
         raise HTTPException(status_code=400, detail='El archivo debe ser CSV')
 
-    try:
-        deleted_records = 0
-        if overwrite:
-            print("Modo sobreescritura activo: eliminando registros previos de la empresa...")
-            deleted_records = db.query(SalesTransaction).filter(
-                SalesTransaction.company_id == company_id
-            ).delete(synchronize_session=False)
-            db.commit()
-            print(f"Registros eliminados: {deleted_records}")
-
-        # Leer contenido del archivo
-        contents = await file.read()
-        csv_data = contents.decode('utf-8-sig')
-        csv_reader = csv.DictReader(io.StringIO(csv_data), delimiter=';')
-        
-        rows = list(csv_reader)
-        print(f"Se encontraron {len(rows)} filas en el CSV.")
-
-        transactions = []
-        errors = []
-        duplicates_skipped = 0
-        warnings = []
-
-        existing_keys = set()
-        if not overwrite:
-            # Buscar duplicados potenciales solo para las facturas incluidas en el CSV
-            # Usando clave única más específica: factura + producto + fecha + cantidad + venta_neta
-            invoice_numbers = {row.get('# Factura', '').strip() for row in rows if row.get('# Factura')}
-            if invoice_numbers:
-                print(f"Buscando duplicados para {len(invoice_numbers)} facturas presentes en el CSV...")
-                existing_records = db.query(
-                    SalesTransaction.numero_factura,
-                    SalesTransaction.producto,
-                    SalesTransaction.fecha_emision,
-                    SalesTransaction.cantidad_facturada,
-                    SalesTransaction.venta_neta
-                ).filter(
-                    SalesTransaction.company_id == company_id,
-                    SalesTransaction.numero_factura.in_(invoice_numbers)
-                ).all()
-                existing_keys = {
-                    (num, prod, fecha.isoformat() if fecha else '', float(cant or 0), float(venta or 0))
-                    for num, prod, fecha, cant, venta in existing_records
-                }
-                if existing_keys:
-                    warnings.append(
-                        f"Se encontraron {len(existing_keys)} registros idénticos ya registrados. "
-                        "Se omitirán del nuevo archivo."
-                    )
-                    print(f"Duplicados detectados: {len(existing_keys)} registros idénticos existentes.")
-                else:
-                    print("No se detectaron duplicados previos en la base de datos para estas facturas.")
-            else:
-                print("El archivo no contiene números de factura válidos para validar duplicados.")
-        else:
-            print("Sobrescritura solicitada, se omite validación de duplicados previa.")
-
-        processed_keys = set()
-
-        for idx, row in enumerate(rows, start=2):
-            try:
-                # Convertir formato de fecha (dd/mm/yyyy)
-                fecha_str = row.get('Fecha de Emisión', '').strip()
-                if not fecha_str:
-                    errors.append(f"Línea {idx}: La columna 'Fecha de Emisión' está vacía.")
-                    continue
-                
-                fecha_parts = fecha_str.split('/')
-                if len(fecha_parts) != 3:
-                    errors.append(f"Línea {idx}: Fecha '{fecha_str}' no tiene el formato dd/mm/yyyy.")
-                    continue
-
-                day, month, year = int(fecha_parts[0]), int(fecha_parts[1]), int(fecha_parts[2])
-                fecha_emision = date(year, month, day)
-
-                # Convertir valores numéricos (formato latino: coma decimal)
-                def parse_decimal(value_str: Optional[str]) -> Decimal:
-                    if not value_str or not value_str.strip():
-                        return Decimal('0')
-                    # Limpiar el valor: quitar puntos de miles y reemplazar coma decimal por punto
-                    cleaned_value = value_str.strip().replace('.', '').replace(',', '.')
-                    return Decimal(cleaned_value)
-
-                invoice_number = row.get('# Factura', '').strip()
-                product_name = row.get('Producto', '').strip()
-
-                # Obtener valores numéricos para la clave única
-                cantidad = parse_decimal(row.get('Cantidad Facturada'))
-                venta_neta = parse_decimal(row.get('Venta Neta $'))
-
-                # Clave única más específica: factura + producto + fecha + cantidad + venta_neta
-                key = (invoice_number, product_name, fecha_emision.isoformat(), float(cantidad), float(venta_neta))
-
-                if key in processed_keys:
-                    duplicates_skipped += 1
-                    continue
-
-                if not overwrite and key in existing_keys:
-                    duplicates_skipped += 1
-                    continue
-
-                processed_keys.add(key)
-
-                transaction = SalesTransaction(
-                    fecha_emision=fecha_emision,
-                    categoria_producto=row.get('Categoría Producto', '').strip(),
-                    vendedor=row.get('Vendedor', '').strip(),
-                    numero_factura=invoice_number,
-                    canal_comercial=row.get('Canal Comercial', '').strip(),
-                    razon_social=row.get('Razón Social', '').strip(),
-                    producto=product_name,
-                    cantidad_facturada=parse_decimal(row.get('Cantidad Facturada')),
-                    factor_conversion=parse_decimal(row.get('Factor Conversión', '1')),
-                    m2=parse_decimal(row.get('M2')),
-                    venta_bruta=parse_decimal(row.get('Venta Bruta $')),
-                    descuento=parse_decimal(row.get('Descuento $')),
-                    venta_neta=parse_decimal(row.get('Venta Neta $')),
-                    costo_venta=parse_decimal(row.get('Costo Venta $')),
-                    costo_unitario=parse_decimal(row.get('Costo Uni.$')),
-                    rentabilidad=parse_decimal(row.get('Rentabilidad $')),
-                    company_id=company_id
-                )
-                transactions.append(transaction)
-
-            except (ValueError, TypeError, IndexError) as e:
-                errors.append(f"Línea {idx}: Error de formato o dato inválido - {str(e)}. Fila: {row}")
-            except Exception as e:
-                errors.append(f"Línea {idx}: Error inesperado - {str(e)}. Fila: {row}")
-
-        print(f"Procesamiento finalizado. {len(transactions)} transacciones válidas, {len(errors)} errores.")
-
-        # Insertar en base de datos
-        if transactions:
-            print(f"Insertando {len(transactions)} registros en la base de datos...")
-            db.bulk_save_objects(transactions)
-            db.commit()
-            print("Inserción completada y commit realizado.")
-        else:
-            print("No hay transacciones válidas para insertar.")
-
-        response_payload = {
-            'success': len(errors) == 0,
-            'message': f'Se procesaron {len(transactions)} de {len(rows)} transacciones.',
-            'total_uploaded': len(transactions),
-            'errors_count': len(errors),
-            'errors': errors[:20]
+    if background:
+        # El UploadFile se cierra al responder: copiarlo a un archivo temporal para el job
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.csv') as spooled:
+            await run_in_threadpool(shutil.copyfileobj, file.file, spooled)
+        job = create_upload_job(company_id, file.filename)
+        background_tasks.add_task(run_upload_job, job, db.get_bind(), spooled.name, overwrite, batch_size)
+        print(f"Carga encolada como job {job.id}")
+        return {
+            'success': True,
+            'message': 'Carga encolada para procesamiento en segundo plano.',
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"{router.prefix}/upload/jobs/{job.id}"
         }
 
-        if overwrite:
-            response_payload['deleted_previous'] = deleted_records
-
-        if duplicates_skipped:
-            response_payload['duplicates_skipped_count'] = duplicates_skipped
-            warnings.append(f"Se omitieron {duplicates_skipped} filas por duplicado.")
-
-        if warnings:
-            response_payload['warnings'] = warnings
-
-        return response_payload
-
+    try:
+        return await run_in_threadpool(
+            load_sales_csv,
+            db,
+            company_id,
+            open_csv_text(file.file),
+            overwrite,
+            batch_size,
+        )
     except Exception as e:
         db.rollback()
         print(f"--- ERROR FATAL en la carga de CSV: {str(e)} ---")
         raise HTTPException(status_code=500, detail=f'Error fatal al procesar CSV: {str(e)}')
 
 
+@router.get('/upload/jobs/{job_id}')
+async def get_upload_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    _: None = Depends(require_permission('sales', 'upload'))
+):
+    """
+    Estado y progreso por lote de una carga en segundo plano
+    """
+    company_id = _get_company_id(current_user)
+    job = get_upload_job(job_id, company_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Carga no encontrada')
+    return {
+        'success': True,
+        'data': job.to_dict()
+    }
+
+
 @router.delete('/data/clear')
 async def clear_sales_data(
     year: Optional[int] = None,
@@ -785,6 +837,7 @@ async def clear_sales_data(
 
     count = query.count()
     query.delete()
+    clear_sales_rollup(db, company_id, year)
     db.commit()
 
     return {
@@ -915,54 +968,41 @@ async def get_kpis_gerencial(
     KPIs gerenciales enfocados en m² y eficiencia
     """
     company_id = _get_company_id(current_user)
-    query = db.query(
-        func.sum(SalesTransaction.m2).label('total_m2'),
-        func.sum(SalesTransaction.venta_neta).label('venta_neta_total'),
-        func.sum(SalesTransaction.rentabilidad).label('rentabilidad_total'),
-        func.sum(SalesTransaction.costo_venta).label('costo_venta_total'),
-        func.sum(SalesTransaction.descuento).label('descuento_total'),
-        func.sum(SalesTransaction.venta_bruta).label('venta_bruta_total')
-    ).filter(SalesTransaction.company_id == company_id)
-
-    # Aplicar filtros
-    query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
-    if categoria:
-        query = query.filter(SalesTransaction.categoria_producto == categoria)
-    if canal:
-        query = query.filter(SalesTransaction.canal_comercial == canal)
-    if vendedor:
-        query = query.filter(SalesTransaction.vendedor == vendedor)
-    if cliente:
-        query = query.filter(SalesTransaction.razon_social == cliente)
-
-    result = query.first()
-
-    total_m2 = float(result.total_m2 or 0)
-    venta_neta = float(result.venta_neta_total or 0)
-    rentabilidad = float(result.rentabilidad_total or 0)
-    costo_venta = float(result.costo_venta_total or 0)
-    descuento = float(result.descuento_total or 0)
-    venta_bruta = float(result.venta_bruta_total or 0)
+    plan = plan_rollup_query(
+        db,
+        company_id,
+        _resolve_years(year, years),
+        _resolve_months(month, months),
+        {'categoria': categoria, 'canal': canal, 'vendedor': vendedor, 'cliente': cliente},
+    )
+    if plan is not None:
+        result = rollup_totals(db, company_id, plan)
+    else:
+        query = db.query(
+            func.sum(SalesTransaction.m2).label('total_m2'),
+            func.sum(SalesTransaction.venta_neta).label('venta_neta_total'),
+            func.sum(SalesTransaction.rentabilidad).label('rentabilidad_total'),
+            func.sum(SalesTransaction.costo_venta).label('costo_venta_total'),
+            func.sum(SalesTransaction.descuento).label('descuento_total'),
+            func.sum(SalesTransaction.venta_bruta).label('venta_bruta_total')
+        ).filter(SalesTransaction.company_id == company_id)
+
+        # Aplicar filtros
+        query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
+        if categoria:
+            query = query.filter(SalesTransaction.categoria_producto == categoria)
+        if canal:
+            query = query.filter(SalesTransaction.canal_comercial == canal)
+        if vendedor:
+            query = query.filter(SalesTransaction.vendedor == vendedor)
+        if cliente:
+            query = query.filter(SalesTransaction.razon_social == cliente)
 
-    # Cálculos por m²
-    precio_neto_m2 = (venta_neta / total_m2) if total_m2 > 0 else 0
-    margen_m2 = (rentabilidad / total_m2) if total_m2 > 0 else 0
-    costo_m2 = (costo_venta / total_m2) if total_m2 > 0 else 0
-    porcentaje_descuento = (descuento / venta_bruta * 100) if venta_bruta > 0 else 0
-    margen_porcentaje = (rentabilidad / costo_venta * 100) if costo_venta > 0 else 0
+        result = query.first()
 
     return {
         'success': True,
-        'data': {
-            'total_m2': round(total_m2, 2),
-            'venta_neta_total': round(venta_neta, 2),
-            'precio_neto_m2': round(precio_neto_m2, 2),
-            'margen_m2': round(margen_m2, 2),
-            'costo_m2': round(costo_m2, 2),
-            'porcentaje_descuento': round(porcentaje_descuento, 2),
-            'margen_sobre_costo': round(margen_porcentaje, 2),
-            'rentabilidad_total': round(rentabilidad, 2)
-        }
+        'data': _gerencial_payload(result)
     }
 
 
@@ -1002,24 +1042,40 @@ async def get_pareto_analysis(
     dimension_field = dimension_fields[dimension]
     metric_field = metric_fields[analysis_type]
 
-    query = db.query(
-        dimension_field.label('name'),
-        metric_field
-    ).filter(SalesTransaction.company_id == company_id)
-
-    # Aplicar filtros
-    query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
-    if categoria and dimension != 'categoria':
-        query = query.filter(SalesTransaction.categoria_producto == categoria)
-    if canal:
-        query = query.filter(SalesTransaction.canal_comercial == canal)
-    if vendedor:
-        query = query.filter(SalesTransaction.vendedor == vendedor)
-    if cliente and dimension != 'cliente':
-        query = query.filter(SalesTransaction.razon_social == cliente)
+    plan = plan_rollup_query(
+        db,
+        company_id,
+        _resolve_years(year, years),
+        _resolve_months(month, months),
+        {
+            'categoria': categoria if dimension != 'categoria' else None,
+            'canal': canal,
+            'vendedor': vendedor,
+            'cliente': cliente if dimension != 'cliente' else None,
+        },
+        group_by=dimension,
+    )
+    if plan is not None:
+        results = rollup_ranking(db, company_id, plan, analysis_type, limit)
+    else:
+        query = db.query(
+            dimension_field.label('name'),
+            metric_field
+        ).filter(SalesTransaction.company_id == company_id)
+
+        # Aplicar filtros
+        query = _apply_temporal_filters(query, year=year, years=years, month=month, months=months)
+        if categoria and dimension != 'categoria':
+            query = query.filter(SalesTransaction.categoria_producto == categoria)
+        if canal:
+            query = query.filter(SalesTransaction.canal_comercial == canal)
+        if vendedor:
+            query = query.filter(SalesTransaction.vendedor == vendedor)
+        if cliente and dimension != 'cliente':
+            query = query.filter(SalesTransaction.razon_social == cliente)
 
-    query = query.group_by(dimension_field).order_by(desc('value')).limit(limit)
-    results = query.all()
+        query = query.group_by(dimension_field).order_by(desc('value')).limit(limit)
+        results = query.all()
 
     # Calcular total y porcentajes acumulativos
     total = sum(float(r.value or 0) for r in results)
@@ -17,6 +17,9 @@ from database.connection import get_db
 from models import User, Company, AuditLog, Role
 from auth.dependencies import require_superuser, get_current_user
 from auth.password import PasswordHandler
+from auth.auth_cache import auth_cache
+from auth.policy_engine import PolicyEngine
+from services.platform_analytics import get_platform_overview, invalidate_platform_overview
 
 router = APIRouter(prefix="/superadmin", tags=["Super Admin"])
 
@@ -304,6 +307,7 @@ async def create_company(
             )
 
             db.commit()
+            invalidate_platform_overview()
             db.refresh(company)
 
             return CompanyResponse(
@@ -358,6 +362,7 @@ async def update_company(
     )
 
     db.commit()
+    invalidate_platform_overview()
     db.refresh(company)
 
     return CompanyResponse(
@@ -400,6 +405,7 @@ async def deactivate_company(
     )
 
     db.commit()
+    invalidate_platform_overview()
 
     return {
         "message": f"Company '{company.name}' deactivated successfully",
@@ -434,6 +440,7 @@ async def activate_company(
     )
 
     db.commit()
+    invalidate_platform_overview()
 
     return {
         "message": f"Company '{company.name}' activated successfully",
@@ -586,6 +593,7 @@ async def create_user_for_company(
         )
 
         db.commit()
+        invalidate_platform_overview()
         db.refresh(user)
 
         return UserResponse(
@@ -664,6 +672,7 @@ async def change_user_company(
     )
 
     db.commit()
+    invalidate_platform_overview()
 
     return {
         "message": f"User '{user.username}' moved to company '{new_company.name}'",
@@ -720,6 +729,10 @@ async def assign_roles_superadmin(
     )
 
     db.commit()
+    # Las escrituras Core sobre user_roles no pasan por los eventos del ORM
+    PolicyEngine.invalidate_user(user_id)
+    auth_cache.invalidate_user(user_id)
+    invalidate_platform_overview()
 
     return {
         "message": "Roles assigned successfully",
@@ -775,6 +788,7 @@ async def update_user_superadmin(
     )
 
     db.commit()
+    invalidate_platform_overview()
     db.refresh(user)
 
     return UserResponse(
@@ -805,46 +819,15 @@ async def update_user_superadmin(
 
 @router.get("/analytics/overview")
 async def get_analytics_overview(
+    refresh: bool = Query(False),
     current_user: User = Depends(superadmin_rate_limit),
     db: Session = Depends(get_db)
 ):
     """
     Get platform-wide analytics (super admin only)
-    """
-    # Companies stats
-    total_companies = db.query(Company).count()
-    active_companies = db.query(Company).filter(Company.is_active == True).count()
-
-    trial_companies = db.query(Company).filter(
-        Company.subscription_tier == "trial"
-    ).count()
-    professional_companies = db.query(Company).filter(
-        Company.subscription_tier == "professional"
-    ).count()
-    enterprise_companies = db.query(Company).filter(
-        Company.subscription_tier == "enterprise"
-    ).count()
-
-    # Users stats
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    superusers = db.query(User).filter(User.is_superuser == True).count()
 
-    return {
-        "companies": {
-            "total": total_companies,
-            "active": active_companies,
-            "inactive": total_companies - active_companies,
-            "by_tier": {
-                "trial": trial_companies,
-                "professional": professional_companies,
-                "enterprise": enterprise_companies
-            }
-        },
-        "users": {
-            "total": total_users,
-            "active": active_users,
-            "inactive": total_users - active_users,
-            "superusers": superusers
-        }
-    }
+    Counters and per-tenant data volumes come from a few grouped queries and
+    are cached for PLATFORM_ANALYTICS_TTL_SECONDS; refresh=true bypasses the cache.
+    """
+    overview, cached = get_platform_overview(db, refresh=refresh)
+    return {**overview, "cached": cached}
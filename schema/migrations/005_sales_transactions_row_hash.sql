@@ -0,0 +1,123 @@
+-- 005_sales_transactions_row_hash.sql
+-- Deduplicación de cargas CSV de ventas por hash de contenido
+-- - Agrega sales_transactions.row_hash (SHA-256 hex de la clave de duplicado)
+-- - Rellena el hash de las filas existentes con la misma fórmula que
+--   services/sales_ingest.sales_row_hash:
+--     SHA2(CONCAT_WS('|', numero_factura, producto, fecha ISO, cantidad_facturada, venta_neta), 256)
+-- - Deja en NULL el hash de duplicados previos (conserva la fila con menor id)
+-- - Crea el índice único (company_id, row_hash) que descarta duplicados en las cargas
+--   (services/sales_ingest: filtro previo por hash + ON DUPLICATE KEY UPDATE id = id)
+-- El script es idempotente y puede ejecutarse múltiples veces sin efectos secundarios.
+
+DROP PROCEDURE IF EXISTS add_index_if_not_exists;
+DROP PROCEDURE IF EXISTS add_column_if_not_exists;
+
+DELIMITER $$
+
+CREATE PROCEDURE add_index_if_not_exists(
+    IN in_table VARCHAR(64),
+    IN in_index VARCHAR(64),
+    IN is_unique BOOLEAN,
+    IN in_definition TEXT
+)
+BEGIN
+    DECLARE idx_exists INT DEFAULT 0;
+
+    SELECT COUNT(*)
+      INTO idx_exists
+      FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE()
+       AND TABLE_NAME = in_table
+       AND INDEX_NAME = in_index;
+
+    IF idx_exists = 0 THEN
+        SET @ddl = CONCAT(
+            'CREATE ',
+            IF(is_unique, 'UNIQUE ', ''),
+            'INDEX `', in_index, '` ON `', in_table, '` ',
+            in_definition
+        );
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+CREATE PROCEDURE add_column_if_not_exists(
+    IN in_table VARCHAR(64),
+    IN in_column VARCHAR(64),
+    IN in_definition TEXT
+)
+BEGIN
+    DECLARE column_exists INT DEFAULT 0;
+
+    SELECT COUNT(*)
+      INTO column_exists
+      FROM information_schema.COLUMNS
+     WHERE TABLE_SCHEMA = DATABASE()
+       AND TABLE_NAME = in_table
+       AND COLUMN_NAME = in_column;
+
+    IF column_exists = 0 THEN
+        SET @ddl = CONCAT(
+            'ALTER TABLE `', in_table, '` ADD COLUMN `', in_column, '` ', in_definition
+        );
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+DELIMITER ;
+
+-- ---------------------------------------------------------------------------
+-- Tabla: sales_transactions - Hash de contenido por fila
+-- ---------------------------------------------------------------------------
+CALL add_column_if_not_exists(
+    'sales_transactions',
+    'row_hash',
+    'char(64) COLLATE utf8mb4_unicode_ci NULL AFTER `rentabilidad`'
+);
+
+-- Backfill de filas existentes (IGNORE: en re-ejecuciones los duplicados
+-- históricos chocan con el índice único y se quedan en NULL)
+UPDATE IGNORE `sales_transactions`
+   SET row_hash = SHA2(
+           CONCAT_WS(
+               '|',
+               numero_factura,
+               producto,
+               DATE_FORMAT(fecha_emision, '%Y-%m-%d'),
+               CAST(cantidad_facturada AS CHAR),
+               CAST(venta_neta AS CHAR)
+           ),
+           256
+       )
+ WHERE row_hash IS NULL;
+
+-- Duplicados históricos: solo la fila más antigua conserva el hash
+UPDATE `sales_transactions` st
+  JOIN (
+        SELECT company_id, row_hash, MIN(id) AS keep_id
+          FROM `sales_transactions`
+         WHERE row_hash IS NOT NULL
+         GROUP BY company_id, row_hash
+        HAVING COUNT(*) > 1
+       ) dup
+    ON dup.company_id = st.company_id
+   AND dup.row_hash = st.row_hash
+   AND st.id <> dup.keep_id
+   SET st.row_hash = NULL;
+
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'uq_sales_company_row_hash',
+    1,
+    '(`company_id`,`row_hash`)'
+);
+
+-- ---------------------------------------------------------------------------
+-- Limpieza de procedimientos auxiliares
+-- ---------------------------------------------------------------------------
+DROP PROCEDURE IF EXISTS add_index_if_not_exists;
+DROP PROCEDURE IF EXISTS add_column_if_not_exists;
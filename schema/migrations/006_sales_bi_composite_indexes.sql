@@ -0,0 +1,163 @@
+-- 006_sales_bi_composite_indexes.sql
+-- Índices compuestos y de cobertura para las consultas de routes/sales_bi_api.py
+-- Todas las consultas BI filtran primero por company_id, luego por year/month
+-- y agrupan o filtran por una dimensión. Los índices de una sola columna
+-- obligaban a MySQL a recorrer las filas de todas las empresas en pareto y
+-- ranking. Estos índices empiezan por el tenant:
+-- - (company_id, year, month)              -> filtros temporales y /filters/options (años);
+--                                             es idx_sales_company_year_month de 003
+-- - (company_id, <dimensión>, year, month) -> filtros por dimensión, GROUP BY de
+--                                             pareto/ranking/comercial y DISTINCT de filtros
+-- - (company_id, year, month, factura, montos) -> cobertura de summary/trends/evolution
+-- - sales_kpis_cache (company_id, dimension_type, dimension_value, year, month)
+--   -> consultas del rollup (services/sales_rollup.py)
+-- Los índices (company_id, razon_social|producto|vendedor) de 003 quedan cubiertos
+-- por los nuevos (company_id, <dimensión>, year, month) y se eliminan, igual que
+-- el duplicado idx_sales_transactions_company_year_month de database/migrations.
+-- Verificar los planes con scripts/sales_index_advisor.py.
+-- El script es idempotente y puede ejecutarse múltiples veces sin efectos secundarios.
+
+DROP PROCEDURE IF EXISTS add_index_if_not_exists;
+DROP PROCEDURE IF EXISTS drop_index_if_exists;
+
+DELIMITER $$
+
+CREATE PROCEDURE add_index_if_not_exists(
+    IN in_table VARCHAR(64),
+    IN in_index VARCHAR(64),
+    IN is_unique BOOLEAN,
+    IN in_definition TEXT
+)
+BEGIN
+    DECLARE idx_exists INT DEFAULT 0;
+
+    SELECT COUNT(*)
+      INTO idx_exists
+      FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE()
+       AND TABLE_NAME = in_table
+       AND INDEX_NAME = in_index;
+
+    IF idx_exists = 0 THEN
+        SET @ddl = CONCAT(
+            'CREATE ',
+            IF(is_unique, 'UNIQUE ', ''),
+            'INDEX `', in_index, '` ON `', in_table, '` ',
+            in_definition
+        );
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+CREATE PROCEDURE drop_index_if_exists(
+    IN in_table VARCHAR(64),
+    IN in_index VARCHAR(64)
+)
+BEGIN
+    DECLARE idx_exists INT DEFAULT 0;
+
+    SELECT COUNT(*)
+      INTO idx_exists
+      FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE()
+       AND TABLE_NAME = in_table
+       AND INDEX_NAME = in_index;
+
+    IF idx_exists > 0 THEN
+        SET @ddl = CONCAT('DROP INDEX `', in_index, '` ON `', in_table, '`');
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+DELIMITER ;
+
+-- ---------------------------------------------------------------------------
+-- Tabla: sales_transactions - Índices por tenant y periodo
+-- ---------------------------------------------------------------------------
+-- Ya creado por 003_multitenant_phase1.sql; se asegura por si 003 no se aplicó
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_year_month',
+    0,
+    '(`company_id`,`year`,`month`)'
+);
+
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_period_cover',
+    0,
+    '(`company_id`,`year`,`month`,`numero_factura`,`venta_neta`,`venta_bruta`,`descuento`,`costo_venta`,`rentabilidad`,`m2`)'
+);
+
+-- ---------------------------------------------------------------------------
+-- Tabla: sales_transactions - Índices por tenant y dimensión
+-- ---------------------------------------------------------------------------
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_categoria_period',
+    0,
+    '(`company_id`,`categoria_producto`,`year`,`month`)'
+);
+
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_canal_period',
+    0,
+    '(`company_id`,`canal_comercial`,`year`,`month`)'
+);
+
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_vendedor_period',
+    0,
+    '(`company_id`,`vendedor`,`year`,`month`)'
+);
+
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_cliente_period',
+    0,
+    '(`company_id`,`razon_social`,`year`,`month`)'
+);
+
+CALL add_index_if_not_exists(
+    'sales_transactions',
+    'idx_sales_company_producto_period',
+    0,
+    '(`company_id`,`producto`,`year`,`month`)'
+);
+
+-- ---------------------------------------------------------------------------
+-- Tabla: sales_transactions - Índices redundantes
+-- ---------------------------------------------------------------------------
+-- Prefijos de los índices por dimensión anteriores; solo encarecen cada INSERT
+CALL drop_index_if_exists('sales_transactions', 'idx_sales_company_cliente');
+CALL drop_index_if_exists('sales_transactions', 'idx_sales_company_producto');
+CALL drop_index_if_exists('sales_transactions', 'idx_sales_company_vendedor');
+-- Duplicado de idx_sales_company_year_month
+CALL drop_index_if_exists('sales_transactions', 'idx_sales_transactions_company_year_month');
+
+-- ---------------------------------------------------------------------------
+-- Tabla: sales_kpis_cache - Consultas del rollup por tenant
+-- ---------------------------------------------------------------------------
+CALL add_index_if_not_exists(
+    'sales_kpis_cache',
+    'idx_sales_kpis_company_dimension_period',
+    0,
+    '(`company_id`,`dimension_type`,`dimension_value`,`year`,`month`)'
+);
+
+-- ---------------------------------------------------------------------------
+-- Estadísticas actualizadas para que el optimizador elija los nuevos índices
+-- ---------------------------------------------------------------------------
+ANALYZE TABLE `sales_transactions`, `sales_kpis_cache`;
+
+-- ---------------------------------------------------------------------------
+-- Limpieza de procedimientos auxiliares
+-- ---------------------------------------------------------------------------
+DROP PROCEDURE IF EXISTS add_index_if_not_exists;
+DROP PROCEDURE IF EXISTS drop_index_if_exists;
@@ -0,0 +1,88 @@
+-- 007_audit_logs_keyset_indexes.sql
+-- Índices para la paginación por cursor de /admin/audit-logs (routes/admin.py)
+-- La consulta filtra por company_id (salvo superusuarios), opcionalmente por
+-- user_id, action (igualdad o prefijo) o resource, y ordena por
+-- (created_at DESC, id DESC). Con los índices de una sola columna MySQL
+-- ordenaba todas las filas del tenant en cada página. Estos índices empiezan
+-- por el tenant y terminan en la clave del cursor:
+-- - (company_id, created_at, id)           -> listado sin filtros y export NDJSON
+-- - (company_id, user_id, created_at, id)  -> filtro por usuario
+-- - (company_id, action, created_at, id)   -> filtro por acción exacta o prefijo
+-- - (company_id, resource, created_at, id) -> filtro por recurso
+-- El script es idempotente y puede ejecutarse múltiples veces sin efectos secundarios.
+
+DROP PROCEDURE IF EXISTS add_index_if_not_exists;
+
+DELIMITER $$
+
+CREATE PROCEDURE add_index_if_not_exists(
+    IN in_table VARCHAR(64),
+    IN in_index VARCHAR(64),
+    IN is_unique BOOLEAN,
+    IN in_definition TEXT
+)
+BEGIN
+    DECLARE idx_exists INT DEFAULT 0;
+
+    SELECT COUNT(*)
+      INTO idx_exists
+      FROM information_schema.STATISTICS
+     WHERE TABLE_SCHEMA = DATABASE()
+       AND TABLE_NAME = in_table
+       AND INDEX_NAME = in_index;
+
+    IF idx_exists = 0 THEN
+        SET @ddl = CONCAT(
+            'CREATE ',
+            IF(is_unique, 'UNIQUE ', ''),
+            'INDEX `', in_index, '` ON `', in_table, '` ',
+            in_definition
+        );
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END$$
+
+DELIMITER ;
+
+-- ---------------------------------------------------------------------------
+-- Tabla: audit_logs - Índices por tenant con la clave del cursor
+-- ---------------------------------------------------------------------------
+CALL add_index_if_not_exists(
+    'audit_logs',
+    'idx_audit_company_created',
+    0,
+    '(`company_id`,`created_at`,`id`)'
+);
+
+CALL add_index_if_not_exists(
+    'audit_logs',
+    'idx_audit_company_user_created',
+    0,
+    '(`company_id`,`user_id`,`created_at`,`id`)'
+);
+
+CALL add_index_if_not_exists(
+    'audit_logs',
+    'idx_audit_company_action_created',
+    0,
+    '(`company_id`,`action`,`created_at`,`id`)'
+);
+
+CALL add_index_if_not_exists(
+    'audit_logs',
+    'idx_audit_company_resource_created',
+    0,
+    '(`company_id`,`resource`,`created_at`,`id`)'
+);
+
+-- ---------------------------------------------------------------------------
+-- Estadísticas actualizadas para que el optimizador elija los nuevos índices
+-- ---------------------------------------------------------------------------
+ANALYZE TABLE `audit_logs`;
+
+-- ---------------------------------------------------------------------------
+-- Limpieza de procedimientos auxiliares
+-- ---------------------------------------------------------------------------
+DROP PROCEDURE IF EXISTS add_index_if_not_exists;
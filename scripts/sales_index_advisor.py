@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Asesor de índices para el módulo BI de ventas
+Propósito: Ejecutar EXPLAIN sobre el SQL que generan los endpoints de
+routes/sales_bi_api.py y reportar los recorridos completos de tabla.
+
+Cada endpoint se invoca directamente (sin HTTP) dentro de una transacción que
+se revierte al final. Las sentencias SELECT emitidas se capturan con un
+listener de SQLAlchemy y se vuelven a ejecutar con EXPLAIN (MySQL) o
+EXPLAIN QUERY PLAN (SQLite).
+
+Uso:
+    python scripts/sales_index_advisor.py                      # DATABASE_URL de config.py
+    python scripts/sales_index_advisor.py --seed-rows 20000    # con datos sintéticos
+    python scripts/sales_index_advisor.py --database-url sqlite:// --seed-rows 5000
+
+Código de salida 1 si algún plan recorre la tabla completa.
+"""
+
+import argparse
+import asyncio
+import inspect
+import os
+import random
+import sys
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import params as fastapi_params
+from pydantic.fields import FieldInfo
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from config import Config
+from database.connection import Base
+from models import Company, SalesTransaction
+from routes import sales_bi_api
+
+# Colores para terminal
+class Colors:
+    RED = '\033[0;31m'
+    GREEN = '\033[0;32m'
+    YELLOW = '\033[1;33m'
+    BLUE = '\033[0;34m'
+    CYAN = '\033[0;36m'
+    WHITE = '\033[1;37m'
+    NC = '\033[0m'  # No Color
+
+def print_header(text):
+    print(f"\n{Colors.CYAN}{'=' * 80}{Colors.NC}")
+    print(f"{Colors.WHITE}{text.center(80)}{Colors.NC}")
+    print(f"{Colors.CYAN}{'=' * 80}{Colors.NC}\n")
+
+def print_section(text):
+    print(f"\n{Colors.BLUE}{'─' * 80}{Colors.NC}")
+    print(f"{Colors.YELLOW}{text}{Colors.NC}")
+    print(f"{Colors.BLUE}{'─' * 80}{Colors.NC}")
+
+def print_error(text):
+    print(f"{Colors.RED}❌ {text}{Colors.NC}")
+
+def print_warning(text):
+    print(f"{Colors.YELLOW}⚠️  {text}{Colors.NC}")
+
+def print_success(text):
+    print(f"{Colors.GREEN}✅ {text}{Colors.NC}")
+
+def print_info(text):
+    print(f"{Colors.BLUE}ℹ️  {text}{Colors.NC}")
+
+
+ANALYZED_TABLES = ('sales_transactions', 'sales_kpis_cache')
+
+CATEGORIAS = ['Pisos', 'Paredes', 'Porcelanato', 'Fachadas', 'Piscinas']
+CANALES = ['Directo', 'Distribuidor', 'Proyectos', 'Ferretería']
+
+
+def build_scenarios(year):
+    """Formas de consulta de cada endpoint BI: (nombre, endpoint, argumentos)."""
+    one_filter = {'year': year, 'categoria': CATEGORIAS[0]}
+    scenarios = [
+        ('summary', sales_bi_api.get_dashboard_summary, {'year': year}),
+        ('summary + categoria', sales_bi_api.get_dashboard_summary, one_filter),
+        ('summary + categoria + canal', sales_bi_api.get_dashboard_summary,
+         dict(one_filter, canal=CANALES[0])),
+        ('trends/monthly', sales_bi_api.get_monthly_trends, {'year': year}),
+        ('kpis/gerencial', sales_bi_api.get_kpis_gerencial, {'year': year}),
+        ('filters/options', sales_bi_api.get_filter_options, {}),
+        ('filters/dynamic-options', sales_bi_api.get_dynamic_filter_options, one_filter),
+        ('dashboard/cube', sales_bi_api.get_dashboard_cube,
+         {'year': year, 'metrics': ['summary', 'trends'], 'dimensions': ['categoria']}),
+    ]
+    for group_by in ('categoria', 'canal', 'vendedor', 'cliente', 'producto'):
+        scenarios.append((f'analysis/commercial group_by={group_by}', sales_bi_api.get_commercial_analysis,
+                          {'year': year, 'group_by': group_by}))
+        scenarios.append((f'analysis/ranking dimension={group_by}', sales_bi_api.get_ranking_analysis,
+                          {'year': year, 'dimension': group_by, 'metric': 'sales'}))
+    scenarios.append(('analysis/financial group_by=categoria', sales_bi_api.get_financial_analysis,
+                      {'year': year, 'group_by': 'categoria'}))
+    for dimension in ('producto', 'cliente', 'categoria'):
+        scenarios.append((f'analysis/pareto dimension={dimension}', sales_bi_api.get_pareto_analysis,
+                          {'year': year, 'dimension': dimension, 'analysis_type': 'sales'}))
+        scenarios.append((f'analysis/pareto dimension={dimension} + canal', sales_bi_api.get_pareto_analysis,
+                          {'year': year, 'dimension': dimension, 'analysis_type': 'sales', 'canal': CANALES[0]}))
+    scenarios.append(('analysis/evolution', sales_bi_api.get_evolution_analysis,
+                      {'year': year, 'metric': 'price'}))
+    return scenarios
+
+
+def resolve_arguments(endpoint, overrides):
+    """Completar los parámetros que FastAPI resolvería con Query()/Depends()."""
+    kwargs = {}
+    for name, parameter in inspect.signature(endpoint).parameters.items():
+        if name in overrides:
+            kwargs[name] = overrides[name]
+            continue
+        default = parameter.default
+        if isinstance(default, fastapi_params.Depends):
+            default = None
+        elif isinstance(default, FieldInfo):
+            default = default.default
+        if default is inspect.Parameter.empty or default is Ellipsis:
+            default = None
+        kwargs[name] = default
+    return kwargs
+
+
+def seed_transactions(session, rows, year):
+    """Crear una empresa temporal con transacciones sintéticas (se revierte al final)."""
+    company = Company(name='Index advisor', slug=f'index-advisor-{uuid.uuid4().hex[:12]}')
+    session.add(company)
+    session.flush()
+
+    is_mysql = session.get_bind().dialect.name == 'mysql'
+    rng = random.Random(42)
+    start = date(year, 1, 1)
+    batch = []
+    for index in range(rows):
+        fecha = start + timedelta(days=rng.randrange(365))
+        venta_neta = round(rng.uniform(10, 5000), 2)
+        row = {
+            'company_id': company.id,
+            'fecha_emision': fecha,
+            'categoria_producto': rng.choice(CATEGORIAS),
+            'vendedor': f'Vendedor {rng.randrange(25)}',
+            'numero_factura': f'ADV-{index // 3:07d}',
+            'canal_comercial': rng.choice(CANALES),
+            'razon_social': f'Cliente {rng.randrange(800)}',
+            'producto': f'Producto {rng.randrange(300)}',
+            'cantidad_facturada': 1,
+            'm2': round(rng.uniform(1, 100), 2),
+            'venta_bruta': venta_neta,
+            'descuento': 0,
+            'venta_neta': venta_neta,
+            'costo_venta': round(venta_neta * 0.6, 2),
+            'rentabilidad': round(venta_neta * 0.4, 2),
+        }
+        if not is_mysql:
+            # En MySQL year/month/quarter son columnas generadas
+            row.update(year=fecha.year, month=fecha.month, quarter=(fecha.month - 1) // 3 + 1)
+        batch.append(row)
+        if len(batch) >= 1000:
+            session.execute(insert(SalesTransaction), batch)
+            batch = []
+    if batch:
+        session.execute(insert(SalesTransaction), batch)
+    session.flush()
+    return company.id
+
+
+def capture_statements(connection, endpoint, kwargs):
+    """Ejecutar el endpoint y devolver los SELECT que emitió."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and any(t in statement for t in ANALYZED_TABLES):
+            captured.append((statement, parameters))
+
+    event.listen(connection, 'before_cursor_execute', before_cursor_execute)
+    try:
+        asyncio.run(endpoint(**kwargs))
+    finally:
+        event.remove(connection, 'before_cursor_execute', before_cursor_execute)
+    return captured
+
+
+def explain(connection, statement, parameters):
+    """Devolver [(tabla, acceso, índice, filas, veredicto)] para una sentencia."""
+    if connection.dialect.name == 'sqlite':
+        result = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        findings = []
+        for row in result:
+            detail = row[-1]
+            if not any(table in detail for table in ANALYZED_TABLES):
+                continue
+            if detail.startswith('SCAN') and 'INDEX' not in detail:
+                verdict = 'full_scan'
+            elif detail.startswith('SCAN'):
+                verdict = 'index_scan'
+            else:
+                verdict = 'ok'
+            words = detail.split()
+            key = words[words.index('INDEX') + 1] if 'INDEX' in words else '-'
+            findings.append((words[1], words[0], key, '-', verdict))
+        return findings
+
+    result = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+    columns = list(result.keys())
+    findings = []
+    for values in result:
+        row = dict(zip(columns, values))
+        access = row.get('type')
+        if access == 'ALL':
+            verdict = 'full_scan'
+        elif access == 'index':
+            verdict = 'index_scan'
+        else:
+            verdict = 'ok'
+        findings.append((row.get('table'), access, row.get('key') or '-', row.get('rows'), verdict))
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EXPLAIN de las consultas BI de ventas')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL', Config.DATABASE_URL))
+    parser.add_argument('--company-id', type=int, default=None,
+                        help='Empresa existente a analizar (por defecto la creada con --seed-rows)')
+    parser.add_argument('--seed-rows', type=int, default=0,
+                        help='Transacciones sintéticas a insertar antes del análisis')
+    parser.add_argument('--year', type=int, default=date.today().year)
+    parser.add_argument('--verbose', action='store_true', help='Mostrar el SQL de cada consulta')
+    args = parser.parse_args()
+
+    if args.company_id is None and args.seed_rows <= 0:
+        parser.error('Indique --company-id o --seed-rows')
+
+    print_header('ASESOR DE ÍNDICES - SALES BI')
+    engine = create_engine(args.database_url)
+    if engine.dialect.name == 'sqlite':
+        Base.metadata.create_all(engine)
+
+    full_scans = 0
+    index_scans = 0
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        session = Session(bind=connection)
+        try:
+            company_id = args.company_id
+            if args.seed_rows > 0:
+                company_id = seed_transactions(session, args.seed_rows, args.year)
+                if engine.dialect.name == 'mysql':
+                    connection.exec_driver_sql('ANALYZE TABLE sales_transactions')
+                print_info(f'{args.seed_rows} transacciones sintéticas para la empresa temporal {company_id}')
+
+            user = SimpleNamespace(id=0, company_id=company_id, is_superuser=True, role=None)
+            for name, endpoint, overrides in build_scenarios(args.year):
+                print_section(name)
+                kwargs = resolve_arguments(endpoint, dict(overrides, db=session, current_user=user))
+                statements = capture_statements(connection, endpoint, kwargs)
+                if not statements:
+                    print_info('Sin consultas sobre las tablas de ventas')
+                for statement, parameters in statements:
+                    if args.verbose:
+                        print(' '.join(statement.split()))
+                    for table, access, key, rows, verdict in explain(connection, statement, parameters):
+                        line = f'{table:<22} acceso={access:<8} índice={key} filas={rows}'
+                        if verdict == 'full_scan':
+                            full_scans += 1
+                            print_error(f'Recorrido completo: {line}')
+                        elif verdict == 'index_scan':
+                            index_scans += 1
+                            print_warning(f'Recorrido de índice completo: {line}')
+                        else:
+                            print_success(line)
+        finally:
+            session.close()
+            transaction.rollback()
+
+    print_header('RESUMEN')
+    print(f'Recorridos completos de tabla: {full_scans}')
+    print(f'Recorridos completos de índice: {index_scans}')
+    if full_scans:
+        print_error('Hay consultas BI sin índice utilizable')
+        return 1
+    print_success('Todas las consultas BI usan índices')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+In-process buffered writer for audit log entries.
+
+``AuditLog.log_action`` used to add one row to the request session, so every
+audited admin action paid its own INSERT inside the request transaction.
+While the sink is running, ``log_action`` keeps the entry on the session
+instead; when that session commits the entry is queued here and a background
+thread writes queued entries with multi-row inserts. Entries of a session that
+rolls back are discarded, so only committed actions are audited, as before.
+
+- The queue is bounded. When it is full the caller waits up to
+  ``AUDIT_SINK_ENQUEUE_TIMEOUT_SECONDS`` and then writes its entries
+  synchronously (``sync_writes`` in ``stats()``), so entries are never dropped
+  for lack of room.
+- ``stop()`` drains the queue before returning; the API calls it on shutdown.
+- When the sink is not running (scripts, tests) ``log_action`` writes through
+  the session as it always did.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from models.audit import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_SINK_QUEUE_SIZE = int(os.getenv('AUDIT_SINK_QUEUE_SIZE', '10000'))
+AUDIT_SINK_BATCH_SIZE = int(os.getenv('AUDIT_SINK_BATCH_SIZE', '500'))
+AUDIT_SINK_FLUSH_INTERVAL_SECONDS = float(os.getenv('AUDIT_SINK_FLUSH_INTERVAL_SECONDS', '1.0'))
+AUDIT_SINK_ENQUEUE_TIMEOUT_SECONDS = float(os.getenv('AUDIT_SINK_ENQUEUE_TIMEOUT_SECONDS', '0.05'))
+AUDIT_SINK_MAX_RETRIES = 3
+
+_PENDING_KEY = 'audit_sink_pending'
+_STOP = object()
+
+
+class AuditSink:
+    """Bounded queue of audit rows flushed in batches by a worker thread."""
+
+    def __init__(
+        self,
+        max_queue: int = AUDIT_SINK_QUEUE_SIZE,
+        batch_size: int = AUDIT_SINK_BATCH_SIZE,
+        flush_interval: float = AUDIT_SINK_FLUSH_INTERVAL_SECONDS,
+        enqueue_timeout: float = AUDIT_SINK_ENQUEUE_TIMEOUT_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._bind = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'sync_writes': 0,
+            'failed_batches': 0,
+            'dropped': 0,
+            'queue_high_water': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self, bind) -> None:
+        """Start the worker; ``bind`` is the engine the batches are written to."""
+        if self.running:
+            return
+        self._bind = bind
+        self._thread = threading.Thread(target=self._run, name='audit-sink', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Write every queued entry and stop the worker."""
+        thread = self._thread
+        if thread is None:
+            return
+        # Blocking put: the stop marker must land behind every queued entry
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+    def submit(self, rows: List[Dict[str, Any]], session: Optional[Session] = None) -> None:
+        """Queue committed rows; falls back to a synchronous insert when the queue stays full."""
+        if not self.running:
+            self._write_sync(rows, session)
+            return
+        for position, row in enumerate(rows):
+            try:
+                self._queue.put(row, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._write_sync(rows[position:], session)
+                return
+            with self._lock:
+                self._stats['enqueued'] += 1
+                depth = self._queue.qsize()
+                if depth > self._stats['queue_high_water']:
+                    self._stats['queue_high_water'] = depth
+
+    def _write_sync(self, rows: List[Dict[str, Any]], session: Optional[Session]) -> None:
+        bind = session.get_bind() if session is not None else self._bind
+        with bind.begin() as connection:
+            connection.execute(insert(AuditLog), rows)
+        with self._lock:
+            self._stats['sync_writes'] += len(rows)
+            self._stats['written'] += len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        stats['running'] = self.running
+        return stats
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._flush(batch)
+        # Entries queued by producers racing with stop()
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            self._flush(leftover[start:start + self.batch_size])
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        for attempt in range(1, AUDIT_SINK_MAX_RETRIES + 1):
+            try:
+                with self._bind.begin() as connection:
+                    connection.execute(insert(AuditLog), batch)
+                break
+            except Exception:
+                logger.exception("Audit sink batch of %s rows failed (attempt %s)", len(batch), attempt)
+                with self._lock:
+                    self._stats['failed_batches'] += 1
+                if attempt == AUDIT_SINK_MAX_RETRIES:
+                    with self._lock:
+                        self._stats['dropped'] += len(batch)
+                    return
+                time.sleep(0.1 * attempt)
+        with self._lock:
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['last_batch_size'] = len(batch)
+            self._stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+
+audit_sink = AuditSink()
+
+
+def defer_audit_row(session: Session, row: Dict[str, Any]) -> None:
+    """Hold ``row`` until ``session`` commits (queued) or rolls back (discarded)."""
+    session.info.setdefault(_PENDING_KEY, []).append(row)
+
+
+def _submit_pending(session: Session) -> None:
+    rows = session.info.pop(_PENDING_KEY, None)
+    if rows:
+        audit_sink.submit(rows, session)
+
+
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+event.listen(Session, 'after_commit', _submit_pending)
+event.listen(Session, 'after_rollback', _discard_pending)
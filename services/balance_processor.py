@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
+import hashlib
+import json
+import threading
+import time
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from database.schema_registry import schema_registry
 from models.balance import BalanceData
 
 
@@ -47,6 +52,16 @@ def _parent_code(code: str) -> Optional[str]:
     return code.rsplit('.', 1)[0]
 
 
+def balance_hierarchy(codes: List[str]) -> Tuple[List[int], List[Optional[str]]]:
+    """Level and parent code of every account code, computed over the whole column."""
+    if not codes:
+        return [], []
+    array = np.array(codes, dtype=str)
+    levels = np.char.count(array, '.') + 1
+    parents = np.char.rpartition(array, '.')[:, 0]
+    return levels.tolist(), [parent or None for parent in parents.tolist()]
+
+
 def build_balance_tree(rows: List[BalanceData]) -> List[Dict[str, object]]:
     nodes: Dict[str, TreeNode] = {}
     children_map: Dict[str, List[TreeNode]] = {}
@@ -166,12 +181,8 @@ def fetch_financial_summary(db: Session, company_id: int, year: int) -> Dict[str
     }
 
     try:
-        present: Dict[str, str] = {}
-        for key, col in columns.items():
-            result = db.execute(text("SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = DATABASE() AND table_name = 'financial_data' AND column_name = :col"), {"col": col})
-            exists = bool(result.scalar())
-            if exists:
-                present[key] = col
+        available = schema_registry.get_columns(db, "financial_data")
+        present: Dict[str, str] = {key: col for key, col in columns.items() if col in available}
 
         select_parts = []
         for key, col in present.items():
@@ -193,6 +204,19 @@ def fetch_financial_summary(db: Session, company_id: int, year: int) -> Dict[str
         return {"ingresos": 0.0, "utilidad_neta": 0.0, "utilidad_operacional": 0.0}
 
 
+# Cuentas que usan compute_balance_core; columnas de la matriz período × cuenta
+TREND_ACCOUNT_CODES = ('1', '2', '3', '1.1', '2.1', '1.1.3')
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / np.where(denominator != 0, denominator, 1), np.nan)
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
 def aggregate_balance_trends(
     db: Session,
     company_id: int,
@@ -200,63 +224,151 @@ def aggregate_balance_trends(
     end_year: int,
     granularity: str = "annual",
 ) -> List[Dict[str, Optional[float]]]:
+    """
+    Balance totals and liquidity ratios per period.
+
+    Only (year, month, code, balance) of TREND_ACCOUNT_CODES is fetched and
+    pivoted into a period × account matrix. Within a period the latest row of
+    each account wins, so an annual point uses each account's last month
+    (rows without month count as earliest), as compute_balance_core did.
+    """
     if end_year < start_year:
         start_year, end_year = end_year, start_year
 
-    query = (
-        db.query(BalanceData)
-        .filter(
-            BalanceData.company_id == company_id,
-            BalanceData.period_year >= start_year,
-            BalanceData.period_year <= end_year,
-        )
-        .order_by(
-            BalanceData.period_year.asc(),
-            BalanceData.period_month.asc(),
-            BalanceData.level.asc(),
-            BalanceData.account_code.asc(),
-        )
+    monthly = granularity == "monthly"
+    period_filter = [
+        BalanceData.company_id == company_id,
+        BalanceData.period_year >= start_year,
+        BalanceData.period_year <= end_year,
+    ]
+    if monthly:
+        period_filter.append(BalanceData.period_month.isnot(None))
+
+    # Períodos con cualquier cuenta cargada (un período sin estas cuentas vale 0)
+    period_rows = (
+        db.query(BalanceData.period_year, BalanceData.period_month)
+        .filter(*period_filter)
+        .distinct()
+        .all()
     )
-
-    rows: List[BalanceData] = query.all()
-    if not rows:
+    periods = sorted({(year, month if monthly else None) for year, month in period_rows},
+                     key=lambda item: (item[0], item[1] or 0))
+    if not periods:
         return []
 
-    buckets: Dict[Tuple[int, Optional[int]], List[BalanceData]] = defaultdict(list)
+    rows = (
+        db.query(BalanceData.period_year, BalanceData.period_month, BalanceData.account_code, BalanceData.balance)
+        .filter(*period_filter, BalanceData.account_code.in_(TREND_ACCOUNT_CODES))
+        .all()
+    )
 
-    for row in rows:
-        if granularity == "monthly":
-            if row.period_month is None:
-                continue
-            key = (row.period_year, row.period_month)
-        else:
-            key = (row.period_year, None)
-        buckets[key].append(row)
+    matrix = np.zeros((len(periods), len(TREND_ACCOUNT_CODES)), dtype=float)
+    if rows:
+        period_index = {period: index for index, period in enumerate(periods)}
+        code_index = {code: index for index, code in enumerate(TREND_ACCOUNT_CODES)}
+        years = np.array([row[0] for row in rows], dtype=np.int64)
+        months = np.array([row[1] if row[1] is not None else 0 for row in rows], dtype=np.int64)
+        cells = np.array(
+            [period_index[(row[0], row[1] if monthly else None)] * len(TREND_ACCOUNT_CODES) + code_index[row[2]]
+             for row in rows],
+            dtype=np.int64,
+        )
+        balances = np.array([float(row[3] or 0) for row in rows], dtype=float)
 
-    if not buckets:
-        return []
+        # Última fila por celda en orden (año, mes)
+        order = np.lexsort((months, years))
+        cells, balances = cells[order], balances[order]
+        _, last_reversed = np.unique(cells[::-1], return_index=True)
+        last = len(cells) - 1 - last_reversed
+        matrix.flat[cells[last]] = balances[last]
 
-    sorted_keys = sorted(
-        buckets.keys(),
-        key=lambda item: (item[0], item[1] if item[1] is not None else 0),
-    )
+    activos, pasivos, patrimonio, activo_corriente, pasivo_corriente, inventario = matrix.T
+    capital_trabajo = activo_corriente - pasivo_corriente
+    liquidez_corriente = _ratio(activo_corriente, pasivo_corriente)
+    razon_rapida = _ratio(activo_corriente - inventario, pasivo_corriente)
+    balance_check = activos - (pasivos + patrimonio)
 
-    points: List[Dict[str, Optional[float]]] = []
-    for year, month in sorted_keys:
-        bucket_rows = buckets[(year, month)]
-        totals, metrics = compute_balance_core(bucket_rows)
-        points.append(
-            {
-                "year": year,
-                "month": month if granularity == "monthly" else None,
-                "activos": totals.get("activos", 0.0),
-                "pasivos": totals.get("pasivos", 0.0),
-                "patrimonio": totals.get("patrimonio", 0.0),
-                "capital_trabajo": metrics.get("capital_trabajo", 0.0),
-                "liquidez_corriente": metrics.get("liquidez_corriente"),
-                "razon_rapida": metrics.get("razon_rapida"),
-                "balance_check": metrics.get("balance_check", 0.0),
-            }
-        )
+    return [
+        {
+            "year": year,
+            "month": month,
+            "activos": float(activos[index]),
+            "pasivos": float(pasivos[index]),
+            "patrimonio": float(patrimonio[index]),
+            "capital_trabajo": float(capital_trabajo[index]),
+            "liquidez_corriente": _optional(liquidez_corriente[index]),
+            "razon_rapida": _optional(razon_rapida[index]),
+            "balance_check": float(balance_check[index]),
+        }
+        for index, (year, month) in enumerate(periods)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Serialized response snapshots per period
+# ---------------------------------------------------------------------------
+BALANCE_SNAPSHOT_TTL_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class BalanceSnapshot:
+    body: bytes
+    etag: str
+    built_at: float
 
-    return points
+
+# (tipo, empresa, año, mes); "summary" usa mes None y cubre todo el año
+_BALANCE_SNAPSHOTS: Dict[Tuple[str, int, int, Optional[int]], BalanceSnapshot] = {}
+_BALANCE_SNAPSHOTS_LOCK = threading.Lock()
+# Per-company counter bumped by the invalidations; a snapshot built while one
+# ran is returned but not stored
+_BALANCE_GENERATIONS: Dict[int, int] = {}
+
+
+def _bump_balance_generation(company_id: int) -> None:
+    _BALANCE_GENERATIONS[company_id] = _BALANCE_GENERATIONS.get(company_id, 0) + 1
+
+
+def get_balance_snapshot(
+    kind: str,
+    company_id: int,
+    year: int,
+    month: Optional[int],
+    build: Callable[[], Any],
+) -> BalanceSnapshot:
+    """Return the cached JSON body for a period, building it with ``build`` on a miss."""
+    key = (kind, company_id, year, month)
+    now = time.monotonic()
+    with _BALANCE_SNAPSHOTS_LOCK:
+        snapshot = _BALANCE_SNAPSHOTS.get(key)
+        generation = _BALANCE_GENERATIONS.get(company_id, 0)
+    if snapshot is not None and now - snapshot.built_at < BALANCE_SNAPSHOT_TTL_SECONDS:
+        return snapshot
+
+    body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    snapshot = BalanceSnapshot(
+        body=body,
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        built_at=now,
+    )
+    with _BALANCE_SNAPSHOTS_LOCK:
+        if _BALANCE_GENERATIONS.get(company_id, 0) == generation:
+            _BALANCE_SNAPSHOTS[key] = snapshot
+    return snapshot
+
+
+def invalidate_balance_period(company_id: int, year: int, month: Optional[int]) -> None:
+    """Drop the data/ratios snapshots of one period and the summary of its year."""
+    with _BALANCE_SNAPSHOTS_LOCK:
+        _bump_balance_generation(company_id)
+        for kind in ("data", "ratios"):
+            _BALANCE_SNAPSHOTS.pop((kind, company_id, year, month), None)
+        _BALANCE_SNAPSHOTS.pop(("summary", company_id, year, None), None)
+
+
+def invalidate_balance_ratios(company_id: int) -> None:
+    """Drop every ratios snapshot of a company (they embed financial_data totals)."""
+    with _BALANCE_SNAPSHOTS_LOCK:
+        _bump_balance_generation(company_id)
+        for key in [key for key in _BALANCE_SNAPSHOTS if key[0] == "ratios" and key[1] == company_id]:
+            del _BALANCE_SNAPSHOTS[key]
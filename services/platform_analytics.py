@@ -0,0 +1,140 @@
+"""Platform-wide counters for the superadmin analytics overview.
+
+The overview is built from three grouped queries regardless of the number of
+tenants: one over ``companies``, one over ``users`` grouped by tenant and one
+``UNION ALL`` of per-tenant data volumes (sales rows, quotes, balance
+periods). The result is cached in-process for ``PLATFORM_ANALYTICS_TTL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import case, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from models import Company, User
+from models.balance import BalanceData
+from models.production import ProductionQuote
+from models.sales import SalesTransaction
+
+PLATFORM_ANALYTICS_TTL_SECONDS = float(os.getenv("PLATFORM_ANALYTICS_TTL_SECONDS", "60"))
+
+# Tiers always reported, even with no companies on them
+SUBSCRIPTION_TIERS = ("trial", "professional", "enterprise")
+VOLUME_METRICS = ("sales_rows", "quotes", "balance_periods")
+
+_OVERVIEW_CACHE: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_OVERVIEW_CACHE_LOCK = threading.Lock()
+
+
+def _as_int(value: Any) -> int:
+    return int(value or 0)
+
+
+def _volume_query():
+    """(company_id, metric, value) rows for every tenant with data."""
+    balance_periods = (
+        select(BalanceData.company_id, BalanceData.period_year, BalanceData.period_month)
+        .distinct()
+        .subquery()
+    )
+    return union_all(
+        select(SalesTransaction.company_id, literal("sales_rows"), func.count())
+        .group_by(SalesTransaction.company_id),
+        select(ProductionQuote.company_id, literal("quotes"), func.count())
+        .group_by(ProductionQuote.company_id),
+        select(balance_periods.c.company_id, literal("balance_periods"), func.count())
+        .group_by(balance_periods.c.company_id),
+    )
+
+
+def compute_platform_overview(db: Session) -> Dict[str, Any]:
+    """Company, user and per-tenant data-volume counters for the whole platform."""
+    companies = db.execute(
+        select(Company.id, Company.name, Company.subscription_tier, Company.is_active)
+    ).all()
+
+    user_rows = db.execute(
+        select(
+            User.company_id,
+            func.count(),
+            func.sum(case((User.is_active == True, 1), else_=0)),  # noqa: E712
+            func.sum(case((User.is_superuser == True, 1), else_=0)),  # noqa: E712
+        ).group_by(User.company_id)
+    ).all()
+
+    volumes: Dict[int, Dict[str, int]] = {}
+    for company_id, metric, value in db.execute(_volume_query()).all():
+        volumes.setdefault(company_id, dict.fromkeys(VOLUME_METRICS, 0))[metric] = _as_int(value)
+
+    by_tier = dict.fromkeys(SUBSCRIPTION_TIERS, 0)
+    active_companies = 0
+    for _, _, tier, is_active in companies:
+        by_tier[tier] = by_tier.get(tier, 0) + 1
+        active_companies += bool(is_active)
+
+    users_by_company = {}
+    total_users = active_users = superusers = 0
+    for company_id, total, active, supers in user_rows:
+        users_by_company[company_id] = _as_int(total)
+        total_users += _as_int(total)
+        active_users += _as_int(active)
+        superusers += _as_int(supers)
+
+    tenants = [
+        {
+            "company_id": company_id,
+            "name": name,
+            "subscription_tier": tier,
+            "is_active": bool(is_active),
+            "users": users_by_company.get(company_id, 0),
+            **volumes.get(company_id, dict.fromkeys(VOLUME_METRICS, 0)),
+        }
+        for company_id, name, tier, is_active in companies
+    ]
+    tenants.sort(key=lambda tenant: (-tenant["sales_rows"], tenant["company_id"]))
+
+    return {
+        "companies": {
+            "total": len(companies),
+            "active": active_companies,
+            "inactive": len(companies) - active_companies,
+            "by_tier": by_tier,
+        },
+        "users": {
+            "total": total_users,
+            "active": active_users,
+            "inactive": total_users - active_users,
+            "superusers": superusers,
+        },
+        "data_volume": {
+            metric: sum(tenant[metric] for tenant in tenants) for metric in VOLUME_METRICS
+        },
+        "tenants": tenants,
+        "generated_at": datetime.utcnow(),
+    }
+
+
+def get_platform_overview(db: Session, refresh: bool = False) -> Tuple[Dict[str, Any], bool]:
+    """Cached overview and whether it came from the cache."""
+    now = time.monotonic()
+    if not refresh:
+        with _OVERVIEW_CACHE_LOCK:
+            cached = _OVERVIEW_CACHE.get("overview")
+        if cached is not None and now - cached[0] < PLATFORM_ANALYTICS_TTL_SECONDS:
+            return cached[1], True
+
+    overview = compute_platform_overview(db)
+    with _OVERVIEW_CACHE_LOCK:
+        _OVERVIEW_CACHE["overview"] = (now, overview)
+    return overview, False
+
+
+def invalidate_platform_overview() -> None:
+    with _OVERVIEW_CACHE_LOCK:
+        _OVERVIEW_CACHE.clear()
@@ -0,0 +1,407 @@
+"""Deterministic P&L (PyG) analysis over ``raw_account_data``.
+
+One vectorized pass per (company, year, view type) computes, for every
+account of the chart:
+
+- the hierarchy rollup (leaf rule per month, as in ``services.pyg_rollup``),
+- vertical percentages over revenue,
+- month-over-month and year-over-year deltas,
+- KPI margins per month and for the year.
+
+Accounts are kept in code order, so the descendants of ``<code>`` are the
+contiguous range ``[<code>., <code>/)`` and every rollup is a difference of
+cumulative sums over integer cents. Results are memoized per
+(company, year, view type) and dropped when the company's P&L data changes.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.financial import RawAccountData
+from services.pyg_rollup import PYG_GROUP_PREFIXES
+
+
+MONTH_NAMES = [
+    'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+    'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
+]
+ANNUAL = 'Anual'
+
+# (incluye depreciación, incluye intereses), como BREAK_EVEN_CONFIGS del frontend
+VIEW_TYPES: Dict[str, Tuple[bool, bool]] = {
+    'contable': (True, True),
+    'operativo': (True, False),
+    'caja': (False, False),
+    'ebitda': (False, False),
+}
+
+# Mismos patrones que ACCOUNT_PATTERNS del frontend, sin tildes
+DEPRECIATION_PATTERNS = (
+    'depreciacion', 'depreciation', 'desgaste', 'amortizacion',
+    'propiedades, plantas y equipos', 'intangibles',
+)
+INTEREST_PATTERNS = (
+    'intereses', 'interest', 'financier', 'financiera', 'financiero', 'prestamo',
+    'credito', 'loan', 'comisiones bancarias', 'gastos de gestion',
+)
+
+PYG_ANALYSIS_TTL_SECONDS = 300.0
+
+_PERIOD_PATTERN = re.compile(r'^(\d{4})-(\d{1,2})$')
+
+
+def _normalize(name: str) -> str:
+    decomposed = unicodedata.normalize('NFD', (name or '').lower())
+    return ''.join(char for char in decomposed if unicodedata.category(char) != 'Mn')
+
+
+def _code_key(code: str) -> Tuple:
+    return tuple(int(part) if part.isdigit() else part for part in code.split('.'))
+
+
+def _safe_pct(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / np.abs(denominator) * 100.0, np.nan)
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, 2)
+
+
+def parse_period(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """(año, mes) de ``"2025-03"``, ``"Marzo"`` o ``"Anual"``/``None`` (mes ``None``)."""
+    if not value or value == ANNUAL:
+        return None, None
+    match = _PERIOD_PATTERN.match(value.strip())
+    if match:
+        month = int(match.group(2))
+        return int(match.group(1)), month if 1 <= month <= 12 else None
+    normalized = _normalize(value.strip())
+    for index, name in enumerate(MONTH_NAMES):
+        if _normalize(name) == normalized:
+            return None, index + 1
+    return None, None
+
+
+@dataclass
+class PygAnalysis:
+    """Matrices of one (company, year, view). Columns 0-11 are months, column 12 the year."""
+    company_id: int
+    year: int
+    view_type: str
+    codes: List[str]
+    names: List[str]
+    parents: List[Optional[str]]
+    levels: List[int]
+    is_leaf: np.ndarray
+    excluded: np.ndarray
+    values: np.ndarray
+    original_values: np.ndarray
+    previous_values: np.ndarray
+    vertical_pct: np.ndarray
+    mom_abs: np.ndarray
+    mom_pct: np.ndarray
+    yoy_abs: np.ndarray
+    yoy_pct: np.ndarray
+    kpis: Dict[str, np.ndarray]
+    has_previous_year: bool
+    generated_at: datetime
+    computed_ms: float
+
+    def kpis_for(self, column: int) -> Dict[str, float]:
+        return {name: (_number(values[column]) or 0.0) for name, values in self.kpis.items()}
+
+    def to_result(self, month: Optional[int] = None, comparison_month: Optional[int] = None) -> Dict[str, object]:
+        """Vista de un período (mes o año) con el formato PyGResult del frontend."""
+        column = month - 1 if month else 12
+        if comparison_month and month and comparison_month != month:
+            compared = comparison_month - 1
+            change_abs = self.values[:, column] - self.values[:, compared]
+            change_pct = _safe_pct(change_abs, self.values[:, compared])
+        elif month:
+            change_abs, change_pct = self.mom_abs[:, column], self.mom_pct[:, column]
+        else:
+            change_abs, change_pct = self.yoy_abs[:, column], self.yoy_pct[:, column]
+
+        nodes: Dict[str, Dict[str, object]] = {}
+        roots: List[Dict[str, object]] = []
+        for index in sorted(range(len(self.codes)), key=lambda i: _code_key(self.codes[i])):
+            code = self.codes[index]
+            node = {
+                'code': code,
+                'name': self.names[index],
+                'level': self.levels[index],
+                'value': _number(self.values[index, column]) or 0.0,
+                'percentage': _number(self.vertical_pct[index, column]),
+                'horizontal_change': _number(change_pct[index]),
+                'children': [],
+                'account_type': 'cuenta' if self.is_leaf[index] else 'subtotal',
+                'is_expanded': self.levels[index] <= 1,
+                'metadata': {
+                    'original_value': _number(self.original_values[index, column]),
+                    'excluded': bool(self.excluded[index]),
+                    'horizontal_change_abs': _number(change_abs[index]),
+                    'yoy_change': _number(self.yoy_abs[index, column]),
+                    'yoy_change_pct': _number(self.yoy_pct[index, column]),
+                    'monthly': [_number(value) for value in self.values[index, :12]],
+                },
+            }
+            nodes[code] = node
+            parent = self.parents[index]
+            (nodes[parent]['children'] if parent in nodes else roots).append(node)
+
+        kpis = self.kpis_for(column)
+        net_margin = kpis['margen_neto']
+        root = {
+            'code': 'PYG',
+            'name': 'Estado de Resultados',
+            'level': 0,
+            'value': kpis['utilidad_neta'],
+            'percentage': 100.0 if kpis['ingresos'] else None,
+            'horizontal_change': None,
+            'children': roots,
+            'account_type': 'total',
+            'is_expanded': True,
+            'metadata': {'view_type': self.view_type},
+        }
+        return {
+            'account_tree': root,
+            'kpis': kpis,
+            'monthly_kpis': {name: [_number(v) for v in values[:12]] for name, values in self.kpis.items()},
+            'summary': {
+                'period_type': 'monthly' if month else 'annual',
+                'period': f'{self.year}-{month:02d}' if month else f'{self.year}',
+                'total_accounts': len(self.codes),
+                'performance_indicator': 'positive' if kpis['utilidad_neta'] >= 0 else 'negative',
+                'key_metrics': {
+                    'revenue': kpis['ingresos'],
+                    'net_margin': net_margin,
+                    'profitability': 'high' if net_margin > 15 else ('medium' if net_margin > 5 else 'low'),
+                },
+            },
+            'insights': self._insights(column, change_abs),
+            'year': self.year,
+            'view_type': self.view_type,
+            'has_previous_year': self.has_previous_year,
+            'generated_at': self.generated_at.isoformat(),
+            'computed_ms': self.computed_ms,
+        }
+
+    def _insights(self, column: int, change_abs: np.ndarray) -> List[str]:
+        kpis = self.kpis_for(column)
+        insights = [
+            f"Margen bruto {kpis['margen_bruto']:.1f}%, margen operacional {kpis['margen_operacional']:.1f}% "
+            f"y margen neto {kpis['margen_neto']:.1f}% sobre ingresos de {kpis['ingresos']:,.2f}."
+        ]
+        excluded = int(self.excluded.sum())
+        if excluded:
+            insights.append(f"Vista {self.view_type}: {excluded} cuentas excluidas (depreciación/intereses).")
+        cost_rows = [
+            index for index, code in enumerate(self.codes)
+            if code.startswith('5') and self.is_leaf[index] and not np.isnan(change_abs[index])
+        ]
+        if cost_rows:
+            worst = max(cost_rows, key=lambda index: change_abs[index])
+            if change_abs[worst] > 0:
+                insights.append(
+                    f"Mayor aumento de costo/gasto: {self.codes[worst]} {self.names[worst]} "
+                    f"(+{change_abs[worst]:,.2f})."
+                )
+        return insights
+
+
+def _load_amounts(db: Session, company_id: int, year: int):
+    """Montos en centavos por cuenta: columnas 0-11 año anterior, 12-23 año consultado."""
+    rows = (
+        db.query(
+            RawAccountData.account_code,
+            func.max(RawAccountData.account_name),
+            RawAccountData.period_year,
+            RawAccountData.period_month,
+            func.sum(RawAccountData.amount),
+        )
+        .filter(
+            RawAccountData.company_id == company_id,
+            RawAccountData.period_year.in_((year - 1, year)),
+            RawAccountData.period_month.between(1, 12),
+        )
+        .group_by(RawAccountData.account_code, RawAccountData.period_year, RawAccountData.period_month)
+        .all()
+    )
+    codes = sorted({row[0] for row in rows})
+    index = {code: position for position, code in enumerate(codes)}
+    names = {}
+    cents = np.zeros((len(codes), 24), dtype=np.int64)
+    present = np.zeros((len(codes), 24), dtype=bool)
+    for code, name, period_year, period_month, amount in rows:
+        offset = 12 if period_year == year else 0
+        cents[index[code], offset + period_month - 1] = int(round((amount or 0) * 100))
+        present[index[code], offset + period_month - 1] = True
+        if offset or code not in names:
+            names[code] = name or ''
+    return codes, [names[code] for code in codes], cents, present
+
+
+def compute_pyg_analysis(db: Session, company_id: int, year: int, view_type: str) -> PygAnalysis:
+    started = time.perf_counter()
+    include_depreciation, include_interest = VIEW_TYPES[view_type]
+    codes, names, cents, present = _load_amounts(db, company_id, year)
+    count = len(codes)
+
+    # Rango de descendientes de cada cuenta en orden de código
+    starts = np.array([bisect_left(codes, f'{code}.') for code in codes], dtype=np.int64)
+    ends = np.array([bisect_left(codes, f'{code}/') for code in codes], dtype=np.int64)
+
+    def range_sums(matrix: np.ndarray) -> np.ndarray:
+        cumulative = np.vstack([np.zeros((1, matrix.shape[1]), dtype=matrix.dtype), np.cumsum(matrix, axis=0)])
+        return cumulative[ends] - cumulative[starts]
+
+    # Hoja por mes: ninguna subcuenta con saldo ese mes
+    leaf = range_sums(present.astype(np.int64)) == 0
+
+    # Exclusiones de la vista (la cuenta y toda su rama)
+    normalized = [_normalize(name) for name in names]
+    excluded = np.array([
+        (not include_depreciation and any(p in name for p in DEPRECIATION_PATTERNS))
+        or (not include_interest and any(p in name for p in INTEREST_PATTERNS))
+        for name in normalized
+    ], dtype=bool)
+    included = np.ones(count, dtype=bool)
+    for position in np.flatnonzero(excluded):
+        included[position] = False
+        included[starts[position]:ends[position]] = False
+
+    contribution_all = np.where(leaf, cents, 0)
+    contribution = np.where(included[:, None], contribution_all, 0)
+    rolled = (contribution + range_sums(contribution)) / 100.0
+    rolled_all = (contribution_all + range_sums(contribution_all)) / 100.0
+
+    previous, current = rolled[:, :12], rolled[:, 12:]
+    values = np.hstack([current, current.sum(axis=1, keepdims=True)])
+    previous_values = np.hstack([previous, previous.sum(axis=1, keepdims=True)])
+    original_values = np.hstack([rolled_all[:, 12:], rolled_all[:, 12:].sum(axis=1, keepdims=True)])
+
+    # KPIs por grupo de cuentas (solo hojas incluidas)
+    kpis_24 = {}
+    for group, prefix in PYG_GROUP_PREFIXES.items():
+        rows = np.array([code.startswith(prefix) for code in codes], dtype=bool)
+        kpis_24[group] = contribution[rows].sum(axis=0) / 100.0
+    kpis_24['gastos_operativos'] = kpis_24['gastos_ventas'] + kpis_24['gastos_admin']
+    kpis_24['utilidad_bruta'] = kpis_24['ingresos'] - kpis_24['costo_ventas']
+    kpis_24['utilidad_operacional'] = kpis_24['utilidad_bruta'] - kpis_24['gastos_operativos']
+    kpis_24['utilidad_neta'] = kpis_24['ingresos'] - kpis_24['costos_total']
+    kpis = {name: np.append(series[12:], series[12:].sum()) for name, series in kpis_24.items()}
+    revenue = kpis['ingresos']
+    kpis['margen_bruto'] = _safe_pct(kpis['utilidad_bruta'], revenue)
+    kpis['margen_operacional'] = _safe_pct(kpis['utilidad_operacional'], revenue)
+    kpis['margen_neto'] = _safe_pct(kpis['utilidad_neta'], revenue)
+
+    # Vertical: % sobre ingresos del mismo período
+    vertical_pct = _safe_pct(values, np.broadcast_to(revenue, values.shape))
+
+    # Mes contra mes (enero contra diciembre del año anterior) y año contra año
+    has_previous_year = bool(present[:, :12].any())
+    shifted = np.hstack([previous[:, 11:12] if has_previous_year else np.full((count, 1), np.nan), current[:, :11]])
+    mom_abs = np.hstack([current - shifted, np.full((count, 1), np.nan)])
+    mom_pct = np.hstack([_safe_pct(current - shifted, shifted), np.full((count, 1), np.nan)])
+    if has_previous_year:
+        yoy_abs = values - previous_values
+        yoy_pct = _safe_pct(yoy_abs, previous_values)
+    else:
+        yoy_abs = np.full(values.shape, np.nan)
+        yoy_pct = np.full(values.shape, np.nan)
+
+    # Jerarquía: padre = ancestro más cercano presente
+    code_set = set(codes)
+    parents: List[Optional[str]] = []
+    for code in codes:
+        parent = code
+        while '.' in parent:
+            parent = parent.rsplit('.', 1)[0]
+            if parent in code_set:
+                break
+        else:
+            parent = None
+        parents.append(parent)
+    levels = [code.count('.') + 1 for code in codes]
+
+    return PygAnalysis(
+        company_id=company_id,
+        year=year,
+        view_type=view_type,
+        codes=codes,
+        names=names,
+        parents=parents,
+        levels=levels,
+        is_leaf=leaf[:, 12:].all(axis=1),
+        excluded=excluded,
+        values=values,
+        original_values=original_values,
+        previous_values=previous_values,
+        vertical_pct=vertical_pct,
+        mom_abs=mom_abs,
+        mom_pct=mom_pct,
+        yoy_abs=yoy_abs,
+        yoy_pct=yoy_pct,
+        kpis=kpis,
+        has_previous_year=has_previous_year,
+        generated_at=datetime.utcnow(),
+        computed_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+# ----------------------------------------------------------------------
+# Memoization per (company, year, view type)
+# ----------------------------------------------------------------------
+_PYG_ANALYSIS_CACHE: Dict[Tuple[int, int, str], Tuple[PygAnalysis, float]] = {}
+_PYG_ANALYSIS_LOCK = threading.Lock()
+# Bumped on invalidation so a computation that overlapped a write is not stored
+_PYG_ANALYSIS_GENERATIONS: Dict[int, int] = {}
+
+
+def get_pyg_analysis(db: Session, company_id: int, year: int, view_type: str) -> Tuple[PygAnalysis, bool]:
+    """Análisis memoizado; devuelve (análisis, venía_de_caché)."""
+    if view_type not in VIEW_TYPES:
+        raise ValueError(f"Tipo de vista no soportado: {view_type}")
+    key = (company_id, year, view_type)
+    now = time.monotonic()
+    with _PYG_ANALYSIS_LOCK:
+        cached = _PYG_ANALYSIS_CACHE.get(key)
+        generation = _PYG_ANALYSIS_GENERATIONS.get(company_id, 0)
+    if cached is not None and now - cached[1] < PYG_ANALYSIS_TTL_SECONDS:
+        return cached[0], True
+
+    analysis = compute_pyg_analysis(db, company_id, year, view_type)
+    with _PYG_ANALYSIS_LOCK:
+        if _PYG_ANALYSIS_GENERATIONS.get(company_id, 0) == generation:
+            _PYG_ANALYSIS_CACHE[key] = (analysis, now)
+    return analysis, False
+
+
+def invalidate_pyg_analysis(company_id: int) -> None:
+    """Descartar los análisis de la empresa (el año siguiente también usa el año cargado)."""
+    with _PYG_ANALYSIS_LOCK:
+        _PYG_ANALYSIS_GENERATIONS[company_id] = _PYG_ANALYSIS_GENERATIONS.get(company_id, 0) + 1
+        for key in [key for key in _PYG_ANALYSIS_CACHE if key[0] == company_id]:
+            del _PYG_ANALYSIS_CACHE[key]
+
+
+def latest_pyg_year(db: Session, company_id: int) -> Optional[int]:
+    return (
+        db.query(func.max(RawAccountData.period_year))
+        .filter(RawAccountData.company_id == company_id)
+        .scalar()
+    )
@@ -0,0 +1,104 @@
+"""Monthly P&L (PyG) rollup of an uploaded chart of accounts.
+
+Account codes are dotted paths (``4``, ``4.1``, ``4.1.01``). Only leaf
+accounts are summed so parent subtotals are not counted twice. An account is
+a leaf within a month when no other account present in that month starts
+with ``<code>.``; this is the rule the csv-upload used to evaluate in SQL with
+a correlated ``NOT EXISTS`` per row.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+
+# Prefixes of the PyG groups (matched as string prefixes, like LIKE '4%')
+PYG_GROUP_PREFIXES: Dict[str, str] = {
+    'ingresos': '4',
+    'costo_ventas': '5.1',
+    'gastos_ventas': '5.2',
+    'gastos_admin': '5.3',
+    'costos_total': '5',
+}
+
+_CENT = Decimal('0.01')
+
+
+@dataclass
+class MonthlyPygTotals:
+    period_month: int
+    ingresos: Decimal
+    costo_ventas: Decimal
+    gastos_ventas: Decimal
+    gastos_admin: Decimal
+    costos_total: Decimal
+
+    @property
+    def utilidad_bruta(self) -> Decimal:
+        return self.ingresos - self.costo_ventas
+
+    @property
+    def ebitda(self) -> Decimal:
+        return self.ingresos - self.costos_total
+
+    @property
+    def utilidad_neta(self) -> Decimal:
+        return self.ingresos - self.costos_total
+
+
+def to_cents(amount: float) -> int:
+    """Round like a DECIMAL(15,2) column does and return integer cents."""
+    return int(Decimal(repr(amount)).quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def accounts_with_children(codes: Iterable[str]) -> Set[str]:
+    """Codes that have at least one descendant (``<code>.…``) in ``codes``."""
+    ordered = sorted(set(codes))
+    parents = set()
+    for code in ordered:
+        child_prefix = f"{code}."
+        # Descendants sort right after the "<code>." prefix
+        position = bisect_left(ordered, child_prefix)
+        if position < len(ordered) and ordered[position].startswith(child_prefix):
+            parents.add(code)
+    return parents
+
+
+def rollup_monthly_pyg(entries: Sequence[Tuple[str, int, int]]) -> List[MonthlyPygTotals]:
+    """
+    Sum leaf amounts per month and PyG group.
+
+    ``entries`` are ``(account_code, period_month, amount_cents)`` rows, one
+    per stored raw_account_data row. Months without entries are omitted.
+    """
+    if not entries:
+        return []
+
+    codes = sorted({code for code, _, _ in entries})
+    code_index = {code: index for index, code in enumerate(codes)}
+    groups = list(PYG_GROUP_PREFIXES)
+    code_groups = np.array(
+        [[code.startswith(PYG_GROUP_PREFIXES[group]) for group in groups] for code in codes],
+        dtype=np.int64,
+    )
+
+    entry_codes = np.fromiter((code_index[code] for code, _, _ in entries), dtype=np.int64, count=len(entries))
+    entry_months = np.fromiter((month for _, month, _ in entries), dtype=np.int64, count=len(entries))
+    entry_cents = np.fromiter((cents for _, _, cents in entries), dtype=np.int64, count=len(entries))
+
+    totals = []
+    for month in np.unique(entry_months):
+        in_month = entry_months == month
+        month_codes = entry_codes[in_month]
+        parents = accounts_with_children(codes[index] for index in np.unique(month_codes))
+        parent_indexes = np.fromiter((code_index[code] for code in parents), dtype=np.int64, count=len(parents))
+        leaf_cents = np.where(np.isin(month_codes, parent_indexes), 0, entry_cents[in_month])
+        group_cents = leaf_cents @ code_groups[month_codes]
+        values = {group: Decimal(int(cents)).scaleb(-2) for group, cents in zip(groups, group_cents)}
+        totals.append(MonthlyPygTotals(period_month=int(month), **values))
+    return totals
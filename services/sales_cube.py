@@ -0,0 +1,163 @@
+"""Single-pass sales cube for the BI dashboard.
+
+Fetches the filtered ``sales_transactions`` rows once as columns and computes
+every requested dashboard panel with pandas group-bys over that frame, instead
+of issuing one aggregate query per panel.
+"""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.sales import SalesTransaction
+from services.sales_rollup import DIMENSION_COLUMNS
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover - optional dependency
+    pd = None
+
+
+CUBE_METRICS = ('summary', 'kpis_gerencial', 'commercial', 'financial', 'trends')
+GROUPED_METRICS = ('commercial', 'financial')
+
+_MEASURES = ('venta_bruta', 'venta_neta', 'descuento', 'costo_venta', 'rentabilidad', 'm2')
+
+
+def fetch_sales_frame(
+    db: Session,
+    company_id: int,
+    years: List[int],
+    months: List[int],
+    filters: Dict[str, Optional[str]],
+    dimensions: Sequence[str],
+):
+    """Columnar fetch of the rows and columns the cube needs.
+
+    Filters on grouped ``dimensions`` are left for :func:`compute_sales_cube`
+    to apply in memory; every other filter is pushed down to SQL.
+    """
+    if pd is None:
+        raise RuntimeError("El servidor no tiene instalado pandas para calcular el cubo de ventas.")
+
+    dimension_names = set(dimensions) | {'cliente'}
+
+    columns = {
+        'year': SalesTransaction.year,
+        'month': SalesTransaction.month,
+        'numero_factura': SalesTransaction.numero_factura,
+    }
+    for name in sorted(dimension_names):
+        columns[name] = DIMENSION_COLUMNS[name]
+    for measure in _MEASURES:
+        columns[measure] = getattr(SalesTransaction, measure)
+
+    stmt = select(*[column.label(name) for name, column in columns.items()]).where(
+        SalesTransaction.company_id == company_id
+    )
+    if years:
+        stmt = stmt.where(SalesTransaction.year.in_(years))
+    if months:
+        stmt = stmt.where(SalesTransaction.month.in_(months))
+    for name, value in filters.items():
+        if value and name not in dimensions:
+            stmt = stmt.where(DIMENSION_COLUMNS[name] == value)
+
+    frame = pd.DataFrame.from_records(db.execute(stmt).all(), columns=list(columns))
+    for measure in _MEASURES:
+        frame[measure] = pd.to_numeric(frame[measure], errors='coerce').fillna(0.0).astype(float)
+    return frame
+
+
+def _filtered(frame, filters: Dict[str, Optional[str]], exclude: Optional[str] = None):
+    mask = None
+    for name, value in filters.items():
+        if not value or name == exclude or name not in frame.columns:
+            continue
+        condition = frame[name] == value
+        mask = condition if mask is None else mask & condition
+    return frame if mask is None else frame[mask]
+
+
+def _totals(frame) -> SimpleNamespace:
+    sums = frame[list(_MEASURES)].sum()
+    return SimpleNamespace(
+        venta_bruta_total=float(sums['venta_bruta']),
+        venta_neta_total=float(sums['venta_neta']),
+        descuento_total=float(sums['descuento']),
+        costo_venta_total=float(sums['costo_venta']),
+        rentabilidad_total=float(sums['rentabilidad']),
+        metros_cuadrados=float(sums['m2']),
+        total_m2=float(sums['m2']),
+        num_facturas=int(frame['numero_factura'].nunique()),
+        num_clientes=int(frame['cliente'].nunique()),
+    )
+
+
+def _group_rows(frame, keys: List[str], sort_by: Optional[str] = None, limit: Optional[int] = None):
+    grouped = frame.groupby(keys, sort=True, dropna=False).agg(
+        venta_neta=('venta_neta', 'sum'),
+        descuento=('descuento', 'sum'),
+        costo_venta=('costo_venta', 'sum'),
+        rentabilidad=('rentabilidad', 'sum'),
+        metros_cuadrados=('m2', 'sum'),
+        num_facturas=('numero_factura', 'nunique'),
+        num_transacciones=('numero_factura', 'size'),
+    ).reset_index()
+    # NULL keys form their own group in SQL and come back as None
+    for key in keys:
+        grouped[key] = grouped[key].astype(object).where(grouped[key].notna(), None)
+    if sort_by is not None:
+        grouped = grouped.sort_values(sort_by, ascending=False, kind='stable')
+    if limit is not None:
+        grouped = grouped.head(limit)
+    return list(grouped.itertuples(index=False))
+
+
+def compute_sales_cube(
+    frame,
+    metrics: Sequence[str],
+    dimensions: Sequence[str],
+    filters: Dict[str, Optional[str]],
+    limit: int,
+) -> Dict[str, object]:
+    """Aggregate every requested panel from one frame.
+
+    Grouped panels ignore the filter on their own dimension, matching
+    ``/analysis/commercial`` and ``/analysis/financial``.
+    """
+    panels: Dict[str, object] = {}
+    fully_filtered = _filtered(frame, filters)
+
+    if 'summary' in metrics or 'kpis_gerencial' in metrics:
+        totals = _totals(fully_filtered)
+        if 'summary' in metrics:
+            panels['summary'] = totals
+        if 'kpis_gerencial' in metrics:
+            panels['kpis_gerencial'] = totals
+
+    if 'trends' in metrics:
+        rows = _group_rows(fully_filtered, ['year', 'month'])
+        panels['trends'] = [
+            SimpleNamespace(**{
+                **row._asdict(),
+                'year': None if row.year is None else int(row.year),
+                'month': None if row.month is None else int(row.month),
+            })
+            for row in rows
+        ]
+
+    for metric, sort_by in (('commercial', 'venta_neta'), ('financial', 'rentabilidad')):
+        if metric not in metrics:
+            continue
+        panels[metric] = {}
+        for dimension in dimensions:
+            subset = _filtered(frame, filters, exclude=dimension)
+            rows = _group_rows(subset.rename(columns={dimension: 'dimension'}), ['dimension'], sort_by, limit)
+            panels[metric][dimension] = rows
+
+    return panels
@@ -0,0 +1,408 @@
+"""Streaming, batched loader for sales CSV exports.
+
+The CSV is read line by line from the uploaded file object, parsed and
+validated one batch at a time, and each batch is written with multi-row
+conflict-skipping ``INSERT`` statements. Duplicates are detected by the
+database through the ``(company_id, row_hash)`` unique index (on MySQL,
+with one hash lookup per statement) instead of loading the company's rows
+back into Python. Peak memory is bounded by
+``batch_size`` instead of the file size. Loads can also run as background jobs
+tracked in-process.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.sales import SalesTransaction
+from services.sales_rollup import clear_sales_rollup, refresh_sales_rollup
+
+
+DEFAULT_BATCH_SIZE = 5000
+MAX_TRACKED_JOBS = 100
+# Filas por sentencia INSERT multi-fila (SQLite admite ~32k parámetros)
+ROWS_PER_STATEMENT = 500
+
+_CENT = Decimal('0.01')
+
+# Columna del CSV -> columna de SalesTransaction
+_TEXT_COLUMNS = {
+    'categoria_producto': 'Categoría Producto',
+    'vendedor': 'Vendedor',
+    'canal_comercial': 'Canal Comercial',
+    'razon_social': 'Razón Social',
+}
+_DECIMAL_COLUMNS = {
+    'cantidad_facturada': 'Cantidad Facturada',
+    'm2': 'M2',
+    'venta_bruta': 'Venta Bruta $',
+    'descuento': 'Descuento $',
+    'venta_neta': 'Venta Neta $',
+    'costo_venta': 'Costo Venta $',
+    'costo_unitario': 'Costo Uni.$',
+    'rentabilidad': 'Rentabilidad $',
+}
+
+
+def parse_decimal(value_str: Optional[str]) -> Decimal:
+    """Parse a latin-formatted number (``1.234,56``)."""
+    if not value_str or not value_str.strip():
+        return Decimal('0')
+    # Limpiar el valor: quitar puntos de miles y reemplazar coma decimal por punto
+    cleaned_value = value_str.strip().replace('.', '').replace(',', '.')
+    return Decimal(cleaned_value)
+
+
+def _hash_amount(value: Decimal) -> str:
+    # Igual que CAST(DECIMAL(12,2) AS CHAR) en MySQL
+    quantized = Decimal(value).quantize(_CENT, rounding=ROUND_HALF_UP)
+    if quantized == 0:
+        quantized = Decimal('0.00')
+    return format(quantized, 'f')
+
+
+def sales_row_hash(
+    numero_factura: str,
+    producto: str,
+    fecha_emision: date,
+    cantidad_facturada: Decimal,
+    venta_neta: Decimal,
+) -> str:
+    """Content hash identifying a sales line (factura + producto + fecha + cantidad + venta neta).
+
+    Must stay in sync with the backfill in
+    ``schema/migrations/005_sales_transactions_row_hash.sql``.
+    """
+    payload = '|'.join((
+        numero_factura,
+        producto,
+        fecha_emision.isoformat(),
+        _hash_amount(cantidad_facturada),
+        _hash_amount(venta_neta),
+    ))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def iter_csv_batches(stream: IO[str], batch_size: int) -> Iterator[Tuple[int, List[Dict[str, str]]]]:
+    """Yield ``(first_line_number, rows)`` batches without materializing the file."""
+    reader = csv.DictReader(stream, delimiter=';')
+    batch: List[Dict[str, str]] = []
+    first_line = 2
+    for idx, row in enumerate(reader, start=2):
+        if not batch:
+            first_line = idx
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield first_line, batch
+            batch = []
+    if batch:
+        yield first_line, batch
+
+
+def parse_sales_batch(
+    rows: List[Dict[str, str]],
+    first_line: int,
+    company_id: int,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Validate a batch and return its insert mappings and errors."""
+    mappings: List[Dict[str, Any]] = []
+    errors: List[str] = []
+
+    for idx, row in enumerate(rows, start=first_line):
+        try:
+            fecha_str = (row.get('Fecha de Emisión') or '').strip()
+            if not fecha_str:
+                errors.append(f"Línea {idx}: La columna 'Fecha de Emisión' está vacía.")
+                continue
+            # Convertir formato de fecha (dd/mm/yyyy)
+            fecha_parts = fecha_str.split('/')
+            if len(fecha_parts) != 3:
+                errors.append(f"Línea {idx}: Fecha '{fecha_str}' no tiene el formato dd/mm/yyyy.")
+                continue
+            day, month, year = int(fecha_parts[0]), int(fecha_parts[1]), int(fecha_parts[2])
+            fecha_emision = date(year, month, day)
+
+            mapping: Dict[str, Any] = {
+                'company_id': company_id,
+                'fecha_emision': fecha_emision,
+                'numero_factura': (row.get('# Factura') or '').strip(),
+                'producto': (row.get('Producto') or '').strip(),
+                'factor_conversion': parse_decimal(row.get('Factor Conversión', '1')),
+            }
+            for column, header in _TEXT_COLUMNS.items():
+                mapping[column] = (row.get(header) or '').strip()
+            for column, header in _DECIMAL_COLUMNS.items():
+                mapping[column] = parse_decimal(row.get(header))
+
+            mapping['row_hash'] = sales_row_hash(
+                mapping['numero_factura'],
+                mapping['producto'],
+                fecha_emision,
+                mapping['cantidad_facturada'],
+                mapping['venta_neta'],
+            )
+            mappings.append(mapping)
+        except (ValueError, TypeError, IndexError, ArithmeticError) as e:
+            errors.append(f"Línea {idx}: Error de formato o dato inválido - {str(e)}. Fila: {row}")
+        except Exception as e:
+            errors.append(f"Línea {idx}: Error inesperado - {str(e)}. Fila: {row}")
+
+    return mappings, errors
+
+
+def insert_skipping_duplicates(db: Session, mappings: List[Dict[str, Any]]) -> int:
+    """Insert rows, letting the ``(company_id, row_hash)`` index drop duplicates.
+
+    Returns the number of rows actually inserted. MySQL has no conflict target,
+    so duplicates are filtered first (one ``IN`` lookup per statement plus the
+    file itself) and the rest go through ``ON DUPLICATE KEY UPDATE id = id``:
+    unlike ``INSERT IGNORE`` it only absorbs unique-key collisions, so bad
+    values and foreign-key errors still fail the load.
+    """
+    table = SalesTransaction.__table__
+    dialect = db.get_bind().dialect.name
+    inserted = 0
+    seen: Set[Tuple[int, str]] = set()
+    for start in range(0, len(mappings), ROWS_PER_STATEMENT):
+        rows = mappings[start:start + ROWS_PER_STATEMENT]
+        if dialect == 'sqlite':
+            stmt = sqlite.insert(table).values(rows).on_conflict_do_nothing(
+                index_elements=['company_id', 'row_hash']
+            )
+            inserted += db.execute(stmt).rowcount
+        elif dialect == 'postgresql':
+            stmt = postgresql.insert(table).values(rows).on_conflict_do_nothing(
+                index_elements=['company_id', 'row_hash']
+            )
+            inserted += db.execute(stmt).rowcount
+        else:
+            rows = _new_rows(db, rows, seen)
+            if rows:
+                # With CLIENT_FOUND_ROWS a no-op update counts as affected, so
+                # rowcount would also count rows a concurrent load just wrote
+                db.execute(_mysql_insert(table, rows))
+                inserted += len(rows)
+    return inserted
+
+
+def _mysql_insert(table, rows: List[Dict[str, Any]]):
+    stmt = mysql.insert(table).values(rows)
+    return stmt.on_duplicate_key_update(id=table.c.id)
+
+
+def _new_rows(
+    db: Session, rows: List[Dict[str, Any]], seen: Set[Tuple[int, str]]
+) -> List[Dict[str, Any]]:
+    """Drop rows whose ``(company_id, row_hash)`` is stored or already in ``seen``."""
+    keys = {(row['company_id'], row['row_hash']) for row in rows}
+    existing = set(
+        db.query(SalesTransaction.company_id, SalesTransaction.row_hash)
+        .filter(tuple_(SalesTransaction.company_id, SalesTransaction.row_hash).in_(list(keys)))
+        .all()
+    )
+    fresh = []
+    for row in rows:
+        key = (row['company_id'], row['row_hash'])
+        if key in existing or key in seen:
+            continue
+        seen.add(key)
+        fresh.append(row)
+    return fresh
+
+
+def load_sales_csv(
+    db: Session,
+    company_id: int,
+    stream: IO[str],
+    overwrite: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_chunk: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Load a sales CSV in batches inside a single transaction.
+
+    Returns the upload response payload. ``on_chunk`` receives the progress
+    entry of every batch as soon as it has been written.
+    """
+    started = time.perf_counter()
+    deleted_records = 0
+    total_rows = 0
+    total_inserted = 0
+    duplicates_skipped = 0
+    errors: List[str] = []
+    chunks: List[Dict[str, Any]] = []
+    periods: Set[Tuple[int, int]] = set()
+
+    try:
+        if overwrite:
+            deleted_records = db.query(SalesTransaction).filter(
+                SalesTransaction.company_id == company_id
+            ).delete(synchronize_session=False)
+            clear_sales_rollup(db, company_id)
+
+        for chunk_number, (first_line, rows) in enumerate(iter_csv_batches(stream, batch_size), start=1):
+            chunk_started = time.perf_counter()
+            mappings, batch_errors = parse_sales_batch(rows, first_line, company_id)
+
+            # Duplicados (en BD o dentro del mismo archivo) los descarta el índice único
+            chunk_inserted = insert_skipping_duplicates(db, mappings) if mappings else 0
+            chunk_duplicates = len(mappings) - chunk_inserted
+            if chunk_inserted:
+                periods.update((m['fecha_emision'].year, m['fecha_emision'].month) for m in mappings)
+
+            total_rows += len(rows)
+            total_inserted += chunk_inserted
+            duplicates_skipped += chunk_duplicates
+            errors.extend(batch_errors)
+
+            progress = {
+                'chunk': chunk_number,
+                'first_line': first_line,
+                'rows': len(rows),
+                'inserted': chunk_inserted,
+                'duplicates': chunk_duplicates,
+                'errors': len(batch_errors),
+                'rows_processed': total_rows,
+                'elapsed_ms': round((time.perf_counter() - chunk_started) * 1000, 1),
+            }
+            chunks.append(progress)
+            if on_chunk is not None:
+                on_chunk(progress)
+            print(f"Lote {chunk_number}: {len(rows)} filas, {chunk_inserted} insertadas, {len(batch_errors)} errores")
+
+        if total_inserted:
+            # Actualizar rollups solo para los periodos afectados (mismo commit)
+            refresh_sales_rollup(db, company_id, periods)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    warnings: List[str] = []
+
+    response_payload: Dict[str, Any] = {
+        'success': len(errors) == 0,
+        'message': f'Se procesaron {total_inserted} de {total_rows} transacciones.',
+        'total_uploaded': total_inserted,
+        'errors_count': len(errors),
+        'errors': errors[:20],
+        'batch_size': batch_size,
+        'chunks': chunks,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+    if overwrite:
+        response_payload['deleted_previous'] = deleted_records
+
+    if duplicates_skipped:
+        response_payload['duplicates_skipped_count'] = duplicates_skipped
+        warnings.append(f"Se omitieron {duplicates_skipped} filas por duplicado.")
+
+    if warnings:
+        response_payload['warnings'] = warnings
+
+    return response_payload
+
+
+def open_csv_text(binary: IO[bytes]) -> io.TextIOWrapper:
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+# ===================================================================
+# CARGAS EN SEGUNDO PLANO
+# ===================================================================
+
+@dataclass
+class SalesUploadJob:
+    id: str
+    company_id: int
+    filename: str
+    status: str = 'queued'
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'chunks_completed': len(self.chunks),
+            'rows_processed': self.chunks[-1]['rows_processed'] if self.chunks else 0,
+            'chunks': list(self.chunks),
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+_jobs: "OrderedDict[str, SalesUploadJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def create_upload_job(company_id: int, filename: str) -> SalesUploadJob:
+    job = SalesUploadJob(id=uuid.uuid4().hex, company_id=company_id, filename=filename)
+    with _jobs_lock:
+        _jobs[job.id] = job
+        while len(_jobs) > MAX_TRACKED_JOBS:
+            _jobs.popitem(last=False)
+    return job
+
+
+def get_upload_job(job_id: str, company_id: int) -> Optional[SalesUploadJob]:
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None or job.company_id != company_id:
+        return None
+    return job
+
+
+def run_upload_job(
+    job: SalesUploadJob,
+    bind,
+    path: str,
+    overwrite: bool,
+    batch_size: int,
+) -> None:
+    """Run a queued load from a spooled temp file with its own session."""
+    job.status = 'running'
+    db = Session(bind=bind)
+    try:
+        with open(path, 'rb') as binary:
+            job.result = load_sales_csv(
+                db,
+                job.company_id,
+                open_csv_text(binary),
+                overwrite=overwrite,
+                batch_size=batch_size,
+                on_chunk=job.chunks.append,
+            )
+        job.status = 'completed'
+    except Exception as exc:
+        job.status = 'failed'
+        job.error = str(exc)
+        print(f"--- ERROR en carga en segundo plano {job.id}: {exc} ---")
+    finally:
+        job.finished_at = datetime.utcnow()
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
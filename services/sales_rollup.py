@@ -0,0 +1,295 @@
+"""Materialized monthly sales rollups stored in ``sales_kpis_cache``.
+
+The cache holds one row per (company, year, month, dimension_type,
+dimension_value). Every writer of ``sales_transactions`` refreshes the
+affected periods inside its own transaction, so a company that has rollup
+rows always has a complete rollup. Companies without rollup rows (legacy data
+loaded before the cache existed, direct SQL imports) are answered from the
+live table by the BI routes.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, desc, func, or_
+from sqlalchemy.orm import Session
+
+from models.sales import SalesKPICache, SalesTransaction
+
+
+Period = Tuple[int, int]
+
+DIMENSION_COLUMNS = {
+    'categoria': SalesTransaction.categoria_producto,
+    'canal': SalesTransaction.canal_comercial,
+    'vendedor': SalesTransaction.vendedor,
+    'cliente': SalesTransaction.razon_social,
+    'producto': SalesTransaction.producto,
+}
+
+# DECIMAL(5,2) columns in sales_kpis_cache
+_MAX_PERCENT = Decimal('999.99')
+
+
+@dataclass
+class RollupPlan:
+    dimension_type: str
+    dimension_value: Optional[str]
+    years: List[int]
+    months: List[int]
+
+
+def _percent(numerator: Decimal, denominator: Decimal) -> Decimal:
+    if not denominator:
+        return Decimal('0')
+    value = (numerator / denominator * 100).quantize(Decimal('0.01'))
+    return max(-_MAX_PERCENT, min(_MAX_PERCENT, value))
+
+
+def _period_clause(periods: Iterable[Period], year_column, month_column):
+    by_year: Dict[int, Set[int]] = defaultdict(set)
+    for year, month in periods:
+        by_year[int(year)].add(int(month))
+    return or_(*[
+        and_(year_column == year, month_column.in_(sorted(months)))
+        for year, months in sorted(by_year.items())
+    ])
+
+
+def _aggregate_dimension(
+    db: Session,
+    company_id: int,
+    dimension_type: str,
+    periods: Optional[List[Period]],
+) -> List[Dict[str, object]]:
+    group_columns = [SalesTransaction.year, SalesTransaction.month]
+    dimension_column = DIMENSION_COLUMNS.get(dimension_type)
+    if dimension_column is not None:
+        group_columns.append(dimension_column)
+
+    query = db.query(
+        *group_columns,
+        func.sum(SalesTransaction.venta_bruta).label('venta_bruta'),
+        func.sum(SalesTransaction.venta_neta).label('venta_neta'),
+        func.sum(SalesTransaction.descuento).label('descuento'),
+        func.sum(SalesTransaction.costo_venta).label('costo_venta'),
+        func.sum(SalesTransaction.rentabilidad).label('rentabilidad'),
+        func.sum(SalesTransaction.m2).label('m2'),
+        func.count(func.distinct(SalesTransaction.numero_factura)).label('num_facturas'),
+    ).filter(
+        SalesTransaction.company_id == company_id,
+        SalesTransaction.year.isnot(None),
+        SalesTransaction.month.isnot(None),
+    )
+    if periods is not None:
+        query = query.filter(_period_clause(periods, SalesTransaction.year, SalesTransaction.month))
+
+    mappings: List[Dict[str, object]] = []
+    for row in query.group_by(*group_columns).all():
+        venta_bruta = Decimal(row.venta_bruta or 0)
+        venta_neta = Decimal(row.venta_neta or 0)
+        descuento = Decimal(row.descuento or 0)
+        costo_venta = Decimal(row.costo_venta or 0)
+        rentabilidad = Decimal(row.rentabilidad or 0)
+        num_facturas = int(row.num_facturas or 0)
+        mappings.append({
+            'company_id': company_id,
+            'year': row.year,
+            'month': row.month,
+            'dimension_type': dimension_type,
+            'dimension_value': row[2] if dimension_column is not None else None,
+            'venta_bruta': venta_bruta,
+            'venta_neta': venta_neta,
+            'descuento': descuento,
+            'cantidad_transacciones': num_facturas,
+            'cantidad_unidades': Decimal(row.m2 or 0),
+            'ticket_promedio': (venta_neta / num_facturas).quantize(Decimal('0.01')) if num_facturas else Decimal('0'),
+            'porcentaje_descuento': _percent(descuento, venta_neta + descuento),
+            'costo_venta': costo_venta,
+            'rentabilidad': rentabilidad,
+            'margen_porcentaje': _percent(rentabilidad, venta_neta),
+            'ratio_costo_venta': _percent(costo_venta, venta_neta),
+        })
+    return mappings
+
+
+def has_sales_rollup(db: Session, company_id: int) -> bool:
+    return db.query(SalesKPICache.id).filter(
+        SalesKPICache.company_id == company_id,
+        SalesKPICache.dimension_type == 'global',
+    ).first() is not None
+
+
+def refresh_sales_rollup(
+    db: Session,
+    company_id: int,
+    periods: Optional[Iterable[Period]] = None,
+) -> int:
+    """Recompute the rollup rows for ``periods`` (or the whole company).
+
+    A company without rollup rows is always rebuilt in full so that the
+    completeness invariant holds from its first refresh on. The caller owns
+    the transaction; pending ORM changes are flushed before aggregating.
+    """
+    db.flush()
+
+    period_list: Optional[List[Period]] = None
+    if periods is not None:
+        period_list = sorted({(int(y), int(m)) for y, m in periods if y and m})
+        if not period_list:
+            return 0
+        if not has_sales_rollup(db, company_id):
+            period_list = None
+
+    delete_query = db.query(SalesKPICache).filter(SalesKPICache.company_id == company_id)
+    if period_list is not None:
+        delete_query = delete_query.filter(
+            _period_clause(period_list, SalesKPICache.year, SalesKPICache.month)
+        )
+    delete_query.delete(synchronize_session=False)
+
+    mappings: List[Dict[str, object]] = []
+    for dimension_type in ('global', *DIMENSION_COLUMNS):
+        mappings.extend(_aggregate_dimension(db, company_id, dimension_type, period_list))
+
+    if mappings:
+        db.bulk_insert_mappings(SalesKPICache, mappings)
+    return len(mappings)
+
+
+def clear_sales_rollup(db: Session, company_id: int, year: Optional[int] = None) -> None:
+    query = db.query(SalesKPICache).filter(SalesKPICache.company_id == company_id)
+    if year:
+        query = query.filter(SalesKPICache.year == year)
+    query.delete(synchronize_session=False)
+
+
+def plan_rollup_query(
+    db: Session,
+    company_id: int,
+    years: List[int],
+    months: List[int],
+    filters: Dict[str, Optional[str]],
+    group_by: Optional[str] = None,
+    distinct_dimension: Optional[str] = None,
+) -> Optional[RollupPlan]:
+    """Return a plan when the rollup can answer the request, else ``None``.
+
+    The rollup is single-dimensional: it covers at most one equality filter,
+    or a ``group_by`` dimension with no filters. ``distinct_dimension`` asks for
+    a distinct count of that dimension, which is only derivable without filters
+    or when filtering on that same dimension.
+    """
+    active = {key: value for key, value in filters.items() if value}
+    if len(active) > 1:
+        return None
+    if group_by is not None:
+        if active or group_by not in DIMENSION_COLUMNS:
+            return None
+        dimension_type, dimension_value = group_by, None
+    elif active:
+        dimension_type, dimension_value = next(iter(active.items()))
+        if dimension_type not in DIMENSION_COLUMNS:
+            return None
+    else:
+        dimension_type, dimension_value = 'global', None
+
+    if distinct_dimension is not None and dimension_type not in ('global', distinct_dimension):
+        return None
+
+    if not has_sales_rollup(db, company_id):
+        return None
+
+    return RollupPlan(
+        dimension_type=dimension_type,
+        dimension_value=dimension_value,
+        years=list(years),
+        months=list(months),
+    )
+
+
+def _rollup_query(db: Session, company_id: int, plan: RollupPlan, *columns, dimension_type: Optional[str] = None):
+    query = db.query(*columns).filter(
+        SalesKPICache.company_id == company_id,
+        SalesKPICache.dimension_type == (dimension_type or plan.dimension_type),
+    )
+    if plan.dimension_value is not None and dimension_type is None:
+        query = query.filter(SalesKPICache.dimension_value == plan.dimension_value)
+    if plan.years:
+        query = query.filter(SalesKPICache.year.in_(plan.years))
+    if plan.months:
+        query = query.filter(SalesKPICache.month.in_(plan.months))
+    return query
+
+
+def rollup_totals(db: Session, company_id: int, plan: RollupPlan):
+    """Period totals with the same labels as the live summary/gerencial queries."""
+    row = _rollup_query(
+        db,
+        company_id,
+        plan,
+        func.sum(SalesKPICache.venta_bruta).label('venta_bruta_total'),
+        func.sum(SalesKPICache.venta_neta).label('venta_neta_total'),
+        func.sum(SalesKPICache.descuento).label('descuento_total'),
+        func.sum(SalesKPICache.costo_venta).label('costo_venta_total'),
+        func.sum(SalesKPICache.rentabilidad).label('rentabilidad_total'),
+        func.sum(SalesKPICache.cantidad_unidades).label('metros_cuadrados'),
+        func.sum(SalesKPICache.cantidad_transacciones).label('num_facturas'),
+    ).first()
+
+    totals = SimpleNamespace(**row._asdict())
+    totals.total_m2 = totals.metros_cuadrados
+    totals.num_facturas = int(totals.num_facturas or 0)
+
+    if plan.dimension_type == 'cliente':
+        totals.num_clientes = 1 if totals.venta_neta_total is not None else 0
+    elif plan.dimension_type == 'global':
+        totals.num_clientes = _rollup_query(
+            db,
+            company_id,
+            plan,
+            func.count(func.distinct(SalesKPICache.dimension_value)),
+            dimension_type='cliente',
+        ).scalar() or 0
+    else:
+        totals.num_clientes = None
+    return totals
+
+
+def rollup_monthly(db: Session, company_id: int, plan: RollupPlan):
+    return _rollup_query(
+        db,
+        company_id,
+        plan,
+        SalesKPICache.year,
+        SalesKPICache.month,
+        func.sum(SalesKPICache.venta_neta).label('venta_neta'),
+        func.sum(SalesKPICache.rentabilidad).label('rentabilidad'),
+        func.sum(SalesKPICache.costo_venta).label('costo_venta'),
+        func.sum(SalesKPICache.cantidad_transacciones).label('num_facturas'),
+    ).group_by(SalesKPICache.year, SalesKPICache.month).order_by(
+        SalesKPICache.year, SalesKPICache.month
+    ).all()
+
+
+_METRIC_COLUMNS = {
+    'sales': SalesKPICache.venta_neta,
+    'volume': SalesKPICache.cantidad_unidades,
+    'profit': SalesKPICache.rentabilidad,
+}
+
+
+def rollup_ranking(db: Session, company_id: int, plan: RollupPlan, metric: str, limit: int):
+    """Top ``limit`` values of the plan's dimension ordered by ``metric``."""
+    return _rollup_query(
+        db,
+        company_id,
+        plan,
+        SalesKPICache.dimension_value.label('name'),
+        func.sum(_METRIC_COLUMNS[metric]).label('value'),
+    ).group_by(SalesKPICache.dimension_value).order_by(desc('value')).limit(limit).all()
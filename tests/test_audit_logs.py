@@ -0,0 +1,120 @@
+import asyncio
+import inspect
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.connection import Base
+from models.audit import AuditLog
+from models.company import Company
+from models.user import User
+from routes.admin import export_audit_logs, get_audit_logs
+# Import models referenced via string relationships to register them with SQLAlchemy
+from models.sales import SalesTransaction  # noqa: F401
+from models.production import ProductionQuote  # noqa: F401
+
+
+@pytest.fixture()
+def session():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    tables = [Company.__table__, User.__table__, AuditLog.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+
+    companies = [Company(name="Tenant A", slug="tenant-a"), Company(name="Tenant B", slug="tenant-b")]
+    db.add_all(companies)
+    db.flush()
+    user = User(email="a@example.com", username="auditor", password_hash="x", company_id=companies[0].id)
+    db.add(user)
+    db.flush()
+
+    # Several rows share a timestamp so the cursor has to break ties on id
+    start = datetime(2025, 1, 1, 8, 0, 0)
+    for index in range(7):
+        db.add(AuditLog(
+            user_id=user.id,
+            company_id=companies[0].id,
+            action="login_success" if index % 2 == 0 else "user_updated",
+            resource="auth",
+            created_at=start + timedelta(minutes=index // 2),
+        ))
+    db.add(AuditLog(company_id=companies[1].id, action="login_success", created_at=start))
+    db.commit()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
+
+
+def fetch(db, user, **params):
+    # Same defaults as the HTTP endpoint
+    defaults = {
+        name: parameter.default.default
+        for name, parameter in inspect.signature(get_audit_logs).parameters.items()
+        if name not in ("current_user", "db")
+    }
+    defaults.update(params)
+    return asyncio.run(get_audit_logs(current_user=user, db=db, **defaults))
+
+
+def test_cursor_pages_cover_tenant_rows_once_in_order(session):
+    admin = SimpleNamespace(is_superuser=False, company_id=1)
+    expected = [log.id for log in sorted(
+        session.query(AuditLog).filter_by(company_id=1), key=lambda log: (log.created_at, log.id), reverse=True
+    )]
+
+    seen = []
+    page = fetch(session, admin, limit=3)
+    assert page["total"] == 7 and page["total_is_exact"]
+    while True:
+        seen.extend(entry["id"] for entry in page["logs"])
+        assert all(entry["username"] == "auditor" for entry in page["logs"])
+        if not page["has_more"]:
+            break
+        page = fetch(session, admin, limit=3, cursor=page["next_cursor"], count="none")
+        assert page["total"] is None
+    assert seen == expected
+
+
+def test_action_filter_modes_and_superuser_scope(session):
+    admin = SimpleNamespace(is_superuser=False, company_id=1)
+    root = SimpleNamespace(is_superuser=True, company_id=1)
+
+    # Substring match and exact count unless the client opts in
+    assert fetch(session, admin, action="updated")["total"] == 3
+    assert fetch(session, admin, action="login", action_match="prefix", count="approximate")["total"] == 4
+    assert fetch(session, admin, action="login", action_match="exact")["total"] == 0
+    assert fetch(session, root, action="login_success", action_match="exact", count="exact")["total"] == 5
+
+    with pytest.raises(HTTPException):
+        fetch(session, admin, cursor="not-a-cursor")
+
+
+def test_export_streams_ndjson_in_keyset_batches(session, monkeypatch):
+    monkeypatch.setattr("routes.admin.AUDIT_EXPORT_BATCH_SIZE", 2)
+    admin = SimpleNamespace(is_superuser=False, company_id=1)
+    response = asyncio.run(export_audit_logs(
+        user_id=None, action=None, action_match="prefix", resource=None, current_user=admin, db=session
+    ))
+
+    async def collect():
+        return [chunk async for chunk in response.body_iterator]
+
+    lines = "".join(asyncio.run(collect())).splitlines()
+    assert response.media_type == "application/x-ndjson"
+    entries = [json.loads(line) for line in lines]
+    assert len(entries) == 7
+    assert len({entry["id"] for entry in entries}) == 7
+    assert entries[0]["created_at"] == "2025-01-01T08:03:00"
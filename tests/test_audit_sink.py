@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models.audit import AuditLog
+from models.company import Company
+from models.user import User
+from services.audit_sink import AuditSink, audit_sink
+# Import models referenced via string relationships to register them with SQLAlchemy
+from models.sales import SalesTransaction  # noqa: F401
+from models.production import ProductionQuote  # noqa: F401
+
+
+@pytest.fixture()
+def context(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    tables = [Company.__table__, User.__table__, AuditLog.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(Company(name="Tenant A", slug="tenant-a"))
+    db.flush()
+    db.add(User(email="a@example.com", username="admin", password_hash="x", company_id=1))
+    db.commit()
+    try:
+        yield engine, db
+    finally:
+        audit_sink.stop()
+        db.close()
+        Base.metadata.drop_all(engine, tables=tables)
+        engine.dispose()
+
+
+def audit_actions(db):
+    db.expire_all()
+    return sorted(log.action for log in db.query(AuditLog).all())
+
+
+def test_log_action_writes_through_session_when_sink_is_stopped(context):
+    _, db = context
+    AuditLog.log_action(db, user_id=1, action="role_created")
+    assert db.new
+    db.commit()
+    assert audit_actions(db) == ["role_created"]
+
+
+def test_committed_entries_are_batched_and_rolled_back_ones_dropped(context):
+    engine, db = context
+    audit_sink.start(engine)
+    before = audit_sink.stats()
+
+    for action in ("user_created", "user_updated", "roles_assigned"):
+        AuditLog.log_action(db, user_id=1, action=action, details={"n": action})
+    assert not db.new
+    # Same clock as rows added through the session: the server default
+    assert all("created_at" not in row for row in db.info["audit_sink_pending"])
+    db.commit()
+
+    AuditLog.log_action(db, user_id=1, action="user_deleted")
+    db.rollback()
+
+    audit_sink.stop()
+    stats = audit_sink.stats()
+    assert stats["written"] - before["written"] == 3
+    assert stats["batches"] - before["batches"] == 1
+    assert audit_actions(db) == ["roles_assigned", "user_created", "user_updated"]
+    stored = db.query(AuditLog).filter_by(action="user_created").one()
+    assert stored.company_id == 1 and stored.details == {"n": "user_created"}
+    assert stored.created_at is not None
+
+
+def test_full_queue_falls_back_to_synchronous_insert(context):
+    engine, db = context
+    sink = AuditSink(max_queue=1, enqueue_timeout=0.01)
+    release = threading.Event()
+    # Worker stand-in that never drains the queue
+    sink._thread = threading.Thread(target=release.wait, daemon=True)
+    sink._thread.start()
+    try:
+        rows = [{"company_id": 1, "action": action} for action in ("a", "b", "c")]
+        sink.submit(rows, db)
+        stats = sink.stats()
+        assert stats["enqueued"] == 1
+        assert stats["sync_writes"] == 2
+        assert stats["queue_depth"] == 1
+        assert audit_actions(db) == ["b", "c"]
+    finally:
+        release.set()
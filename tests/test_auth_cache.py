@@ -0,0 +1,140 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from auth.auth_cache import auth_cache
+from auth.dependencies import get_current_user, require_permission
+from auth.jwt_handler import JWTHandler
+from auth.policy_engine import PolicyEngine
+from database.connection import Base
+from models import Company, Permission, Role, User, UserSession
+
+
+@pytest.fixture(scope="function")
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    auth_cache.clear()
+    try:
+        yield engine
+    finally:
+        auth_cache.clear()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.fixture
+def context(engine):
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    company = Company(name="Acme", slug="acme-cache")
+    db.add(company)
+    db.flush()
+    permission = Permission(resource="bi", action="view")
+    role = Role(name="analyst-cache", permissions=[permission])
+    user = User(
+        email="cache@example.com",
+        username="cache_user",
+        password_hash="x",
+        company_id=company.id,
+        is_active=True,
+        roles=[role],
+    )
+    db.add_all([role, user])
+    db.flush()
+    token = JWTHandler.create_access_token(
+        user_id=user.id, username=user.username, email=user.email, permissions=[], company_id=company.id
+    )
+    db.add(UserSession(
+        user_id=user.id,
+        company_id=company.id,
+        token_hash=JWTHandler.get_token_hash(token),
+        expires_at=datetime.utcnow() + timedelta(days=1),
+    ))
+    user_id, company_id = user.id, company.id
+    db.commit()
+    db.close()
+    return SessionLocal, token, user_id, company_id
+
+
+def authenticate(SessionLocal, token):
+    db = SessionLocal()
+    try:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        user = asyncio.run(get_current_user(credentials, db))
+        checker = require_permission("bi", "view")
+        asyncio.run(checker(current_user=user, db=db))
+        return user.id, [role.name for role in user.roles]
+    finally:
+        db.close()
+
+
+def count_queries(engine, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+
+def test_cached_auth_skips_user_session_and_permission_queries(engine, context):
+    SessionLocal, token, user_id, _ = context
+
+    _, cold = count_queries(engine, lambda: authenticate(SessionLocal, token))
+    (cached_id, roles), warm = count_queries(engine, lambda: authenticate(SessionLocal, token))
+
+    assert cached_id == user_id
+    assert roles == ["analyst-cache"]  # relationships still lazy-load
+    assert not any("user_sessions" in statement or "FROM companies" in statement for statement in warm)
+    assert len(warm) < len(cold)
+
+
+def test_logout_invalidates_cached_token(engine, context):
+    SessionLocal, token, _, _ = context
+    authenticate(SessionLocal, token)
+
+    db = SessionLocal()
+    session = db.query(UserSession).filter(UserSession.token_hash == JWTHandler.get_token_hash(token)).one()
+    session.revoke()
+    db.commit()
+    db.close()
+
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(SessionLocal, token)
+    assert excinfo.value.status_code == 401
+
+
+def test_company_deactivation_and_role_change_invalidate(engine, context):
+    SessionLocal, token, user_id, company_id = context
+    authenticate(SessionLocal, token)
+    assert PolicyEngine._compiled[(user_id, company_id)].permissions() == {("bi", "view")}
+
+    db = SessionLocal()
+    role = db.query(Role).filter(Role.name == "analyst-cache").one()
+    role.permissions.clear()
+    db.commit()
+    assert (user_id, company_id) not in PolicyEngine._compiled
+
+    db.get(Company, company_id).is_active = False
+    db.commit()
+    db.close()
+
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(SessionLocal, token)
+    assert excinfo.value.status_code == 403
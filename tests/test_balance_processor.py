@@ -168,3 +168,33 @@ def test_aggregate_balance_trends_returns_monthly_points(session):
     assert first["liquidez_corriente"] == pytest.approx(
         float(rows[1].balance) / float(rows[4].balance)
     )
+
+
+def test_aggregate_balance_trends_uses_latest_month_per_account(session):
+    session.query(BalanceData).delete()
+    session.add_all(
+        [
+            make_row("1", "Activos", Decimal("900"), year=2023),
+            make_row("1", "Activos", Decimal("1000"), year=2023, month=6),
+            make_row("1", "Activos", Decimal("1500"), year=2023, month=12),
+            make_row("1.1", "Activo Corriente", Decimal("400"), year=2023, month=3),
+            make_row("2.1", "Pasivo Corriente", Decimal("0"), year=2023, month=12),
+            make_row("4", "Otra cuenta", Decimal("10"), year=2024, month=1),
+        ]
+    )
+    session.commit()
+
+    annual = aggregate_balance_trends(session, company_id=1, start_year=2024, end_year=2023)
+    assert [(point["year"], point["month"]) for point in annual] == [(2023, None), (2024, None)]
+    assert annual[0]["activos"] == pytest.approx(1500.0)
+    assert annual[0]["capital_trabajo"] == pytest.approx(400.0)
+    assert annual[0]["liquidez_corriente"] is None
+    assert annual[1]["activos"] == 0.0
+
+    monthly = aggregate_balance_trends(
+        session, company_id=1, start_year=2023, end_year=2024, granularity="monthly"
+    )
+    assert [(point["year"], point["month"]) for point in monthly] == [
+        (2023, 3), (2023, 6), (2023, 12), (2024, 1)
+    ]
+    assert monthly[1]["activos"] == pytest.approx(1000.0)
@@ -0,0 +1,182 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from auth.dependencies import get_current_user
+from database.connection import Base, get_db
+from routes import balance_data_api
+from services import balance_processor
+
+
+@pytest.fixture(scope="function")
+def context():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    TestingSession = sessionmaker(bind=engine)
+    balance_processor._BALANCE_SNAPSHOTS.clear()
+
+    app = FastAPI()
+    app.include_router(balance_data_api.router)
+    user = SimpleNamespace(id=1, company_id=1)
+
+    def override_db():
+        db = TestingSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    app.dependency_overrides[get_db] = override_db
+    try:
+        yield TestClient(app), engine, TestingSession, user
+    finally:
+        balance_processor._BALANCE_SNAPSHOTS.clear()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def upload(TestingSession, user, year, month, rows):
+    db = TestingSession()
+    try:
+        payload = balance_data_api.BalanceUploadPayload(
+            year=year,
+            month=month,
+            rows=[{"code": code, "name": name, "value": value} for code, name, value in rows],
+        )
+        balance_data_api.upload_balance_data(payload=payload, current_user=user, db=db)
+    finally:
+        db.close()
+
+
+ROWS = [
+    ("1", "Activos", 1000.0),
+    ("1.1", "Activo Corriente", 600.0),
+    ("2", "Pasivos", 400.0),
+    ("2.1", "Pasivo Corriente", 300.0),
+    ("3", "Patrimonio", 600.0),
+]
+
+
+def count_queries(engine, func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        return func(), statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_data_is_served_from_snapshot_with_etag(context):
+    client, engine, TestingSession, user = context
+    upload(TestingSession, user, 2025, 3, ROWS)
+
+    first = client.get("/api/balance/data", params={"year": 2025, "month": 3})
+    assert first.status_code == 200
+    assert first.json()["data"]["metrics"]["capital_trabajo"] == 300.0
+    assert [node["code"] for node in first.json()["data"]["tree"]] == ["1", "2", "3"]
+    etag = first.headers["etag"]
+
+    cached, statements = count_queries(engine, lambda: client.get("/api/balance/data", params={"year": 2025, "month": 3}))
+    assert cached.content == first.content
+    assert not statements
+
+    not_modified = client.get(
+        "/api/balance/data", params={"year": 2025, "month": 3}, headers={"If-None-Match": etag}
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+
+def test_upload_invalidates_only_the_touched_period(context):
+    client, _, TestingSession, user = context
+    upload(TestingSession, user, 2025, 3, ROWS)
+    upload(TestingSession, user, 2025, 4, ROWS)
+    march = client.get("/api/balance/data", params={"year": 2025, "month": 3}).headers["etag"]
+    april = client.get("/api/balance/data", params={"year": 2025, "month": 4}).headers["etag"]
+    summary = client.get("/api/balance/summary", params={"year": 2025}).json()
+    assert summary["data"]["records"] == 10
+
+    upload(TestingSession, user, 2025, 4, [(code, name, value * 2) for code, name, value in ROWS])
+
+    assert ("data", 1, 2025, 3) in balance_processor._BALANCE_SNAPSHOTS
+    assert ("data", 1, 2025, 4) not in balance_processor._BALANCE_SNAPSHOTS
+    assert client.get("/api/balance/data", params={"year": 2025, "month": 3}).headers["etag"] == march
+    refreshed = client.get("/api/balance/data", params={"year": 2025, "month": 4})
+    assert refreshed.headers["etag"] != april
+    assert refreshed.json()["data"]["totals"]["activos"] == 2000.0
+
+    ratios = client.get("/api/balance/ratios", params={"year": 2025, "month": 4})
+    assert ratios.status_code == 200
+    assert ratios.json()["data"]["debt_to_equity"] == pytest.approx(800.0 / 1200.0)
+
+
+def test_missing_period_is_not_cached(context):
+    client, _, TestingSession, user = context
+    assert client.get("/api/balance/data", params={"year": 2025, "month": 5}).status_code == 404
+
+    upload(TestingSession, user, 2025, 5, ROWS)
+    assert client.get("/api/balance/data", params={"year": 2025, "month": 5}).status_code == 200
+
+
+def test_bulk_upload_derives_hierarchy_and_replaces_period(context):
+    _, engine, TestingSession, user = context
+    upload(TestingSession, user, 2025, 6, ROWS + [("1.1.03", "Inventarios", 200.0)])
+
+    db = TestingSession()
+    try:
+        payload = balance_data_api.BalanceUploadPayload(
+            year=2025, month=6, rows=[{"code": "1", "name": "Activos", "value": 10.0}]
+        )
+        result, statements = count_queries(
+            engine, lambda: balance_data_api.upload_balance_data(payload=payload, current_user=user, db=db)
+        )
+    finally:
+        db.close()
+
+    assert result["rows"] == 1
+    assert result["deleted"] == 6
+    assert set(result["timings"]) >= {"delete_ms", "insert_ms", "total_ms"}
+    assert sum(statement.startswith("INSERT") for statement in statements) == 2
+
+    db = TestingSession()
+    try:
+        rows = db.query(balance_data_api.BalanceData).filter_by(period_month=6).all()
+        raw = db.query(balance_data_api.RawBalanceData).filter_by(period_month=6).all()
+    finally:
+        db.close()
+    assert [(row.account_code, row.level, row.parent_code) for row in rows] == [("1", 1, None)]
+    assert [(row.row_index, row.account_code) for row in raw] == [(0, "1")]
+
+
+def test_balance_hierarchy_levels_and_parents():
+    levels, parents = balance_processor.balance_hierarchy(["1", "1.1", "1.1.03", "2.10.5"])
+    assert levels == [1, 2, 3, 3]
+    assert parents == [None, "1", "1.1", "2.10"]
+    assert balance_processor.balance_hierarchy([]) == ([], [])
+
+
+def test_snapshot_built_across_an_invalidation_is_not_stored():
+    key = ("data", 99, 2025, 6)
+
+    def build():
+        # Una carga confirma el periodo mientras se arma la respuesta
+        balance_processor.invalidate_balance_period(99, 2025, 6)
+        return {"stale": True}
+
+    snapshot = balance_processor.get_balance_snapshot(*key, build)
+    assert snapshot.body == b'{"stale":true}'
+    assert key not in balance_processor._BALANCE_SNAPSHOTS
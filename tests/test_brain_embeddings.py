@@ -0,0 +1,83 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+from brain.utils.embeddings import EmbeddingGenerator
+
+
+class CountingEncoder:
+    """Deterministic encoder recording every batch it receives."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        return np.array([[float(len(text)), float(text.count("a"))] for text in texts])
+
+
+def generator_with(encoder, **kwargs):
+    generator = EmbeddingGenerator(**kwargs)
+    generator._available = True
+    generator.model = encoder
+    return generator
+
+
+def test_concurrent_calls_share_one_encode_batch():
+    encoder = CountingEncoder()
+    generator = generator_with(encoder, batch_window_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(generator.generate(text) for text in ["a", "bb", "a", "ccc"]))
+
+    results = asyncio.run(run())
+    assert results == [[1.0, 1.0], [2.0, 0.0], [1.0, 1.0], [3.0, 0.0]]
+    assert encoder.batches == [["a", "bb", "ccc"]]
+    assert generator.get_stats()["largest_batch"] == 3
+
+
+def test_cache_serves_repeated_texts_and_evicts_least_recent():
+    encoder = CountingEncoder()
+    generator = generator_with(encoder, batch_window_ms=0, cache_size=2)
+
+    async def run():
+        first = await generator.generate("alpha")
+        first.append(99.0)  # callers get copies
+        again = await generator.generate("alpha")
+        await generator.generate("beta")
+        await generator.generate("gamma")
+        batch = await generator.generate_batch(["alpha", "gamma"])
+        return again, batch
+
+    again, batch = asyncio.run(run())
+    assert again == [5.0, 2.0]
+    assert batch == [[5.0, 2.0], [5.0, 2.0]]
+    assert encoder.batches == [["alpha"], ["beta"], ["gamma"], ["alpha"]]
+    assert generator.get_stats()["cache_hits"] == 2
+
+
+def test_model_is_not_loaded_until_first_use():
+    generator = EmbeddingGenerator()
+    assert generator.model is None
+    assert generator.get_stats()["model_loaded"] is False
+
+
+def test_failed_model_load_disables_embeddings_once(monkeypatch):
+    generator = EmbeddingGenerator()
+    generator._available = True
+    attempts = []
+
+    def failing_model(name):
+        attempts.append(name)
+        raise OSError("model download failed")
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", SimpleNamespace(SentenceTransformer=failing_model))
+
+    async def run():
+        return [await generator.generate("alpha") for _ in range(3)]
+
+    assert asyncio.run(run()) == [None, None, None]
+    assert len(attempts) == 1
+    assert generator.is_available() is False
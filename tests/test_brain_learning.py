@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+
+from brain.core.interfaces import ReasoningResult, ThoughtProcess, Tool
+from brain.learning.adapter import LearningAdapter
+
+
+def thought(prompt, task_type, tools):
+    return ThoughtProcess(
+        prompt=prompt,
+        context={},
+        timestamp=datetime.now(),
+        available_tools=[Tool(name=name, description=name, parameters={}) for name in tools],
+        reasoning=ReasoningResult(summary="ok", confidence=0.9, metadata={"task_type": task_type}),
+    )
+
+
+def test_feedback_burst_is_written_once_after_the_debounce(tmp_path):
+    adapter = LearningAdapter(str(tmp_path), save_debounce_seconds=0.05)
+
+    async def burst():
+        for n in range(20):
+            await adapter.process_feedback("great answer", thought(f"explain item {n}", "lookup", ["kpi"]))
+        assert not os.path.exists(tmp_path / "patterns.json")
+        await asyncio.sleep(0.2)
+
+    asyncio.run(burst())
+    assert adapter.store.flush_count == 1
+    with open(tmp_path / "feedback_history.jsonl") as f:
+        assert len(f.readlines()) == 20
+    with open(tmp_path / "patterns.json") as f:
+        assert json.load(f)["question_answering"]["positive_feedback_count"] == 20
+
+    reloaded = LearningAdapter(str(tmp_path))
+    assert len(reloaded.feedback_history) == 20
+    assert reloaded.approach_counts["question_answering"]["lookup"] == 20
+
+
+def test_patterns_are_serialized_once_per_flush(tmp_path, monkeypatch):
+    adapter = LearningAdapter(str(tmp_path), save_debounce_seconds=0.05)
+    dumps = json.dumps
+    serialized = []
+
+    def counting_dumps(obj, *args, **kwargs):
+        if obj is adapter.patterns:
+            serialized.append(1)
+        return dumps(obj, *args, **kwargs)
+
+    monkeypatch.setattr(json, "dumps", counting_dumps)
+
+    async def burst():
+        for n in range(10):
+            await adapter.process_feedback("great answer", thought(f"explain item {n}", "lookup", ["kpi"]))
+        assert serialized == []
+        await adapter.store.flush()
+
+    asyncio.run(burst())
+    assert serialized == [1]
+
+
+def test_recommendations_use_approach_counters(tmp_path):
+    adapter = LearningAdapter(str(tmp_path), save_debounce_seconds=0)
+
+    async def feedback():
+        await adapter.process_feedback("helpful", thought("analyze sales", "ratios", ["ratio_tool"]))
+        await adapter.process_feedback("helpful", thought("analyze costs", "trend", ["trend_tool"]))
+        await adapter.process_feedback("useful", thought("compare margins", "trend", ["chart_tool"]))
+        await adapter._save_learning_data()
+
+    asyncio.run(feedback())
+    recommendations = adapter.get_recommendations("evaluate the quarter")
+    assert recommendations["suggested_approach"] == "trend"
+    assert recommendations["confidence"] == 1.0
+    assert {"trend_tool", "chart_tool"} <= set(recommendations["preferred_tools"])
+
+
+def test_legacy_history_is_migrated_to_the_log(tmp_path):
+    with open(tmp_path / "feedback_history.json", "w") as f:
+        json.dump([{"feedback": "good", "sentiment": "positive"}] * 3, f, indent=2)
+
+    adapter = LearningAdapter(str(tmp_path))
+    assert len(adapter.feedback_history) == 3
+    assert not os.path.exists(tmp_path / "feedback_history.json")
+    assert os.path.exists(tmp_path / "feedback_history.jsonl")
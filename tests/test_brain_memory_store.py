@@ -0,0 +1,107 @@
+import os
+import pickle
+from datetime import datetime
+
+import numpy as np
+
+from brain.core.interfaces import Memory
+from brain.memory.store import LongTermMemoryStore
+
+
+def memory(n, embedding=True):
+    return Memory(
+        content=f"memory {n}",
+        embedding=[float(n), 1.0, 0.5] if embedding else None,
+        timestamp=datetime(2025, 1, 1, 12, n % 60),
+        importance=0.75,
+        metadata={"n": n},
+    )
+
+
+def persist(store, memories, item):
+    memories.append(item)
+    store.append(item, memories)
+
+
+def reload(directory):
+    store = LongTermMemoryStore(str(directory))
+    return store, store.load()
+
+
+def test_appends_and_removals_round_trip_through_the_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(LongTermMemoryStore, "INITIAL_CAPACITY", 4)
+    store = LongTermMemoryStore(str(tmp_path))
+    memories = []
+    for n in range(10):
+        persist(store, memories, memory(n, embedding=n != 3))
+    store.remove(memories.pop(0))
+    store.close()
+
+    _, loaded = reload(tmp_path)
+    assert [m.metadata["n"] for m in loaded] == list(range(1, 10))
+    assert loaded[2].embedding is None
+    assert isinstance(loaded[0].embedding, np.memmap)
+    assert list(loaded[-1].embedding) == [9.0, 1.0, 0.5]
+    # Capacity growth rewrote the vectors file; only the latest generation remains
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".npy")]) == 1
+
+
+def test_each_promotion_appends_one_line(tmp_path):
+    store = LongTermMemoryStore(str(tmp_path))
+    memories = []
+    persist(store, memories, memory(1))
+    size = os.path.getsize(store.log_path)
+    persist(store, memories, memory(2))
+    with open(store.log_path, encoding="utf-8") as f:
+        lines = f.readlines()
+    assert len(lines) == 3  # header + two adds
+    assert os.path.getsize(store.log_path) - size == len(lines[-1].encode())
+
+
+def test_torn_line_is_ignored_and_dead_records_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(LongTermMemoryStore, "COMPACT_MIN_DEAD", 3)
+    store = LongTermMemoryStore(str(tmp_path))
+    memories = []
+    for n in range(6):
+        persist(store, memories, memory(n))
+    for item in memories[:4]:
+        store.remove(item)
+    store.close()
+    with open(store.log_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "add", "key"')
+
+    store, loaded = reload(tmp_path)
+    assert [m.metadata["n"] for m in loaded] == [4, 5]
+    with open(store.log_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+
+
+def test_legacy_pickle_is_migrated_once(tmp_path):
+    with open(tmp_path / "memories.pkl", "wb") as f:
+        pickle.dump({"long_term": [memory(1), memory(2, embedding=False)]}, f)
+
+    store, loaded = reload(tmp_path)
+    assert [m.content for m in loaded] == ["memory 1", "memory 2"]
+    assert not (tmp_path / "memories.pkl").exists()
+
+    _, again = reload(tmp_path)
+    assert [m.content for m in again] == ["memory 1", "memory 2"]
+    assert list(again[0].embedding) == [1.0, 1.0, 0.5]
+
+
+def test_memories_without_embeddings_round_trip(tmp_path):
+    store = LongTermMemoryStore(str(tmp_path))
+    memories = []
+    for n in range(3):
+        persist(store, memories, memory(n, embedding=False))
+    store.remove(memories.pop(1))
+    store.close()
+
+    store, loaded = reload(tmp_path)
+    assert [m.content for m in loaded] == ["memory 0", "memory 2"]
+    assert all(m.embedding is None for m in loaded)
+
+    persist(store, loaded, memory(3, embedding=False))
+    store.close()
+    _, again = reload(tmp_path)
+    assert [m.content for m in again] == ["memory 0", "memory 2", "memory 3"]
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from brain.core.brain import Brain
+from brain.core.config import BrainConfig, MemoryConfig
+from brain.core.interfaces import Message, MessageRole
+from brain.core.response_cache import ResponseCache
+
+
+@pytest.fixture()
+def brain(tmp_path, monkeypatch):
+    config = BrainConfig(
+        memory=MemoryConfig(vector_db_path=str(tmp_path / "memory")),
+        enable_logging=False,
+        enable_learning=False,
+        save_conversations=False,
+    )
+    brain = Brain(config)
+    calls = []
+
+    async def generate(thought_process):
+        calls.append(thought_process.prompt)
+        await asyncio.sleep(0.02)
+        if "fail" in thought_process.prompt:
+            return Message(role=MessageRole.ASSISTANT, content="error", timestamp=datetime.now(), metadata={"error": True})
+        return Message(role=MessageRole.ASSISTANT, content=f"answer {len(calls)}", timestamp=datetime.now())
+
+    monkeypatch.setattr(brain, "_generate_response", generate)
+    brain.calls = calls
+    return brain
+
+
+def test_normalized_identical_prompts_are_served_from_cache(brain):
+    async def run():
+        first = await brain.think("Analiza   el margen", {"kpis": {"a": 1, "b": 2}})
+        second = await brain.think("analiza el margen ", {"kpis": {"b": 2, "a": 1}})
+        other = await brain.think("Analiza el margen", {"kpis": {"a": 2}})
+        return first, second, other
+
+    first, second, other = asyncio.run(run())
+    assert second.response.content == first.response.content == "answer 1"
+    assert second is not first and second.prompt == "analiza el margen "
+    assert other.response.content == "answer 2"
+    stats = brain.response_cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["saved_ms"] > 0
+
+
+def test_concurrent_identical_calls_share_one_model_call(brain):
+    async def run():
+        return await asyncio.gather(*(brain.think("explain ebitda", {"user_id": 1}) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert brain.calls == ["explain ebitda"]
+    assert {tp.response.content for tp in results} == {"answer 1"}
+    assert brain.response_cache.get_stats()["coalesced"] == 4
+
+
+def test_errors_and_bypass_are_not_cached(brain):
+    async def run():
+        await brain.think("fail please")
+        await brain.think("fail please")
+        await brain.think("explain", use_cache=False)
+        await brain.think("explain", use_cache=False)
+
+    asyncio.run(run())
+    assert brain.calls == ["fail please", "fail please", "explain", "explain"]
+
+
+def test_entries_expire_and_are_evicted_by_size():
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+
+    async def compute_value(value):
+        return value
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await cache.get_or_compute(key, lambda key=key: compute_value(key))
+        return await cache.get_or_compute("a", lambda: compute_value("a2"))
+
+    assert asyncio.run(run()) == ("a2", "miss")
+    assert cache.get_stats()["evictions"] == 2
+
+    expired = ResponseCache(ttl_seconds=0.001, max_entries=2)
+    expired._put("k", 1.0, "v")
+    asyncio.run(asyncio.sleep(0.01))
+    assert expired._get("k") is None
+
+
+def test_cancelling_the_first_caller_does_not_fail_coalesced_ones():
+    cache = ResponseCache(ttl_seconds=60, max_entries=8)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ("value", "coalesced")
+    assert len(calls) == 1
+    assert cache._get("k")[1] == "value"
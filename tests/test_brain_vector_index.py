@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from brain.core.config import MemoryConfig
+from brain.core.interfaces import Memory, ThoughtProcess
+from brain.memory.manager import MemoryManager
+from brain.memory.vector_index import VectorIndex
+
+
+def brute_force(memories, query, limit):
+    query = np.asarray(query)
+    scored = [
+        (float(np.dot(query, m.embedding) / (np.linalg.norm(query) * np.linalg.norm(m.embedding))), m)
+        for m in memories
+    ]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return scored[:limit]
+
+
+def test_search_matches_brute_force_cosine_ranking():
+    rng = np.random.default_rng(7)
+    memories = [Memory(content=str(i), embedding=rng.normal(size=16).tolist()) for i in range(200)]
+    index = VectorIndex(initial_capacity=8)
+    assert index.extend(memories[:150]) == 150
+    for memory in memories[150:]:
+        index.add(memory)
+    for memory in memories[::3]:
+        assert index.remove(memory)
+    index.retain(memories[1::2])
+    remaining = [m for i, m in enumerate(memories) if i % 3 and i % 2]
+    assert len(index) == len(remaining)
+
+    query = rng.normal(size=16).tolist()
+    expected = brute_force(remaining, query, 5)
+    found = index.search(query, 5)
+    assert [m.content for _, m in found] == [m.content for _, m in expected]
+    assert [score for score, _ in found] == pytest.approx([score for score, _ in expected], abs=1e-5)
+    assert len(index.search(query, 1000)) == len(remaining)
+
+
+def test_memories_without_comparable_embeddings_are_skipped():
+    index = VectorIndex()
+    assert not index.add(Memory(content="none"))
+    assert index.add(Memory(content="a", embedding=[1.0, 0.0]))
+    assert not index.add(Memory(content="b", embedding=[1.0, 0.0, 0.0]))
+    assert index.search([0.0, 0.0, 1.0], 3) == []
+
+
+class FixedEmbeddings:
+    """Maps texts containing a known word to a fixed vector."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def is_available(self):
+        return True
+
+    async def generate(self, text):
+        return next((vector for word, vector in self.vectors.items() if word in text), None)
+
+
+def test_manager_keeps_indexes_in_step_with_memory_tiers(tmp_path):
+    config = MemoryConfig(max_short_term_items=2, max_long_term_items=2, vector_db_path=str(tmp_path))
+    manager = MemoryManager(config)
+    manager.is_initialized = True
+    manager.embeddings = FixedEmbeddings({
+        "north": [0.0, 1.0], "east": [1.0, 0.0],
+        "polar": [0.1, 1.0], "sunrise": [1.0, 0.1], "dawn": [1.0, 0.2],
+    })
+
+    def remember(prompt, importance):
+        manager._calculate_importance = lambda thought_process: importance
+        asyncio.run(manager.store(ThoughtProcess(prompt=prompt, context={}, timestamp=datetime.now())))
+        return manager.short_term_memory[-1]
+
+    polar = remember("polar", 0.75)
+    remember("sunrise", 0.9)
+    remember("dawn", 0.5)
+    assert len(manager.short_term_index) == 2 and polar not in manager.short_term_index
+    assert polar in manager.long_term_index
+
+    assert asyncio.run(manager.retrieve_relevant("north", limit=1)) == [polar]
+
+    polar.timestamp -= timedelta(days=60)
+    asyncio.run(manager.forget_old_memories(days=30))
+    assert polar not in manager.long_term_index
+    assert asyncio.run(manager.retrieve_relevant("north", limit=1))[0].content.startswith("Q: dawn")
+
+    reloaded = MemoryManager(config)
+    assert len(reloaded.long_term_index) == 1
@@ -0,0 +1,95 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from database.schema_registry import schema_registry
+from models.financial import FinancialData, RawAccountData
+from routes import financial_data
+
+
+CSV = "\n".join([
+    "COD.;CUENTA;Enero;Febrero",
+    "4;INGRESOS;1.500,00;800,00",
+    "4.1;VENTAS;1.500,00;800,00",
+    "4.1.01;VENTAS LOCALES;1.000,00;",
+    "4.1.02;EXPORTACIONES;500,00;",
+    "5.1;COSTO DE VENTAS;600,00;300,00",
+    "5.3;GASTOS ADMINISTRATIVOS;100,50;0",
+]) + "\n"
+
+USER = SimpleNamespace(company_id=1)
+
+
+@pytest.fixture(scope="function")
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSession = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def upload(db, year=2025):
+    csv = UploadFile(file=io.BytesIO(CSV.encode("utf-8")), filename="pyg.csv")
+    return asyncio.run(financial_data.upload_csv(csv=csv, year=year, current_user=USER, db=db))
+
+
+def test_upload_rolls_up_leaf_accounts_per_month(session):
+    result = upload(session)
+
+    assert result["success"] is True
+    assert result["rowsInserted"] == 9
+    assert result["importTimeMs"] >= 0
+    assert result["totalRevenue"] == pytest.approx(1500.0)  # hojas en todo el archivo, como el PHP
+    assert session.query(RawAccountData).count() == 9
+
+    data = asyncio.run(financial_data.get_financial_data(year=2025, include_raw=False, current_user=USER, db=session))
+    rows = {row["month"]: row for row in data["data"]}
+    # Enero: 4.1.01 + 4.1.02; febrero: 4.1 no tiene subcuentas con saldo y es hoja
+    assert rows[1]["ingresos"] == pytest.approx(1500.0)
+    assert rows[1]["costo_ventas_total"] == pytest.approx(600.0)
+    assert rows[1]["gastos_admin_total"] == pytest.approx(100.5)
+    assert rows[1]["ebitda"] == pytest.approx(799.5)
+    assert rows[2]["ingresos"] == pytest.approx(800.0)
+    assert rows[2]["utilidad_bruta"] == pytest.approx(500.0)
+
+
+def test_reupload_replaces_year_and_reuses_schema(session):
+    upload(session)
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(session.get_bind(), "before_cursor_execute", before_cursor_execute)
+    try:
+        upload(session)
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", before_cursor_execute)
+
+    assert not any("PRAGMA" in statement or "SHOW COLUMNS" in statement for statement in statements)
+    assert session.query(FinancialData).filter(FinancialData.period_year == 2025).count() == 2
+    assert session.query(RawAccountData).count() == 9
+
+
+def test_schema_registry_refresh_forgets_columns(session):
+    bind = session.get_bind()
+    first = schema_registry.get_compiled(bind, "financial_data", "statements", financial_data._build_financial_data_statements)
+    assert schema_registry.get_compiled(bind, "financial_data", "statements", lambda columns: None) is first
+    assert first.year_column == "period_year"
+
+    schema_registry.refresh("financial_data")
+    assert schema_registry.get_compiled(bind, "financial_data", "statements", lambda columns: "rebuilt") == "rebuilt"
+    assert schema_registry.get_columns(bind, "no_such_table") == frozenset()
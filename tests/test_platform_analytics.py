@@ -0,0 +1,94 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models import Company, User
+from models.balance import BalanceData
+from models.production import ProductionQuote
+from models.sales import SalesTransaction
+from services import platform_analytics
+
+
+@pytest.fixture(scope="function")
+def context():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    platform_analytics.invalidate_platform_overview()
+    try:
+        yield engine, db
+    finally:
+        platform_analytics.invalidate_platform_overview()
+        db.close()
+        engine.dispose()
+
+
+def seed(db):
+    db.add_all([
+        Company(name="Tenant A", slug="tenant-a", subscription_tier="enterprise"),
+        Company(name="Tenant B", slug="tenant-b", subscription_tier="trial", is_active=False),
+    ])
+    db.flush()
+    db.add_all([
+        User(email="a@example.com", username="a", password_hash="x", company_id=1, is_superuser=True),
+        User(email="b@example.com", username="b", password_hash="x", company_id=1, is_active=False),
+        User(email="c@example.com", username="c", password_hash="x", company_id=2),
+    ])
+    for factura in ("F-1", "F-2", "F-3"):
+        db.add(SalesTransaction(
+            company_id=2, fecha_emision=date(2025, 1, 5), year=2025, month=1,
+            categoria_producto="Cat", vendedor="V", numero_factura=factura, canal_comercial="C",
+            razon_social="Cliente", producto="P", venta_neta=Decimal("10"),
+        ))
+    db.add(ProductionQuote(company_id=1, numero_cotizacion="COT-1", cliente="Cliente", fecha_ingreso=datetime(2025, 1, 1)))
+    for month, code in ((1, "1"), (1, "1.1"), (2, "1")):
+        db.add(BalanceData(
+            company_id=1, period_year=2025, period_month=month, account_code=code,
+            account_name=code, level=code.count(".") + 1, balance=Decimal("1"),
+        ))
+    db.commit()
+
+
+def test_overview_counts_with_three_queries(context):
+    engine, db = context
+    seed(db)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        overview = platform_analytics.compute_platform_overview(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 3
+    assert overview["companies"] == {
+        "total": 2, "active": 1, "inactive": 1,
+        "by_tier": {"trial": 1, "professional": 0, "enterprise": 1},
+    }
+    assert overview["users"] == {"total": 3, "active": 2, "inactive": 1, "superusers": 1}
+    assert overview["data_volume"] == {"sales_rows": 3, "quotes": 1, "balance_periods": 2}
+    first, second = overview["tenants"]
+    assert (first["company_id"], first["sales_rows"], first["users"]) == (2, 3, 1)
+    assert (second["quotes"], second["balance_periods"], second["users"]) == (1, 2, 2)
+
+
+def test_overview_is_cached_until_invalidated(context):
+    _, db = context
+    seed(db)
+    overview, cached = platform_analytics.get_platform_overview(db)
+    assert not cached
+
+    db.add(Company(name="Tenant C", slug="tenant-c"))
+    db.commit()
+    again, cached = platform_analytics.get_platform_overview(db)
+    assert cached and again is overview
+
+    platform_analytics.invalidate_platform_overview()
+    refreshed, cached = platform_analytics.get_platform_overview(db)
+    assert not cached
+    assert refreshed["companies"]["total"] == 3
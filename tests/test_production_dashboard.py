@@ -0,0 +1,144 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models.production import ProductionProduct, ProductionQuote, ProductionStatusEnum
+from routes import production_status
+from routes.production_status import (
+    _get_dashboard_snapshot,
+    _invalidate_dashboard_snapshot,
+    get_dashboard_kpis,
+    get_dashboard_schedule,
+)
+
+
+@pytest.fixture(scope="function")
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSession = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    production_status._DASHBOARD_SNAPSHOT_CACHE.clear()
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+        production_status._DASHBOARD_SNAPSHOT_CACHE.clear()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def add_product(db, numero: str, descripcion: str, cantidad: str, company_id: int = 1) -> ProductionProduct:
+    quote = ProductionQuote(
+        company_id=company_id,
+        numero_cotizacion=numero,
+        cliente="Cliente A",
+        fecha_ingreso=datetime.combine(date.today(), datetime.min.time()),
+    )
+    product = ProductionProduct(
+        company_id=company_id,
+        cotizacion=quote,
+        descripcion=descripcion,
+        cantidad=cantidad,
+        valor_subtotal=Decimal("100"),
+        fecha_entrega=date.today() + timedelta(days=10),
+        estatus=ProductionStatusEnum.EN_PRODUCCION,
+    )
+    db.add_all([quote, product])
+    db.commit()
+    return product
+
+
+def active_lines(snapshot) -> str:
+    return next(card.value for card in snapshot.kpis.kpi_cards if card.label == "Líneas activas")
+
+
+def test_kpis_and_schedule_share_one_snapshot(session):
+    add_product(session, "COT-1", "Porcelanato gris 60x60", "12 m2")
+    add_product(session, "COT-2", "Servicio de transporte", "1")
+
+    user = SimpleNamespace(company_id=1)
+    kpis = asyncio.run(get_dashboard_kpis(current_user=user, db=session))
+    schedule = asyncio.run(get_dashboard_schedule(current_user=user, db=session))
+
+    snapshot = _get_dashboard_snapshot(session, 1)
+    assert kpis is snapshot.kpis
+    assert schedule is snapshot.schedule
+    assert active_lines(snapshot) == "1"
+    assert sum(day.metros for day in schedule.days) == pytest.approx(12.0)
+
+
+def test_snapshot_is_reused_until_invalidated(session):
+    add_product(session, "COT-1", "Porcelanato gris 60x60", "12 m2")
+    first = _get_dashboard_snapshot(session, 1)
+
+    add_product(session, "COT-2", "Porcelanato beige 60x60", "5 m2")
+    assert _get_dashboard_snapshot(session, 1) is first
+
+    _invalidate_dashboard_snapshot(1)
+    refreshed = _get_dashboard_snapshot(session, 1)
+    assert refreshed is not first
+    assert active_lines(refreshed) == "2"
+
+    # Otras empresas tienen su propio snapshot
+    assert active_lines(_get_dashboard_snapshot(session, 2)) == "0"
+
+
+def test_snapshot_built_across_an_invalidation_is_not_stored(session, monkeypatch):
+    add_product(session, "COT-1", "Porcelanato gris 60x60", "12 m2")
+    load = production_status._load_dashboard_items
+
+    def load_during_write(db, company_id):
+        items = load(db, company_id)
+        # Una escritura confirma y limpia la empresa mientras se arma el snapshot
+        _invalidate_dashboard_snapshot(company_id)
+        return items
+
+    monkeypatch.setattr(production_status, "_load_dashboard_items", load_during_write)
+    _get_dashboard_snapshot(session, 1)
+    assert 1 not in production_status._DASHBOARD_SNAPSHOT_CACHE
+
+
+def naive_is_working(value: date) -> bool:
+    return value.weekday() < 5 and value not in production_status._get_ecuador_holidays(value.year)
+
+
+def test_working_day_calendar_matches_day_by_day_walk():
+    calendar = production_status._WorkingDayCalendar()
+    start = date(2024, 12, 20)
+    for offset in range(400):
+        value = start + timedelta(days=offset)
+        assert calendar.is_working_day(value) == naive_is_working(value)
+
+        expected_next = value
+        while not naive_is_working(expected_next):
+            expected_next += timedelta(days=1)
+        assert calendar.next_working_day(value) == expected_next
+
+        expected_previous = value - timedelta(days=1)
+        while not naive_is_working(expected_previous):
+            expected_previous -= timedelta(days=1)
+        assert calendar.previous_working_day(value) == expected_previous
+        assert calendar.previous_working_day(value, include_today=True) == (
+            value if naive_is_working(value) else expected_previous
+        )
+
+    end = date(2026, 2, 10)
+    expected_days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+    expected_days = [day for day in expected_days if naive_is_working(day)]
+    assert calendar.working_days(start, end) == expected_days
+    assert calendar.count_working_days(start, end) == len(expected_days)
+    assert calendar.working_days(end, start) == []
+
+    # El margen de un año no sale del rango de date
+    for edge in (date.min, date.max):
+        assert production_status._WorkingDayCalendar().is_working_day(edge) == naive_is_working(edge)
+
+    shares = calendar.distribute(expected_days[:4], Decimal("10"))
+    assert [share for _, share in shares] == [Decimal("2.5")] * 4
@@ -0,0 +1,95 @@
+import asyncio
+import io
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models.production import ProductionQuote
+from routes import production_status
+
+
+@pytest.fixture(scope="function")
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSession = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def fake_parse(content: bytes, filename: str) -> dict:
+    if content == b"roto":
+        raise HTTPException(status_code=400, detail="No se encontró el número de cotización.")
+    return {
+        "numero_cotizacion": content.decode(),
+        "cliente": "Cliente A",
+        "valor_total": Decimal("100"),
+        "productos": [{"descripcion": "Porcelanato 60x60", "cantidad": "10 m2", "valor_subtotal": Decimal("100")}],
+    }
+
+
+def upload(name: str, content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=name)
+
+
+def test_upload_quotes_reports_failures_without_aborting_batch(session, monkeypatch):
+    monkeypatch.setattr(production_status, "QUOTE_PARSE_WORKERS", 0)
+    monkeypatch.setattr(production_status, "parse_quote_excel", fake_parse)
+    monkeypatch.setattr(production_status.file_storage, "save_bytes", lambda *args: "/tmp/ignored")
+
+    result = asyncio.run(
+        production_status.upload_quotes(
+            files=[
+                upload("cot1.xlsx", b"COT-1"),
+                upload("roto.xlsx", b"roto"),
+                upload("notas.txt", b"COT-3"),
+                upload("cot2.xls", b"COT-2"),
+            ],
+            current_user=SimpleNamespace(company_id=1),
+            db=session,
+        )
+    )
+
+    assert [item["cotizacion"] for item in result["resultados"]] == ["COT-1", "COT-2"]
+    assert [item["archivo"] for item in result["fallidos"]] == ["roto.xlsx", "notas.txt"]
+    assert "número de cotización" in result["fallidos"][0]["error"]
+    assert set(result["tiempos"]) == {"parse_ms", "db_ms", "total_ms"}
+    assert session.query(ProductionQuote).count() == 2
+
+
+def test_upload_quotes_rejects_batch_when_every_file_fails(session, monkeypatch):
+    monkeypatch.setattr(production_status, "QUOTE_PARSE_WORKERS", 0)
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(
+            production_status.upload_quotes(
+                files=[upload("notas.txt", b"x")],
+                current_user=SimpleNamespace(company_id=1),
+                db=session,
+            )
+        )
+    assert excinfo.value.status_code == 400
+    assert "notas.txt" in excinfo.value.detail
+
+
+def test_process_pool_returns_parse_errors_per_file():
+    results = asyncio.run(
+        production_status._parse_quote_files([("a.xlsx", b"no es excel"), ("b.xlsx", b"tampoco")])
+    )
+    production_status.shutdown_quote_parse_pool()
+
+    assert len(results) == 2
+    for parsed, error, elapsed_ms in results:
+        assert parsed is None
+        assert error
+        assert elapsed_ms >= 0
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models.financial import RawAccountData
+from services import pyg_analysis
+from services.pyg_analysis import get_pyg_analysis, invalidate_pyg_analysis, parse_period
+
+
+ACCOUNTS = {
+    "4": "INGRESOS",
+    "4.1": "VENTAS",
+    "4.1.01": "VENTAS LOCALES",
+    "4.1.02": "EXPORTACIONES",
+    "5": "COSTOS Y GASTOS",
+    "5.1": "COSTO DE VENTAS",
+    "5.3": "GASTOS ADMINISTRATIVOS",
+    "5.3.01": "SUELDOS",
+    "5.3.02": "DEPRECIACIÓN EQUIPOS",
+    "5.3.03": "INTERESES BANCARIOS",
+}
+
+
+@pytest.fixture(scope="function")
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSession = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    pyg_analysis._PYG_ANALYSIS_CACHE.clear()
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+        pyg_analysis._PYG_ANALYSIS_CACHE.clear()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def add_month(db, year, month, leaves, company_id=1):
+    """Cargar hojas y subtotales de un mes como lo hace el CSV."""
+    values = dict(leaves)
+    for code in list(leaves):
+        parent = code
+        while "." in parent:
+            parent = parent.rsplit(".", 1)[0]
+            values[parent] = values.get(parent, 0) + leaves[code]
+    for code, amount in values.items():
+        db.add(RawAccountData(
+            company_id=company_id, import_date=date.today(), account_code=code,
+            account_name=ACCOUNTS[code], period_year=year, period_month=month, amount=Decimal(str(amount)),
+        ))
+    db.commit()
+
+
+def seed(db):
+    leaves = {"4.1.01": 800, "4.1.02": 200, "5.1": 400, "5.3.01": 100, "5.3.02": 50, "5.3.03": 30}
+    add_month(db, 2024, 12, dict(leaves, **{"4.1.01": 600}))
+    add_month(db, 2025, 1, leaves)
+    add_month(db, 2025, 2, dict(leaves, **{"4.1.01": 1000, "5.1": 500}))
+
+
+def node(tree, code):
+    stack = [tree]
+    while stack:
+        current = stack.pop()
+        if current["code"] == code:
+            return current
+        stack.extend(current["children"])
+    raise KeyError(code)
+
+
+def test_parse_period_accepts_iso_names_and_annual():
+    assert parse_period("2025-03") == (2025, 3)
+    assert parse_period("Marzo") == (None, 3)
+    assert parse_period("Anual") == (None, None)
+
+
+def test_contable_view_rolls_up_hierarchy_and_deltas(session):
+    seed(session)
+    analysis, cached = get_pyg_analysis(session, 1, 2025, "contable")
+    assert cached is False
+
+    february = analysis.to_result(month=2)
+    tree = february["account_tree"]
+    assert node(tree, "4")["value"] == 1200.0
+    assert node(tree, "4.1.01")["percentage"] == pytest.approx(1000 / 1200 * 100, abs=0.01)
+    assert node(tree, "4.1.01")["metadata"]["horizontal_change_abs"] == 200.0
+    assert february["kpis"]["utilidad_bruta"] == 700.0
+    assert february["kpis"]["utilidad_neta"] == 520.0
+    assert february["kpis"]["margen_neto"] == pytest.approx(43.33, abs=0.01)
+
+    january = analysis.to_result(month=1)
+    # Enero se compara con diciembre del año anterior
+    assert node(january["account_tree"], "4.1.01")["horizontal_change"] == pytest.approx(33.33, abs=0.01)
+
+    annual = analysis.to_result()
+    assert annual["kpis"]["ingresos"] == 2200.0
+    assert annual["summary"]["period_type"] == "annual"
+    assert node(annual["account_tree"], "4")["metadata"]["yoy_change"] == 1400.0
+
+
+def test_caja_view_excludes_depreciation_and_interest(session):
+    seed(session)
+    analysis, _ = get_pyg_analysis(session, 1, 2025, "caja")
+    result = analysis.to_result(month=1)
+
+    gastos = node(result["account_tree"], "5.3")
+    assert gastos["value"] == 100.0
+    assert gastos["metadata"]["original_value"] == 180.0
+    assert node(result["account_tree"], "5.3.02")["metadata"]["excluded"] is True
+    assert result["kpis"]["utilidad_neta"] == 500.0
+
+
+def test_analysis_is_memoized_until_invalidated(session):
+    seed(session)
+    first, _ = get_pyg_analysis(session, 1, 2025, "contable")
+    again, cached = get_pyg_analysis(session, 1, 2025, "contable")
+    assert again is first and cached is True
+
+    add_month(session, 2025, 3, {"4.1.01": 10})
+    invalidate_pyg_analysis(1)
+    refreshed, cached = get_pyg_analysis(session, 1, 2025, "contable")
+    assert cached is False
+    assert refreshed.to_result(month=3)["kpis"]["ingresos"] == 10.0
+
+
+def test_analysis_overlapping_an_invalidation_is_not_stored(session, monkeypatch):
+    seed(session)
+    compute = pyg_analysis.compute_pyg_analysis
+
+    def compute_during_upload(*args):
+        analysis = compute(*args)
+        # Otra petición carga datos mientras este cálculo sigue en curso
+        invalidate_pyg_analysis(1)
+        return analysis
+
+    monkeypatch.setattr(pyg_analysis, "compute_pyg_analysis", compute_during_upload)
+    get_pyg_analysis(session, 1, 2025, "contable")
+    assert (1, 2025, "contable") not in pyg_analysis._PYG_ANALYSIS_CACHE
+
+
+def test_analyze_endpoint_answers_without_brain(session):
+    import api_server
+
+    seed(session)
+    request = api_server.PyGAnalysisRequest(analysis_month="2025-02", view_type="operativo")
+    user = SimpleNamespace(id=1, company_id=1)
+    response = asyncio.run(api_server.analyze_pyg(request=request, current_user=user, db=session))
+
+    assert response["success"] is True
+    assert response["data"]["kpis"]["ingresos"] == 1200.0
+    assert response["data"]["year"] == 2025
+    assert "ai" not in response["data"]
@@ -0,0 +1,75 @@
+import random
+from decimal import Decimal
+
+from services.pyg_rollup import (
+    PYG_GROUP_PREFIXES,
+    accounts_with_children,
+    rollup_monthly_pyg,
+    to_cents,
+)
+
+
+def correlated_leaf_sum(entries, month, prefix):
+    """Same rule as the former SQL: LIKE 'prefix%' AND NOT EXISTS (child in the same month)."""
+    month_codes = [code for code, entry_month, _ in entries if entry_month == month]
+    return sum(
+        cents
+        for code, entry_month, cents in entries
+        if entry_month == month
+        and code.startswith(prefix)
+        and not any(other != code and other.startswith(f"{code}.") for other in month_codes)
+    )
+
+
+def test_accounts_with_children_uses_dotted_prefixes():
+    codes = ["4", "4.1", "4.1.01", "4.10", "5", "5.1.01", "51"]
+    assert accounts_with_children(codes) == {"4", "4.1", "5"}
+
+
+def test_to_cents_rounds_like_decimal_column():
+    assert to_cents(10.005) == 1001
+    assert to_cents(-2.5) == -250
+    assert to_cents(1234.5) == 123450
+
+
+def test_rollup_matches_correlated_sql_rule():
+    entries = [
+        ("4", 1, 100000),
+        ("4.1", 1, 60000),
+        ("4.1.01", 1, 60000),
+        ("4.2", 1, 40000),
+        ("5.1.01", 1, 30000),
+        ("5.2", 1, 5000),
+        ("5.3.02", 1, 7000),
+        # En febrero 4.1 no tiene subcuentas con saldo: es hoja ese mes
+        ("4", 2, 50000),
+        ("4.1", 2, 50000),
+        ("5.1", 2, 1234),
+    ]
+
+    totals = {row.period_month: row for row in rollup_monthly_pyg(entries)}
+
+    assert totals[1].ingresos == Decimal("1000.00")
+    assert totals[1].costo_ventas == Decimal("300.00")
+    assert totals[1].costos_total == Decimal("420.00")
+    assert totals[1].utilidad_bruta == Decimal("700.00")
+    assert totals[2].ingresos == Decimal("500.00")
+    assert totals[2].ebitda == Decimal("487.66")
+    assert sorted(totals) == [1, 2]
+
+
+def test_rollup_matches_reference_on_random_chart():
+    rng = random.Random(7)
+    codes = ["4", "5"]
+    for _ in range(200):
+        parent = rng.choice(codes)
+        codes.append(f"{parent}.{rng.randint(1, 9)}")
+    entries = [
+        (rng.choice(codes), rng.randint(1, 12), rng.randint(-10**6, 10**6))
+        for _ in range(1500)
+    ]
+
+    for row in rollup_monthly_pyg(entries):
+        for group, prefix in PYG_GROUP_PREFIXES.items():
+            expected = correlated_leaf_sum(entries, row.period_month, prefix)
+            assert getattr(row, group) == Decimal(expected).scaleb(-2)
@@ -1,4 +1,6 @@
+import asyncio
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 import pytest
 from sqlalchemy import create_engine
@@ -6,6 +8,7 @@ from sqlalchemy.orm import sessionmaker
 
 from auth.policy_engine import PolicyEngine
 from database.connection import Base
+from models.audit import AuditLog
 from models.company import Company
 from models.permission import Permission
 from models.role import Role, role_permissions
@@ -30,6 +33,7 @@ def rbac_context():
         user_roles,
         RolePermissionOverride.__table__,
         UserRoleOverride.__table__,
+        AuditLog.__table__,
     ]
 
     Base.metadata.create_all(engine, tables=tables)
@@ -152,3 +156,113 @@ def test_policy_engine_user_overrides_and_temporal_constraints(rbac_context):
     assert not PolicyEngine.has_permission(
         user, "sales", "delete", session, company.id
     )
+
+
+def test_compiled_policy_is_reused_until_overrides_change(rbac_context):
+    session = rbac_context["session"]
+    company = rbac_context["company"]
+    user = rbac_context["user"]
+    role = rbac_context["role"]
+    perms = rbac_context["permissions"]
+
+    policy = PolicyEngine.compile_user_policy(user, session, company.id)
+    assert PolicyEngine.compile_user_policy(user, session, company.id) is policy
+    assert policy.allows("sales", "read")
+    assert PolicyEngine.check_multiple_permissions(
+        user, [("sales", "read"), ("sales", "export")], session, require_all=False
+    )
+    assert not PolicyEngine.check_multiple_permissions(
+        user, [("sales", "read"), ("sales", "export")], session, require_all=True
+    )
+
+    session.add(RolePermissionOverride(
+        company_id=company.id,
+        role_id=role.id,
+        permission_id=perms["sales_export"].id,
+        is_granted=True,
+    ))
+    session.commit()
+
+    recompiled = PolicyEngine.compile_user_policy(user, session, company.id)
+    assert recompiled is not policy
+    assert PolicyEngine.check_multiple_permissions(
+        user, [("sales", "read"), ("sales", "export")], session, require_all=True
+    )
+
+
+def test_user_writes_only_drop_that_users_policy(rbac_context):
+    session = rbac_context["session"]
+    company = rbac_context["company"]
+    user = rbac_context["user"]
+    role = rbac_context["role"]
+
+    policy = PolicyEngine.compile_user_policy(user, session, company.id)
+    generation = PolicyEngine._generation
+
+    user.last_login = datetime.utcnow()
+    session.commit()
+    assert PolicyEngine.compile_user_policy(user, session, company.id) is policy
+
+    user.roles.remove(role)
+    session.commit()
+    assert PolicyEngine._generation == generation
+    recompiled = PolicyEngine.compile_user_policy(user, session, company.id)
+    assert recompiled is not policy
+    assert not recompiled.allows("sales", "read")
+
+
+def test_superadmin_role_reassignment_applies_immediately(rbac_context):
+    from routes.superadmin import AssignRolesRequest, assign_roles_superadmin
+
+    session = rbac_context["session"]
+    company = rbac_context["company"]
+    user = rbac_context["user"]
+    perms = rbac_context["permissions"]
+
+    admin2 = Role(name="admin2", description="Admin role")
+    admin2.permissions.append(perms["sales_delete"])
+    session.add(admin2)
+    session.commit()
+    assert not PolicyEngine.has_permission(user, "sales", "delete", session, company.id)
+
+    # Core DELETE/INSERT on user_roles, not ORM relationship changes
+    asyncio.run(assign_roles_superadmin(
+        user_id=user.id,
+        request=AssignRolesRequest(role_ids=[admin2.id]),
+        current_user=SimpleNamespace(id=user.id),
+        db=session,
+    ))
+
+    assert PolicyEngine.has_permission(user, "sales", "delete", session, company.id)
+    assert not PolicyEngine.has_permission(user, "sales", "read", session, company.id)
+
+
+def test_compiled_policy_expires_at_next_temporal_boundary(rbac_context):
+    session = rbac_context["session"]
+    company = rbac_context["company"]
+    user = rbac_context["user"]
+    perms = rbac_context["permissions"]
+
+    starts_at = datetime.utcnow() + timedelta(seconds=20)
+    session.add(UserRoleOverride(
+        company_id=company.id,
+        user_id=user.id,
+        permission_id=perms["reports_download"].id,
+        is_granted=True,
+        valid_from=starts_at,
+    ))
+    session.commit()
+
+    policy = PolicyEngine.compile_user_policy(user, session, company.id)
+    assert not policy.allows("reports", "download")
+    assert policy.expires_at == starts_at
+
+
+def test_compiled_policy_matches_wildcards():
+    wildcard = PolicyEngine.compile_user_policy(
+        User(id=None, company_id=1, is_superuser=True), None, 1
+    )
+    assert wildcard.has_wildcards
+    assert wildcard.allows("anything", "delete")
+    assert wildcard.allows_all([("sales", "read"), ("reports", "download")])
+    assert wildcard.permissions() == {("*", "*")}
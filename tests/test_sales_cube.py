@@ -0,0 +1,117 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models.sales import SalesTransaction
+from services.sales_cube import CUBE_METRICS, compute_sales_cube, fetch_sales_frame
+
+
+def make_tx(factura: str, fecha: date, venta_neta: str, categoria: str, canal: str, company_id: int = 1):
+    neta = Decimal(venta_neta)
+    return SalesTransaction(
+        company_id=company_id,
+        fecha_emision=fecha,
+        year=fecha.year,
+        month=fecha.month,
+        categoria_producto=categoria,
+        vendedor="Vendedor 1",
+        numero_factura=factura,
+        canal_comercial=canal,
+        razon_social=f"Cliente {factura}",
+        producto="Producto",
+        m2=Decimal("2"),
+        venta_bruta=neta,
+        descuento=Decimal("0"),
+        venta_neta=neta,
+        costo_venta=neta / 4,
+        rentabilidad=neta - neta / 4,
+    )
+
+
+@pytest.fixture(scope="function")
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSession = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    db.add_all([
+        make_tx("F-1", date(2025, 1, 3), "100", "Pisos", "Directo"),
+        make_tx("F-1", date(2025, 1, 3), "40", "Paredes", "Directo"),
+        make_tx("F-2", date(2025, 2, 7), "300", "Paredes", "Distribuidor"),
+        make_tx("F-3", date(2025, 2, 9), "80", "Pisos", "Distribuidor"),
+        make_tx("F-8", date(2025, 2, 9), "5000", "Pisos", "Directo", company_id=2),
+    ])
+    db.commit()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def test_cube_computes_all_panels_from_one_frame(session):
+    filters = {'categoria': 'Pisos', 'canal': None, 'vendedor': None, 'cliente': None}
+    frame = fetch_sales_frame(session, 1, [2025], [], filters, ['categoria'])
+    panels = compute_sales_cube(frame, CUBE_METRICS, ['categoria'], filters, limit=10)
+
+    summary = panels['summary']
+    assert summary.venta_neta_total == pytest.approx(180.0)
+    assert summary.num_facturas == 2
+    assert summary.metros_cuadrados == pytest.approx(4.0)
+
+    assert [(row.year, row.month, row.venta_neta) for row in panels['trends']] == [
+        (2025, 1, 100.0),
+        (2025, 2, 80.0),
+    ]
+
+    # Grouped panels ignore the filter on their own dimension
+    commercial = panels['commercial']['categoria']
+    assert [(row.dimension, row.venta_neta) for row in commercial] == [("Paredes", 340.0), ("Pisos", 180.0)]
+    financial = panels['financial']['categoria']
+    assert [row.num_transacciones for row in financial] == [2, 2]
+
+
+def test_cube_pushes_down_filters_on_ungrouped_dimensions(session):
+    filters = {'categoria': None, 'canal': 'Distribuidor', 'vendedor': None, 'cliente': None}
+    frame = fetch_sales_frame(session, 1, [], [2], filters, ['categoria'])
+
+    assert len(frame) == 2
+    panels = compute_sales_cube(frame, ['commercial'], ['categoria'], filters, limit=1)
+    assert [(row.dimension, row.venta_neta) for row in panels['commercial']['categoria']] == [("Paredes", 300.0)]
+
+
+def test_cube_handles_empty_selection(session):
+    filters = {'categoria': None, 'canal': None, 'vendedor': None, 'cliente': None}
+    frame = fetch_sales_frame(session, 1, [1999], [], filters, [])
+    panels = compute_sales_cube(frame, ['summary', 'trends'], [], filters, limit=5)
+
+    assert panels['summary'].venta_neta_total == 0.0
+    assert panels['summary'].num_clientes == 0
+    assert panels['trends'] == []
+
+
+def test_cube_keeps_null_keys_as_their_own_group(session):
+    undated = make_tx("F-9", date(2025, 3, 1), "20", "Pisos", "Directo", company_id=3)
+    undated.year = undated.month = None
+    session.add_all([undated, make_tx("F-10", date(2025, 3, 1), "30", "Pisos", "Directo", company_id=3)])
+    session.commit()
+
+    filters = {'categoria': None, 'canal': None, 'vendedor': None, 'cliente': None}
+    frame = fetch_sales_frame(session, 3, [], [], filters, ['categoria'])
+    frame.loc[frame['numero_factura'] == "F-10", 'categoria'] = None
+    panels = compute_sales_cube(frame, ['summary', 'trends', 'commercial'], ['categoria'], filters, limit=5)
+
+    # Same totals as the SQL aggregates, which also group NULL
+    assert sum(row.venta_neta for row in panels['trends']) == panels['summary'].venta_neta_total
+    assert [(row.year, row.month, row.venta_neta) for row in panels['trends']] == [
+        (2025, 3, 30.0),
+        (None, None, 20.0),
+    ]
+    assert [(row.dimension, row.venta_neta) for row in panels['commercial']['categoria']] == [
+        (None, 30.0),
+        ("Pisos", 20.0),
+    ]
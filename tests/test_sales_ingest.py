@@ -0,0 +1,150 @@
+import hashlib
+import io
+import tempfile
+from datetime import date
+
+import pytest
+from decimal import Decimal
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.connection import Base
+from models.sales import SalesTransaction
+from services.sales_ingest import (
+    _mysql_insert,
+    _new_rows,
+    create_upload_job,
+    get_upload_job,
+    load_sales_csv,
+    parse_decimal,
+    run_upload_job,
+    sales_row_hash,
+)
+
+
+HEADER = (
+    "Fecha de Emisión;Categoría Producto;Vendedor;# Factura;Canal Comercial;Razón Social;Producto;"
+    "Cantidad Facturada;Factor Conversión;M2;Venta Bruta $;Descuento $;Venta Neta $;Costo Venta $;"
+    "Costo Uni.$;Rentabilidad $"
+)
+
+
+def csv_line(fecha: str, factura: str, venta_neta: str) -> str:
+    return f"{fecha};Pisos;Ana;{factura};Directo;Cliente A;Porcelanato;1;1;2,5;{venta_neta};0;{venta_neta};50;50;50"
+
+
+def make_csv(*lines: str) -> io.StringIO:
+    return io.StringIO("\n".join((HEADER,) + lines) + "\n")
+
+
+@pytest.fixture(scope="function")
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def session(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def test_parse_decimal_handles_latin_format():
+    assert parse_decimal("1.234,56") == Decimal("1234.56")
+    assert parse_decimal("  ") == Decimal("0")
+
+
+def test_sales_row_hash_matches_mysql_backfill_formula():
+    expected = hashlib.sha256("F-1|Porcelanato|2025-01-10|2.50|-10.00".encode("utf-8")).hexdigest()
+
+    assert sales_row_hash("F-1", "Porcelanato", date(2025, 1, 10), Decimal("2.5"), Decimal("-10")) == expected
+    assert sales_row_hash("F-1", "Porcelanato", date(2025, 1, 10), Decimal("2.505"), Decimal("-10.00")) != expected
+
+
+def test_load_sales_csv_reports_chunks_errors_and_duplicates(session):
+    stream = make_csv(
+        csv_line("10/01/2025", "F-1", "100,00"),
+        csv_line("10/01/2025", "F-1", "100,00"),
+        csv_line("2025-01-11", "F-2", "80,00"),
+        csv_line("12/02/2025", "F-3", "1.000,50"),
+        csv_line("31/02/2025", "F-4", "10,00"),
+    )
+
+    result = load_sales_csv(session, 1, stream, batch_size=2)
+
+    assert result["total_uploaded"] == 2
+    assert result["duplicates_skipped_count"] == 1
+    assert result["errors_count"] == 2
+    assert result["errors"][0].startswith("Línea 4:")
+    assert [chunk["rows"] for chunk in result["chunks"]] == [2, 2, 1]
+    assert result["chunks"][-1]["rows_processed"] == 5
+
+    rows = session.query(SalesTransaction).order_by(SalesTransaction.numero_factura).all()
+    assert [(r.numero_factura, r.venta_neta) for r in rows] == [
+        ("F-1", Decimal("100.00")),
+        ("F-3", Decimal("1000.50")),
+    ]
+
+
+def test_reupload_skips_existing_rows(session):
+    load_sales_csv(session, 1, make_csv(csv_line("10/01/2025", "F-1", "100,00")))
+    result = load_sales_csv(
+        session,
+        1,
+        make_csv(csv_line("10/01/2025", "F-1", "100,00"), csv_line("11/01/2025", "F-2", "5,00")),
+    )
+
+    assert result["total_uploaded"] == 1
+    assert result["duplicates_skipped_count"] == 1
+    assert session.query(SalesTransaction).count() == 2
+    assert session.query(SalesTransaction).filter(SalesTransaction.row_hash.is_(None)).count() == 0
+
+    # El mismo contenido en otra empresa no es duplicado
+    result = load_sales_csv(session, 2, make_csv(csv_line("10/01/2025", "F-1", "100,00")))
+    assert result["total_uploaded"] == 1
+
+
+def test_mysql_insert_only_absorbs_unique_key_collisions(session):
+    load_sales_csv(session, 1, make_csv(csv_line("10/01/2025", "F-1", "100,00")))
+    stored = session.query(SalesTransaction.row_hash).scalar()
+    rows = [
+        {"company_id": 1, "row_hash": stored},
+        {"company_id": 1, "row_hash": "new"},
+        {"company_id": 1, "row_hash": "new"},
+        {"company_id": 2, "row_hash": stored},
+    ]
+
+    fresh = _new_rows(session, rows, set())
+    assert fresh == [rows[1], rows[3]]
+
+    sql = str(_mysql_insert(SalesTransaction.__table__, fresh).compile(dialect=mysql.dialect()))
+    assert "IGNORE" not in sql
+    assert "ON DUPLICATE KEY UPDATE id = sales_transactions.id" in sql
+
+
+def test_background_job_loads_from_spooled_file(engine, session):
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as handle:
+        handle.write(make_csv(csv_line("10/03/2025", "F-9", "42,00")).getvalue())
+
+    job = create_upload_job(7, "ventas.csv")
+    run_upload_job(job, engine, handle.name, overwrite=False, batch_size=100)
+
+    assert job.status == "completed"
+    assert job.result["total_uploaded"] == 1
+    assert get_upload_job(job.id, 7) is job
+    assert get_upload_job(job.id, 8) is None
+    assert session.query(SalesTransaction).filter(SalesTransaction.company_id == 7).count() == 1
@@ -0,0 +1,144 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import Base
+from models.sales import SalesKPICache, SalesTransaction
+from services.sales_rollup import (
+    clear_sales_rollup,
+    plan_rollup_query,
+    refresh_sales_rollup,
+    rollup_monthly,
+    rollup_ranking,
+    rollup_totals,
+)
+
+
+NO_FILTERS = {'categoria': None, 'canal': None, 'vendedor': None, 'cliente': None}
+
+
+def make_tx(
+    factura: str,
+    fecha: date,
+    venta_neta: str,
+    categoria: str = "Pisos",
+    cliente: str = "Cliente A",
+    company_id: int = 1,
+) -> SalesTransaction:
+    neta = Decimal(venta_neta)
+    return SalesTransaction(
+        company_id=company_id,
+        fecha_emision=fecha,
+        year=fecha.year,
+        month=fecha.month,
+        categoria_producto=categoria,
+        vendedor="Vendedor 1",
+        numero_factura=factura,
+        canal_comercial="Directo",
+        razon_social=cliente,
+        producto=f"Producto {categoria}",
+        cantidad_facturada=Decimal("1"),
+        m2=Decimal("10"),
+        venta_bruta=neta + Decimal("5"),
+        descuento=Decimal("5"),
+        venta_neta=neta,
+        costo_venta=neta / 2,
+        rentabilidad=neta / 2,
+    )
+
+
+@pytest.fixture(scope="function")
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSession = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    db = TestingSession()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.fixture
+def seeded(session):
+    session.add_all([
+        make_tx("F-1", date(2024, 1, 10), "100"),
+        make_tx("F-1", date(2024, 1, 10), "50", categoria="Paredes"),
+        make_tx("F-2", date(2024, 2, 3), "200", cliente="Cliente B"),
+        make_tx("F-3", date(2025, 1, 5), "400", categoria="Paredes", cliente="Cliente B"),
+        make_tx("F-9", date(2024, 1, 10), "999", company_id=2),
+    ])
+    session.commit()
+    refresh_sales_rollup(session, 1)
+    session.commit()
+    return session
+
+
+def test_planner_falls_back_without_rollup(session):
+    session.add(make_tx("F-1", date(2024, 1, 10), "100"))
+    session.commit()
+
+    assert plan_rollup_query(session, 1, [], [], NO_FILTERS) is None
+
+
+def test_planner_rejects_uncovered_filter_combinations(seeded):
+    filters = dict(NO_FILTERS, categoria="Pisos", canal="Directo")
+    assert plan_rollup_query(seeded, 1, [], [], filters) is None
+
+    filters = dict(NO_FILTERS, categoria="Pisos")
+    assert plan_rollup_query(seeded, 1, [], [], filters, distinct_dimension='cliente') is None
+    assert plan_rollup_query(seeded, 1, [], [], filters, group_by='producto') is None
+    assert plan_rollup_query(seeded, 1, [], [], filters) is not None
+
+
+def test_rollup_totals_match_transactions(seeded):
+    plan = plan_rollup_query(seeded, 1, [2024], [], NO_FILTERS, distinct_dimension='cliente')
+    totals = rollup_totals(seeded, 1, plan)
+
+    assert float(totals.venta_neta_total) == pytest.approx(350.0)
+    assert float(totals.descuento_total) == pytest.approx(15.0)
+    assert float(totals.metros_cuadrados) == pytest.approx(30.0)
+    assert totals.num_facturas == 2
+    assert totals.num_clientes == 2
+
+    plan = plan_rollup_query(seeded, 1, [], [], dict(NO_FILTERS, categoria="Paredes"))
+    totals = rollup_totals(seeded, 1, plan)
+    assert float(totals.venta_neta_total) == pytest.approx(450.0)
+    assert totals.num_facturas == 2
+
+
+def test_rollup_monthly_and_ranking(seeded):
+    plan = plan_rollup_query(seeded, 1, [], [1], NO_FILTERS)
+    monthly = rollup_monthly(seeded, 1, plan)
+    assert [(row.year, row.month, float(row.venta_neta)) for row in monthly] == [
+        (2024, 1, 150.0),
+        (2025, 1, 400.0),
+    ]
+
+    plan = plan_rollup_query(seeded, 1, [], [], NO_FILTERS, group_by='categoria')
+    ranking = rollup_ranking(seeded, 1, plan, 'sales', 5)
+    assert [(row.name, float(row.value)) for row in ranking] == [
+        ("Paredes", 450.0),
+        ("Pisos", 300.0),
+    ]
+
+
+def test_incremental_refresh_and_clear(seeded):
+    seeded.add(make_tx("F-4", date(2024, 2, 20), "25"))
+    refresh_sales_rollup(seeded, 1, {(2024, 2)})
+    seeded.commit()
+
+    plan = plan_rollup_query(seeded, 1, [2024], [2], NO_FILTERS)
+    totals = rollup_totals(seeded, 1, plan)
+    assert float(totals.venta_neta_total) == pytest.approx(225.0)
+    assert totals.num_facturas == 2
+
+    clear_sales_rollup(seeded, 1, 2024)
+    seeded.commit()
+    years = {row.year for row in seeded.query(SalesKPICache.year).filter(SalesKPICache.company_id == 1)}
+    assert years == {2025}
+    assert seeded.query(SalesKPICache).filter(SalesKPICache.company_id == 2).count() == 0